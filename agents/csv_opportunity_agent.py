@@ -1,7 +1,14 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from tasks.csv_loader_task import CSVLoaderTask
 from tasks.csv_preprocess_task import CSVPreprocessTask
 from chains.opportunity_matching_chain import OpportunityMatchingChain
+from chains.candidate_scorer import (
+    CandidateScorer,
+    candidate_pool,
+    default_cutoff,
+    profile_naics,
+    profile_set_asides,
+)
 from rag.milvus_store import MilvusStore
 
 
@@ -12,6 +19,7 @@ class CSVOpportunityAgent:
         self.loader_task = CSVLoaderTask(csv_file_path)
         self.preprocess_task = CSVPreprocessTask()
         self.matching_chain = OpportunityMatchingChain(model_name)
+        self.scorer = CandidateScorer()
     
     def load_and_embed_opportunities(self) -> int:
         """Load CSV data, preprocess it, and embed it in the vector store."""
@@ -32,20 +40,28 @@ class CSVOpportunityAgent:
         
         print("🧠 Embedding opportunities in vector store...")
         self.store.overwrite_documents(processed_docs)
+        self.store.report_cache_stats()
         
         print(f"✅ Successfully loaded and embedded {len(processed_docs)} opportunities")
         return len(processed_docs)
     
-    def find_matching_opportunities(self, company_profile: str, top_k: int = 10) -> List[Dict]:
-        """Find and rank opportunities that match the company profile."""
+    def find_matching_opportunities(self, company_profile: str, top_k: int = 10, on_progress=None,
+                                    cutoff: Optional[int] = None, naics_codes: Optional[List[str]] = None,
+                                    setasides: Optional[List[str]] = None) -> List[Dict]:
+        """Find and rank opportunities that match the company profile.
+
+        Ten times ``cutoff`` vector hits are first scored by the cheap
+        ``CandidateScorer``; only the best ``cutoff`` of them are sent to the
+        LLM for evaluation.
+        """
         
         print("🔍 Searching for relevant opportunities...")
         
-        # Get all documents from the vector store
-        # We'll use a broad search to get many candidates, then rank them with LLM
-        broad_search_results = self.store.index.similarity_search(
+        # Get a broad set of candidates from the vector store
+        cutoff = cutoff or default_cutoff(top_k)
+        broad_search_results = self.store.index.similarity_search_with_score(
             company_profile, 
-            k=min(100, top_k * 10)  # Get more candidates for better ranking
+            k=candidate_pool(cutoff)
         )
         
         if not broad_search_results:
@@ -54,19 +70,36 @@ class CSVOpportunityAgent:
         
         # Convert search results to the expected format
         opportunities = []
-        for doc in broad_search_results:
+        distances = []
+        for doc, distance in broad_search_results:
             opportunities.append({
                 'text': doc.page_content,
                 'metadata': doc.metadata
             })
+            distances.append(distance)
+        # The live index may predate the configured MILVUS_METRIC
+        metric = self.store.index.metric_type() or self.store.index_params.get("metric_type")
+        if metric in ("IP", "COSINE"):
+            # Similarity metrics: higher is closer
+            distances = [-d for d in distances]
         
         print(f"📊 Found {len(opportunities)} candidate opportunities")
         
+        shortlisted = self.scorer.select(
+            opportunities,
+            distances,
+            cutoff,
+            naics_codes=profile_naics(company_profile, naics_codes),
+            set_asides=profile_set_asides(company_profile, setasides),
+        )
+        print(f"⚡ Feature scoring kept {len(shortlisted)} of {len(opportunities)} candidates for LLM evaluation")
+        
         # Use LLM to rank opportunities
         ranked_opportunities = self.matching_chain.rank_opportunities(
-            opportunities, 
+            shortlisted, 
             company_profile, 
-            top_k
+            top_k,
+            on_progress=on_progress,
         )
         
         return ranked_opportunities
@@ -86,35 +119,21 @@ class CSVOpportunityAgent:
     def has_existing_data(self) -> bool:
         """Check if the vector store has any existing data."""
         try:
-            from pymilvus import utility
-            # Check if collection exists and has data
-            collection_exists = utility.has_collection(self.store.collection_name)
-            print(f"🔍 Collection '{self.store.collection_name}' exists: {collection_exists}")
-            
-            if not collection_exists:
-                return False
-            
-            # Try a simple search to see if there's any data
-            test_results = self.store.index.similarity_search("test", k=1)
-            has_data = len(test_results) > 0
-            print(f"🔍 Found {len(test_results)} documents in collection")
-            return has_data
+            count = self.store.row_count()
+            print(f"🔍 Found {count} documents in collection '{self.store.collection_name}'")
+            return count > 0
         except Exception as e:
             print(f"⚠️ Error checking existing data: {e}")
-            import traceback
-            traceback.print_exc()
             return False
     
     def get_data_count(self) -> int:
-        """Get approximate count of documents in the vector store."""
+        """Get the number of documents in the vector store."""
         try:
-            # Use a broad search to estimate document count
-            test_results = self.store.index.similarity_search("government contract opportunity", k=1000)
-            return len(test_results)
+            return self.store.row_count()
         except Exception as e:
             print(f"⚠️ Error getting data count: {e}")
             return 0
     
-    def search_existing_opportunities(self, company_profile: str, top_k: int = 10) -> List[Dict]:
+    def search_existing_opportunities(self, company_profile: str, top_k: int = 10, **kwargs) -> List[Dict]:
         """Search existing embedded opportunities without reloading."""
-        return self.find_matching_opportunities(company_profile, top_k) 
+        return self.find_matching_opportunities(company_profile, top_k, **kwargs) 
@@ -2,11 +2,13 @@ from tasks.pull_solicitations_task import PullSolicitationsTask
 from tasks.preprocess_task import PreprocessTask
 from tasks.archive_solicitations_task import ArchiveSolicitationsTask
 from rag.milvus_store import MilvusStore
+from utils.ingest_state import IngestState, DEFAULT_STATE_PATH
+from utils.pipeline import StreamingPipeline
 
 class SolicitationAgent:
-    def __init__(self, config, store: MilvusStore, *, dry_run: bool = False):
+    def __init__(self, config, store: MilvusStore, *, dry_run: bool = False, queue_size: int = 4):
         self.api_key = config["SAM_API_KEY"]
-        self.pull_task = PullSolicitationsTask(self.api_key)
+        self.pull_task = PullSolicitationsTask(self.api_key, use_async=True)
         self.archive_task = ArchiveSolicitationsTask(
             config.get("MINIO_ACCESS_KEY"),
             config.get("MINIO_SECRET_KEY"),
@@ -14,27 +16,103 @@ class SolicitationAgent:
         )
         self.preprocess_task = PreprocessTask()
         self.store = store
+        self.state = IngestState(config.get("INGEST_STATE_PATH") or DEFAULT_STATE_PATH)
+        self.queue_size = queue_size
 
     def run(self):
-        print("🔍 Pulling solicitations...")
-        opportunities = self.pull_task.execute()
-        print(f"✅ Pulled {len(opportunities)} solicitations.")
+        print("🔍 Streaming solicitations: pull → archive → preprocess → embed...")
+        pulled, embedded = self._run_pipeline(incremental=False)
+        print(f"✅ Pulled {pulled} solicitations.")
 
-        if not opportunities:
-            print("⚠️ No solicitations found. Exiting early.")
+        if not embedded:
+            print("⚠️ No processed documents to embed; existing collection left untouched.")
             return
+        print(f"✅ Stored {embedded} active solicitations in Milvus.")
 
-        print("📦 Archiving raw JSON responses...")
-        self.archive_task.execute(opportunities)
+    def run_incremental(self):
+        """Pull only notices newer than the stored watermark and embed what changed."""
+        if not self.state.has_watermark() or not self.store.has_collection():
+            print("ℹ️ No ingest watermark or collection yet, running a full ingest first.")
+            return self.run()
 
-        print("🧹 Preprocessing documents...")
-        processed_docs = self.preprocess_task.execute(opportunities)
-        print(f"✅ Preprocessed {len(processed_docs)} documents.")
+        print(f"🔍 Streaming solicitations posted since {self.state.posted_from()}...")
+        pulled, embedded = self._run_pipeline(incremental=True)
+        print(f"✅ Pulled {pulled} solicitations, embedded {embedded} new or changed notices.")
 
-        if not processed_docs:
-            print("⚠️ No processed documents to embed. Exiting early.")
-            return
+        expired = self.state.expired_notice_ids()
+        if expired:
+            print(f"🧹 Removing {len(expired)} expired notices from Milvus...")
+            self.store.delete_by_notice_ids(expired)
+            self.state.forget(expired)
+            self.state.save()
+
+    def _run_pipeline(self, incremental):
+        """Stream SAM.gov pages through archive, preprocess and embed stages.
+
+        Page N is archived, preprocessed and embedded while later pages are
+        still downloading; bounded queues between the stages apply
+        backpressure when embedding falls behind. Returns ``(pulled, embedded)``.
+        """
+        seen = []
+        counts = {"embedded": 0}
+
+        def archive(page):
+            # Keep only what the watermark needs, not the full records
+            seen.extend({"noticeId": r.get("noticeId"), "postedDate": r.get("postedDate")} for r in page)
+            if incremental:
+                page = [r for r in page if self.state.is_new(r)]
+            if not page:
+                return None
+            self.archive_task.execute(page)
+            return page
+
+        def preprocess(page):
+            docs = self.preprocess_task.execute(page)
+            if incremental:
+                docs = self.state.changed_documents(docs)
+            return docs or None
+
+        rebuild = None if incremental else self.store.begin_rebuild()
+
+        def embed(docs):
+            if incremental:
+                self.store.upsert_documents(docs)
+            else:
+                if counts["embedded"] == 0:
+                    self.state.notices = {}
+                rebuild.add_documents(docs)
+            self.state.record_documents(docs)
+            counts["embedded"] += len(docs)
+            print(f"🧠 Embedded {counts['embedded']} documents so far")
+
+        pipeline = StreamingPipeline(
+            [("archive", archive), ("preprocess", preprocess), ("embed", embed)],
+            queue_size=self.queue_size,
+        )
+        try:
+            try:
+                stats = pipeline.run(self.pull_task.iter_pages(posted_from=self.state.posted_from() if incremental else None))
+            finally:
+                # Segment archives buffer notices per day until the run ends
+                self.archive_task.flush()
+            if rebuild:
+                # Searches keep using the live collection until this swap
+                rebuild.commit()
+        except Exception:
+            if rebuild:
+                rebuild.abort()
+            raise
+        busy = ", ".join(f"{name} {stats[name]['busy_seconds']:.1f}s" for name in ("archive", "preprocess", "embed"))
+        print(f"⏱️ Pipeline finished in {pipeline.wall_seconds:.1f}s ({busy})")
+        self.store.report_cache_stats()
+
+        self._advance_watermark(seen)
+        return len(seen), counts["embedded"]
 
-        print("🧠 Embedding and storing in Milvus...")
-        self.store.overwrite_documents(processed_docs)
-        print("✅ Stored active solicitations in Milvus.")
+    def _advance_watermark(self, opportunities):
+        # Never move past pages we failed to fetch, or their records would be skipped for good
+        if self.pull_task.failed_pages:
+            print("⚠️ Some pages failed to download; keeping the previous watermark.")
+        else:
+            self.state.advance(opportunities)
+        self.state.save()
@@ -0,0 +1,177 @@
+"""Cheap first-stage scoring of vector-search candidates before LLM evaluation."""
+
+from __future__ import annotations
+
+import os
+import re
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from utils.rag_helpers import _parse_date
+
+FEATURES = ("similarity", "naics", "set_aside", "deadline", "award")
+
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    "similarity": 0.35,
+    "naics": 0.25,
+    "set_aside": 0.2,
+    "deadline": 0.1,
+    "award": 0.1,
+}
+
+# Phrases in a free-text company profile -> set-aside terms they qualify for
+PROFILE_SET_ASIDE_TERMS = {
+    "service disabled veteran": ["service-disabled veteran", "sdvosb"],
+    "service-disabled veteran": ["service-disabled veteran", "sdvosb"],
+    "sdvosb": ["service-disabled veteran", "sdvosb"],
+    "veteran": ["veteran"],
+    "small business": ["small business"],
+    "woman": ["women-owned", "wosb"],
+    "women": ["women-owned", "wosb"],
+    "hubzone": ["hubzone"],
+    "8(a)": ["8(a)"],
+}
+
+NAICS_PATTERN = re.compile(r"\b\d{6}\b")
+DEADLINE_HORIZON_DAYS = 30.0
+# Vector candidates fetched per LLM evaluation, so the scorer cuts an order of magnitude
+CASCADE_RATIO = 10
+MAX_CANDIDATE_POOL = 1000
+
+
+def profile_naics(company_profile: str, naics_codes: Optional[Iterable[str]] = None) -> List[str]:
+    """NAICS codes given explicitly plus any six-digit codes in the profile text."""
+    codes = [c.strip() for c in naics_codes or [] if c.strip()]
+    codes += NAICS_PATTERN.findall(company_profile or "")
+    return list(dict.fromkeys(codes))
+
+
+def profile_set_asides(company_profile: str, setasides: Optional[Iterable[str]] = None) -> List[str]:
+    """Set-aside terms given explicitly plus those implied by the profile text."""
+    terms = [s.strip().lower() for s in setasides or [] if s.strip()]
+    text = (company_profile or "").lower()
+    for phrase, implied in PROFILE_SET_ASIDE_TERMS.items():
+        if phrase in text:
+            terms += implied
+    return list(dict.fromkeys(terms))
+
+
+def _parse_amount(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    digits = re.sub(r"[^0-9.]", "", str(value or ""))
+    try:
+        return float(digits) if digits else 0.0
+    except ValueError:
+        return 0.0
+
+
+def _min_max(values: np.ndarray) -> np.ndarray:
+    span = values.max() - values.min() if values.size else 0.0
+    if span <= 0:
+        return np.ones_like(values) if values.size and values.max() > 0 else np.zeros_like(values)
+    return (values - values.min()) / span
+
+
+class CandidateScorer:
+    """Deterministic feature scorer used as the first stage of a ranking cascade.
+
+    Every feature is scaled to ``[0, 1]`` and computed with numpy over the
+    whole candidate set at once:
+
+    - ``similarity``: vector distance, inverted and min-max scaled
+    - ``naics``: 1 for an exact profile NAICS match, 0.5 for the same
+      4-digit industry group
+    - ``set_aside``: 1 when the set-aside matches a profile term, 0.3 when
+      the notice is unrestricted, 0 for a set-aside the company lacks
+    - ``deadline``: days remaining, saturating at 30; 0 once expired
+    - ``award``: log award amount, min-max scaled
+
+    The weighted sum decides which candidates are worth an LLM call.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None) -> None:
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+
+    def features(
+        self,
+        candidates: Sequence[Dict],
+        distances: Sequence[float],
+        naics_codes: Sequence[str],
+        set_asides: Sequence[str],
+        now: Optional[datetime] = None,
+    ) -> np.ndarray:
+        """Return an ``(n, len(FEATURES))`` matrix of feature values."""
+        now = now or datetime.now(timezone.utc)
+        metas = [c.get("metadata", {}) for c in candidates]
+        n = len(metas)
+
+        dist = np.asarray(distances, dtype=float)
+        similarity = 1.0 - _min_max(dist) if n > 1 else np.ones(n)
+
+        codes = np.array([str(m.get("naics_code") or m.get("naics") or "") for m in metas], dtype=object)
+        exact = np.isin(codes, list(naics_codes)) if naics_codes else np.zeros(n, dtype=bool)
+        groups = {c[:4] for c in naics_codes}
+        group = np.array([c[:4] in groups and bool(c) for c in codes], dtype=bool)
+        naics = np.where(exact, 1.0, np.where(group, 0.5, 0.0))
+
+        set_aside_text = [str(m.get("set_aside") or m.get("setaside") or "").lower() for m in metas]
+        restricted = np.array([bool(t) and t != "none" for t in set_aside_text])
+        matched = np.array([any(term in t for term in set_asides) for t in set_aside_text], dtype=bool)
+        set_aside = np.where(matched, 1.0, np.where(restricted, 0.0, 0.3))
+
+        deadlines = [_parse_date(m.get("response_deadline") or "") for m in metas]
+        days = np.array(
+            [(d - now).total_seconds() / 86400 if d else np.nan for d in deadlines], dtype=float
+        )
+        # Unknown deadlines get a neutral score; expired ones get nothing
+        deadline = np.where(np.isnan(days), 0.5, np.clip(days / DEADLINE_HORIZON_DAYS, 0.0, 1.0))
+
+        amounts = np.array([_parse_amount(m.get("award_amount")) for m in metas], dtype=float)
+        award = _min_max(np.log10(amounts + 1.0))
+
+        return np.column_stack([similarity, naics, set_aside, deadline, award]) if n else np.zeros((0, len(FEATURES)))
+
+    def score(self, features: np.ndarray) -> np.ndarray:
+        weights = np.array([self.weights[name] for name in FEATURES], dtype=float)
+        return features @ weights
+
+    def select(
+        self,
+        candidates: Sequence[Dict],
+        distances: Sequence[float],
+        cutoff: int,
+        naics_codes: Sequence[str] = (),
+        set_asides: Sequence[str] = (),
+        now: Optional[datetime] = None,
+    ) -> List[Dict]:
+        """Return the ``cutoff`` best candidates, each annotated with its feature score."""
+        if not candidates:
+            return []
+        scores = self.score(self.features(candidates, distances, naics_codes, set_asides, now))
+        # Stable sort on the negated score keeps vector order for ties
+        order = np.argsort(-scores, kind="stable")[:cutoff]
+        selected = []
+        for i in order:
+            candidate = dict(candidates[i])
+            candidate["feature_score"] = float(scores[i])
+            selected.append(candidate)
+        return selected
+
+
+def default_cutoff(top_k: int) -> int:
+    """How many candidates to promote to LLM scoring (``RANK_CASCADE_CUTOFF``).
+
+    Defaults to ``top_k``: one LLM call per requested result, against the
+    ``10 * top_k`` calls made before the cascade existed.
+    """
+    configured = os.getenv("RANK_CASCADE_CUTOFF")
+    return int(configured) if configured else top_k
+
+
+def candidate_pool(cutoff: int) -> int:
+    """How many vector hits to score for ``cutoff`` LLM evaluations (``CASCADE_RATIO`` times as many)."""
+    return min(cutoff * CASCADE_RATIO, MAX_CANDIDATE_POOL)
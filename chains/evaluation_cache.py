@@ -0,0 +1,72 @@
+"""Persistent cache of LLM opportunity evaluations."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+from utils.sqlite_cache import SQLiteCache
+
+DEFAULT_CACHE_PATH = os.path.join("vector_store", "evaluation_cache.sqlite")
+DEFAULT_MAX_ENTRIES = 20_000
+DEFAULT_MAX_AGE_DAYS = 30
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EvaluationCache:
+    """Evaluations keyed by model, prompt, company profile and notice content.
+
+    The key is ``<model>:<sha256(prompt)>:<sha256(profile)>:<sha256(notice)>``
+    where the notice hash covers exactly the fields substituted into the
+    prompt, so editing the prompt file, switching models, rewording the
+    profile or a notice changing upstream all miss the cache.
+    """
+
+    def __init__(self, cache: SQLiteCache, model_name: str, prompt_template: str) -> None:
+        self.cache = cache
+        self.model_name = model_name
+        self.prompt_hash = _sha256(prompt_template)
+
+    def key(self, company_profile: str, notice_fields: Dict[str, str]) -> str:
+        notice_hash = _sha256(json.dumps(notice_fields, sort_keys=True, default=str))
+        return f"{self.model_name}:{self.prompt_hash}:{_sha256(company_profile)}:{notice_hash}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        blob = self.cache.get(key)
+        return json.loads(blob) if blob is not None else None
+
+    def put(self, key: str, evaluation: str, match_score: int, **details) -> None:
+        """Store an evaluation; ``details`` (e.g. sub-scores) must be JSON-serialisable."""
+        payload = {"evaluation": evaluation, "match_score": match_score, **details}
+        self.cache.put(key, json.dumps(payload).encode("utf-8"))
+
+    def stats(self):
+        return self.cache.stats()
+
+
+def default_evaluation_cache(model_name: str, prompt_template: str) -> EvaluationCache:
+    """Return an evaluation cache configured from the environment.
+
+    ``EVAL_CACHE_PATH``, ``EVAL_CACHE_MAX_ENTRIES`` and
+    ``EVAL_CACHE_MAX_AGE_DAYS`` override the location and eviction policy.
+    """
+    max_age_days = float(os.getenv("EVAL_CACHE_MAX_AGE_DAYS") or DEFAULT_MAX_AGE_DAYS)
+    cache = SQLiteCache(
+        os.getenv("EVAL_CACHE_PATH") or DEFAULT_CACHE_PATH,
+        max_entries=int(os.getenv("EVAL_CACHE_MAX_ENTRIES") or DEFAULT_MAX_ENTRIES),
+        max_age=max_age_days * 86400,
+    )
+    return EvaluationCache(cache, model_name, prompt_template)
+
+
+def format_evaluation_cache_stats(stats) -> str:
+    return (
+        f"🗃️ Evaluation cache: {stats['hits']} hits / {stats['misses']} misses "
+        f"({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries, "
+        f"{stats['evictions']} evicted"
+    )
@@ -1,24 +1,80 @@
-from typing import List, Dict, Tuple
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 import re
 from .base_chain import BaseChain
+from .evaluation_cache import EvaluationCache, default_evaluation_cache, format_evaluation_cache_stats
+from .structured_evaluation import (
+    EVALUATION_SCHEMA,
+    EvaluationParseError,
+    ScoringMetrics,
+    format_structured_evaluation,
+    parse_structured_evaluation,
+)
 from utils.prompt_loader import load_prompt
 
 
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_EVAL_TIMEOUT = 180.0
+QUEUED_POLL_SECONDS = 0.1
+
+# on_progress(completed, total, result, current_top_k); result is None for failures
+ProgressCallback = Callable[[int, int, Optional[Dict], List[Dict]], None]
+
+
 class OpportunityMatchingChain(BaseChain):
-    def __init__(self, model_name: str = "llama3"):
-        self.llm = ChatOllama(model=model_name)
-        self.prompt_template = load_prompt("opportunity_evaluation_prompt.txt")
+    """Score opportunities against a company profile with an Ollama model.
+
+    Evaluations run on a thread pool with at most ``max_concurrency``
+    generations in flight (``LLM_MAX_CONCURRENCY``, default 4). Each request
+    is bounded by ``timeout`` seconds (``LLM_EVAL_TIMEOUT``); timed-out or
+    failed items are skipped rather than failing the whole ranking.
+    Finished evaluations are kept in a persistent ``EvaluationCache`` so
+    re-running the same profile over unchanged notices skips the LLM.
+
+    By default Ollama constrains decoding to ``EVALUATION_SCHEMA`` (score,
+    sub-scores, rationale). Output that still fails validation, e.g. a
+    generation cut short, gets at most ``max_repairs`` repair calls before
+    falling back to scraping a score from the raw text; ``metrics`` counts each outcome. Set
+    ``LLM_EVAL_FORMAT=text`` for the original free-text evaluations.
+    """
+
+    cache: Optional[EvaluationCache] = None
+
+    def __init__(self, model_name: str = "llama3", max_concurrency: Optional[int] = None,
+                 timeout: Optional[float] = None, cache: Optional[EvaluationCache] = None,
+                 use_cache: bool = True, structured: Optional[bool] = None, max_repairs: int = 1):
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY") or DEFAULT_MAX_CONCURRENCY)
+        self.timeout = timeout or float(os.getenv("LLM_EVAL_TIMEOUT") or DEFAULT_EVAL_TIMEOUT)
+        if structured is None:
+            structured = (os.getenv("LLM_EVAL_FORMAT") or "json").lower() == "json"
+        self.structured = structured
+        self.max_repairs = max_repairs
+        self.metrics = ScoringMetrics()
+        self.llm = ChatOllama(
+            model=model_name,
+            format=EVALUATION_SCHEMA if structured else None,
+            client_kwargs={"timeout": self.timeout},
+        )
+        prompt_name = "opportunity_evaluation_json_prompt.txt" if structured else "opportunity_evaluation_prompt.txt"
+        self.prompt_template = load_prompt(prompt_name)
         self.prompt = PromptTemplate.from_template(self.prompt_template)
+        if use_cache:
+            self.cache = cache or default_evaluation_cache(model_name, self.prompt_template)
         self.output_parser = StrOutputParser()
         
         # Create the evaluation chain
         self.evaluation_chain = self.prompt | self.llm | self.output_parser
+        if structured:
+            repair_prompt = PromptTemplate.from_template(load_prompt("evaluation_repair_prompt.txt"))
+            self.repair_chain = repair_prompt | self.llm | self.output_parser
     
-    def evaluate_opportunity(self, opportunity: Dict, company_profile: str) -> Dict:
-        """Evaluate a single opportunity against the company profile."""
+    def _notice_fields(self, opportunity: Dict) -> Dict[str, str]:
+        """The opportunity fields substituted into the evaluation prompt."""
         
         # Extract metadata for the prompt
         metadata = opportunity.get('metadata', {})
@@ -28,9 +84,7 @@ class OpportunityMatchingChain(BaseChain):
         if 'Description: ' in description:
             description = description.split('Description: ', 1)[1].strip()
         
-        # Create the evaluation
-        evaluation = self.evaluation_chain.invoke({
-            'company_profile': company_profile,
+        return {
             'title': metadata.get('title', ''),
             'department': metadata.get('department', ''),
             'office': metadata.get('office', ''),
@@ -42,41 +96,204 @@ class OpportunityMatchingChain(BaseChain):
             'response_deadline': metadata.get('response_deadline', ''),
             'solicitation_number': metadata.get('solicitation_number', ''),
             'description': description
-        })
-        
-        # Parse the match score from the evaluation
-        match_score = self._extract_match_score(evaluation)
+        }
+
+    def _lookup(self, opportunity: Dict, company_profile: str, notice_fields: Dict) -> Tuple[Optional[str], Optional[Dict]]:
+        """Return ``(cache_key, cached_result)``; both are None without a cache."""
+        if self.cache is None:
+            return None, None
+        cache_key = self.cache.key(company_profile, notice_fields)
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return cache_key, None
+        return cache_key, {
+            'opportunity': opportunity,
+            'metadata': opportunity.get('metadata', {}),
+            'cached': True,
+            **cached,
+        }
+
+    def _finish(self, opportunity: Dict, cache_key: Optional[str], raw: str) -> Dict:
+        """Parse a finished generation into a result and cache it."""
+        if self.structured:
+            details = self._parse_with_repair(raw)
+        else:
+            # Parse the match score from the evaluation
+            details = {'evaluation': raw, 'match_score': self._extract_match_score(raw)}
+        if cache_key is not None and not details.get('parse_failed'):
+            self.cache.put(cache_key, **details)
         
         return {
             'opportunity': opportunity,
-            'evaluation': evaluation,
-            'match_score': match_score,
-            'metadata': metadata
+            'metadata': opportunity.get('metadata', {}),
+            'cached': False,
+            **details,
         }
+
+    def evaluate_opportunity(self, opportunity: Dict, company_profile: str) -> Dict:
+        """Evaluate a single opportunity against the company profile."""
+        notice_fields = self._notice_fields(opportunity)
+        cache_key, cached = self._lookup(opportunity, company_profile, notice_fields)
+        if cached is not None:
+            return cached
+        
+        # Create the evaluation
+        raw = self.evaluation_chain.invoke({'company_profile': company_profile, **notice_fields})
+        return self._finish(opportunity, cache_key, raw)
+
+    def stream_evaluation(self, opportunity: Dict, company_profile: str) -> Iterator[Tuple[str, object]]:
+        """Evaluate one opportunity, yielding output as it is generated.
+
+        Yields ``("token", text)`` for each generated chunk, then a single
+        ``("result", result)`` with the same dict ``evaluate_opportunity``
+        returns. Cached evaluations yield only the result.
+        """
+        notice_fields = self._notice_fields(opportunity)
+        cache_key, cached = self._lookup(opportunity, company_profile, notice_fields)
+        if cached is not None:
+            yield "result", cached
+            return
+        
+        chunks = []
+        for chunk in self.evaluation_chain.stream({'company_profile': company_profile, **notice_fields}):
+            chunks.append(chunk)
+            yield "token", chunk
+        yield "result", self._finish(opportunity, cache_key, "".join(chunks))
+
+    def _parse_with_repair(self, raw: str) -> Dict:
+        """Validate JSON output, spending at most ``max_repairs`` calls on fixing it."""
+        attempt = raw
+        attempts = [raw]
+        for repair in range(self.max_repairs + 1):
+            try:
+                parsed = parse_structured_evaluation(attempt)
+            except EvaluationParseError as e:
+                if repair == self.max_repairs:
+                    print(f"⚠️ Could not parse evaluation after {repair} repair(s): {e}")
+                    break
+                attempt = self.repair_chain.invoke({'raw': attempt})
+                attempts.append(attempt)
+                continue
+            self.metrics.record('repaired' if repair else 'parsed')
+            return {
+                'evaluation': format_structured_evaluation(parsed),
+                'match_score': parsed['score'],
+                'sub_scores': parsed['sub_scores'],
+                'rationale': parsed['rationale'],
+            }
+        self.metrics.record('parse_failures')
+        return {'evaluation': raw, 'match_score': self._recover_score(attempts), 'parse_failed': True}
+
+    def _recover_score(self, attempts: List[str]) -> Optional[int]:
+        """Salvage an overall score from outputs that failed validation.
+
+        Returns ``None`` rather than 0 when no attempt contains a score, so
+        the opportunity is reported as unscored instead of ranked last.
+        """
+        for text in reversed(attempts):
+            match = (re.search(r'"score"\s*:\s*(\d+)', text or '')
+                     or re.search(r'MATCH SCORE:\s*(\d+)', text or '', re.IGNORECASE)
+                     or re.search(r'(\d+)/100', text or ''))
+            if match:
+                return min(100, int(match.group(1)))
+        return None
     
-    def rank_opportunities(self, opportunities: List[Dict], company_profile: str, top_k: int = 10) -> List[Dict]:
-        """Rank opportunities based on how well they match the company profile."""
+    def iter_evaluations(self, opportunities: List[Dict], company_profile: str) -> Iterator[Tuple[Dict, Optional[Dict]]]:
+        """Yield ``(opportunity, result)`` pairs in completion order.
+
+        ``result`` is ``None`` when the evaluation failed or exceeded the
+        per-item timeout. A timed-out generation cannot be interrupted from
+        here, but its HTTP request is bounded by the same timeout, so the
+        worker is freed shortly afterwards. Until then a replacement may wait
+        for that worker, so each timeout counts from when the evaluation
+        actually starts, and iteration ends without joining abandoned workers.
+        """
+        queue = list(reversed(opportunities))
+        started: Dict[int, float] = {}
+
+        def evaluate(slot: int, opportunity: Dict) -> Dict:
+            started[slot] = time.monotonic()
+            return self.evaluate_opportunity(opportunity, company_profile)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            pending = {}
+            submitted = 0
+            while queue or pending:
+                while queue and len(pending) < self.max_concurrency:
+                    opportunity = queue.pop()
+                    pending[executor.submit(evaluate, submitted, opportunity)] = (opportunity, submitted)
+                    submitted += 1
+
+                # Queued evaluations have no deadline yet, so poll until they start
+                deadlines = [started[slot] + self.timeout for _, slot in pending.values() if slot in started]
+                timeout = min(deadlines, default=time.monotonic() + self.timeout) - time.monotonic()
+                if len(deadlines) < len(pending):
+                    timeout = min(timeout, QUEUED_POLL_SECONDS)
+                done, _ = wait(pending, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+                for future in done:
+                    opportunity, slot = pending.pop(future)
+                    started.pop(slot, None)
+                    try:
+                        yield opportunity, future.result()
+                    except Exception as e:
+                        print(f"⚠️ Error evaluating opportunity {self._title(opportunity)}: {e}")
+                        yield opportunity, None
+
+                now = time.monotonic()
+                for future, (opportunity, slot) in list(pending.items()):
+                    if slot in started and now - started[slot] >= self.timeout:
+                        del pending[future]
+                        print(f"⏱️ Timed out after {self.timeout:.0f}s evaluating {self._title(opportunity)}")
+                        yield opportunity, None
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def rank_opportunities(self, opportunities: List[Dict], company_profile: str, top_k: int = 10,
+                           on_progress: Optional[ProgressCallback] = None) -> List[Dict]:
+        """Rank opportunities based on how well they match the company profile.
+
+        ``on_progress`` is called after every completed evaluation with the
+        running top ``top_k``, so callers can show results incrementally.
+        Evaluations whose score could not be recovered are left out of the
+        ranking and collected in ``self.unscored``.
+        """
         
-        print(f"🔍 Evaluating {len(opportunities)} opportunities against company profile...")
+        total = len(opportunities)
+        self.unscored = []
+        print(f"🔍 Evaluating {total} opportunities against company profile "
+              f"({self.max_concurrency} concurrent)...")
         
         evaluated_opportunities = []
+        completed = 0
         
-        for i, opportunity in enumerate(opportunities):
-            if i % 10 == 0:
-                print(f"📊 Progress: {i+1}/{len(opportunities)} opportunities evaluated")
-            
-            try:
-                result = self.evaluate_opportunity(opportunity, company_profile)
+        for opportunity, result in self.iter_evaluations(opportunities, company_profile):
+            completed += 1
+            if result is not None and result['match_score'] is None:
+                self.unscored.append(result)
+            elif result is not None:
                 evaluated_opportunities.append(result)
-            except Exception as e:
-                print(f"⚠️ Error evaluating opportunity {opportunity.get('metadata', {}).get('title', 'Unknown')}: {e}")
-                continue
+                # Sort by match score (highest first); stable, so ties keep completion order
+                evaluated_opportunities.sort(key=lambda x: x['match_score'], reverse=True)
+            if on_progress:
+                on_progress(completed, total, result, evaluated_opportunities[:top_k])
+            elif completed % 10 == 0 or completed == total:
+                print(f"📊 Progress: {completed}/{total} opportunities evaluated")
         
-        # Sort by match score (highest first)
-        evaluated_opportunities.sort(key=lambda x: x['match_score'], reverse=True)
+        if self.cache is not None:
+            print(format_evaluation_cache_stats(self.cache.stats()))
+        if self.structured:
+            print(self.metrics.format())
+        if self.unscored:
+            titles = ", ".join(self._title(r['opportunity']) for r in self.unscored)
+            print(f"⚠️ {len(self.unscored)} opportunities left unscored (unparseable output): {titles}")
         
         # Return top k opportunities
         return evaluated_opportunities[:top_k]
+
+    @staticmethod
+    def _title(opportunity: Dict) -> str:
+        return opportunity.get('metadata', {}).get('title', 'Unknown')
     
     def _extract_match_score(self, evaluation: str) -> int:
         """Extract the match score from the evaluation text."""
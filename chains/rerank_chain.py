@@ -1,22 +1,207 @@
+import json
+import math
+import os
+import re
+from typing import Dict, List, Sequence
+
 from chains.base_chain import BaseChain
 from langchain.prompts import PromptTemplate
 from langchain.llms import Ollama
-from langchain_core.runnables import RunnableSequence
 from utils.prompt_loader import load_prompt
 
+CHARS_PER_TOKEN = 4
+DEFAULT_NUM_CTX = 4096
+DEFAULT_WINDOW_TOKENS = 2800
+DEFAULT_DOC_TOKENS = 300
+DEFAULT_MAX_CANDIDATES = 30
+# Tokens for the "[id] " label and blank-line separator around each document
+LABEL_TOKENS = 4
+# Tokens for the " …" that truncate_to_tokens appends
+ELLIPSIS_TOKENS = 1
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)."""
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Cut ``text`` to roughly ``budget`` tokens, on a word boundary."""
+    text = " ".join((text or "").split())
+    limit = budget * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(" ", 1)[0]
+    return cut + " …"
+
+
+def pack_windows(token_counts: Sequence[int], window_budget: int) -> List[List[int]]:
+    """Greedily pack items, in order, into windows whose token sum fits the budget.
+
+    Every window holds at least one item, even if that item alone is over
+    budget, so the result always covers every index.
+    """
+    windows: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for i, tokens in enumerate(token_counts):
+        if current and used + tokens > window_budget:
+            windows.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += tokens
+    if current:
+        windows.append(current)
+    return windows
+
+
+def parse_ranking(text: str, count: int) -> List[Dict]:
+    """Parse an LLM listwise ranking into ``[{"id", "score"}]`` covering all ``count`` ids.
+
+    Accepts the requested JSON, or falls back to the order in which ``[id]``
+    labels appear. Ids the model left out follow in their original order
+    with a score of 0.
+    """
+    ranking: List[Dict] = []
+    seen = set()
+
+    def add(idx, score):
+        if isinstance(idx, int) and 0 <= idx < count and idx not in seen:
+            seen.add(idx)
+            ranking.append({"id": idx, "score": float(score)})
+
+    match = re.search(r"\{.*\}", text or "", re.DOTALL)
+    parsed = None
+    if match:
+        try:
+            parsed = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            parsed = None
+    if isinstance(parsed, dict) and isinstance(parsed.get("ranking"), list):
+        for item in parsed["ranking"]:
+            if isinstance(item, dict):
+                try:
+                    add(int(item.get("id")), item.get("score") or 0)
+                except (TypeError, ValueError):
+                    continue
+    else:
+        labels = [int(m) for m in re.findall(r"\[(\d+)\]", text or "")]
+        for position, idx in enumerate(labels):
+            # Without scores, derive one from the position in the list
+            add(idx, max(0, 100 - position * 100 / max(count, 1)))
+
+    for idx in range(count):
+        add(idx, 0)
+    return ranking
+
+
 class RerankChain(BaseChain):
-    def __init__(self):
-        self.llm = Ollama(model="llama3")
-        prompt_text = load_prompt("rerank_prompt.txt")
+    """Listwise LLM reranker with bounded prompt size and call count.
+
+    Each document is truncated to ``doc_tokens``; documents are packed into
+    windows of at most ``window_tokens`` and every window is ranked in one
+    call. Window winners advance to the next round (a tournament) until the
+    survivors fit in a single window, whose ranking is the final order.
+    Input beyond ``max_candidates`` is dropped, so the number of LLM calls is
+    bounded regardless of how many search results come in. Defaults come
+    from ``RERANK_NUM_CTX``, ``RERANK_WINDOW_TOKENS``, ``RERANK_DOC_TOKENS``
+    and ``RERANK_MAX_CANDIDATES``.
+    """
+
+    def __init__(self, window_tokens: int = None, doc_tokens: int = None, max_candidates: int = None):
+        num_ctx = int(os.getenv("RERANK_NUM_CTX") or DEFAULT_NUM_CTX)
+        self.window_tokens = window_tokens or int(os.getenv("RERANK_WINDOW_TOKENS") or DEFAULT_WINDOW_TOKENS)
+        self.doc_tokens = doc_tokens or int(os.getenv("RERANK_DOC_TOKENS") or DEFAULT_DOC_TOKENS)
+        self.max_candidates = max_candidates or int(os.getenv("RERANK_MAX_CANDIDATES") or DEFAULT_MAX_CANDIDATES)
+        self.llm = Ollama(model="llama3", num_ctx=num_ctx, temperature=0)
+        prompt_text = load_prompt("listwise_rerank_prompt.txt")
 
         self.prompt = PromptTemplate(
-            input_variables=["query", "documents"],
+            input_variables=["query", "documents", "count"],
             template=prompt_text
         )
 
         self.chain = self.prompt | self.llm
+        self.calls = 0
+
+    def _format(self, texts: Sequence[str]) -> str:
+        return "\n\n".join(f"[{i}] {text}" for i, text in enumerate(texts))
+
+    def rank_window(self, query: str, texts: Sequence[str]) -> List[Dict]:
+        """Rank one window of (already truncated) texts with a single LLM call."""
+        if len(texts) == 1:
+            return [{"id": 0, "score": 100.0}]
+        self.calls += 1
+        response = self.chain.invoke({"query": query, "documents": self._format(texts), "count": len(texts)})
+        return parse_ranking(response, len(texts))
+
+    @staticmethod
+    def _keeps(sizes: Sequence[int], want: int) -> List[int]:
+        """How many of each window's ranked members advance to the next round.
+
+        The top ``want`` of each window advance, which keeps the overall top
+        ``want`` alive; windows too small to shrink that way keep their top
+        half, topped up so the round never leaves fewer than ``want``.
+        """
+        if len(sizes) == 1:
+            return list(sizes)
+        if any(size > want for size in sizes):
+            return [min(want, size) for size in sizes]
+        keeps = [math.ceil(size / 2) for size in sizes]
+        deficit = want - sum(keeps)
+        for i, size in enumerate(sizes):
+            if deficit <= 0:
+                break
+            extra = min(size - keeps[i], deficit)
+            keeps[i] += extra
+            deficit -= extra
+        return keeps
+
+    def rerank(self, query: str, documents: Sequence, top_n: int = 5) -> List[Dict]:
+        """Return ``[{"rank", "score", "document"}]`` for the best ``top_n`` documents."""
+        candidates = list(documents)[:self.max_candidates]
+        if not candidates:
+            return []
+        # At least two documents must fit per window so every round shrinks
+        doc_tokens = min(self.doc_tokens, self.window_tokens // 2 - LABEL_TOKENS - ELLIPSIS_TOKENS)
+        texts = [truncate_to_tokens(doc.page_content, doc_tokens) for doc in candidates]
+        tokens = [estimate_tokens(t) + LABEL_TOKENS for t in texts]
+        want = min(top_n, len(candidates))
+
+        alive = list(range(len(candidates)))
+        scores = {i: 0.0 for i in alive}
+        while True:
+            windows = pack_windows([tokens[i] for i in alive], self.window_tokens)
+            if len(windows) > 1 and all(len(w) == 1 for w in windows):
+                # One-document windows can never shrink; pair them up even
+                # though that goes over budget, so the tournament terminates
+                windows = [sum(windows[i:i + 2], []) for i in range(0, len(windows), 2)]
+            keeps = self._keeps([len(w) for w in windows], want)
+            survivors = []
+            for window, keep in zip(windows, keeps):
+                members = [alive[j] for j in window]
+                ranking = self.rank_window(query, [texts[i] for i in members])
+                for entry in ranking[:keep]:
+                    idx = members[entry["id"]]
+                    scores[idx] = entry["score"]
+                    survivors.append(idx)
+            alive = survivors
+            if len(windows) == 1:
+                break
+            if len(alive) <= want:
+                # Too few left for another round to shrink; order by window score
+                alive.sort(key=lambda i: -scores[i])
+                break
+
+        return [
+            {"rank": rank, "score": scores[idx], "document": candidates[idx]}
+            for rank, idx in enumerate(alive[:top_n], 1)
+        ]
 
-    def execute(self, query, documents):
-        combined_docs = "\n\n".join([doc.page_content for doc in documents])
-        print("🧠 Asking LLM to rerank based on AAyeAye qualifications...")
-        return self.chain.invoke({"query": query, "documents": combined_docs})
+    def execute(self, query, documents, top_n: int = 5):
+        print(f"🧠 Asking LLM to rerank {min(len(documents), self.max_candidates)} results "
+              f"(≤{self.window_tokens} tokens per window)...")
+        self.calls = 0
+        ranked = self.rerank(query, documents, top_n=top_n)
+        print(f"🧠 Reranked with {self.calls} LLM call(s)")
+        return ranked
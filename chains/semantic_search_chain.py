@@ -4,6 +4,9 @@ class SemanticSearchChain(BaseChain):
     def __init__(self, vector_index):
         self.index = vector_index
 
-    def execute(self, query, k=10):
+    def execute(self, query, k=10, expr=None):
         print(f"🔎 Performing semantic search for: '{query}'")
+        if expr:
+            print(f"🔎 Filtering in Milvus: {expr}")
+            return self.index.similarity_search(query, k=k, expr=expr)
         return self.index.similarity_search(query, k=k)
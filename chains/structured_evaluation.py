@@ -0,0 +1,113 @@
+"""Schema, parsing and metrics for JSON-formatted opportunity evaluations."""
+
+from __future__ import annotations
+
+import json
+import threading
+from typing import Dict
+
+SUB_SCORES = (
+    "set_aside_match",
+    "capability_alignment",
+    "naics_relevance",
+    "competition_level",
+    "contract_value",
+    "geographic_fit",
+)
+
+_SCORE_SCHEMA = {"type": "integer", "minimum": 0, "maximum": 100}
+
+# JSON schema passed to Ollama's ``format`` for schema-constrained decoding
+EVALUATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": _SCORE_SCHEMA,
+        "sub_scores": {
+            "type": "object",
+            "properties": {name: _SCORE_SCHEMA for name in SUB_SCORES},
+            "required": list(SUB_SCORES),
+        },
+        "rationale": {"type": "string"},
+    },
+    "required": ["score", "sub_scores", "rationale"],
+}
+
+
+class EvaluationParseError(ValueError):
+    """The model output does not match the evaluation schema."""
+
+
+def _score(value, name: str) -> int:
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise EvaluationParseError(f"{name} is not a number: {value!r}")
+    try:
+        number = float(value)
+    except ValueError:
+        raise EvaluationParseError(f"{name} is not a number: {value!r}") from None
+    return int(round(min(100.0, max(0.0, number))))
+
+
+def parse_structured_evaluation(text: str) -> Dict:
+    """Validate a JSON evaluation and return ``{"score", "sub_scores", "rationale"}``.
+
+    Scores are clamped to 0-100. Missing sub-scores are an error; unknown
+    keys are ignored.
+    """
+    try:
+        data = json.loads(text)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise EvaluationParseError(f"invalid JSON: {e}") from None
+    if not isinstance(data, dict):
+        raise EvaluationParseError("expected a JSON object")
+    if "score" not in data:
+        raise EvaluationParseError("missing 'score'")
+    sub_scores = data.get("sub_scores")
+    if not isinstance(sub_scores, dict):
+        raise EvaluationParseError("missing 'sub_scores' object")
+    missing = [name for name in SUB_SCORES if name not in sub_scores]
+    if missing:
+        raise EvaluationParseError(f"missing sub-scores: {', '.join(missing)}")
+    rationale = data.get("rationale", "")
+    if not isinstance(rationale, str):
+        raise EvaluationParseError("'rationale' is not a string")
+    return {
+        "score": _score(data["score"], "score"),
+        "sub_scores": {name: _score(sub_scores[name], name) for name in SUB_SCORES},
+        "rationale": rationale.strip(),
+    }
+
+
+def format_structured_evaluation(parsed: Dict) -> str:
+    """Render a parsed evaluation as the text shown to users."""
+    lines = [f"MATCH SCORE: {parsed['score']}/100"]
+    for name, value in parsed["sub_scores"].items():
+        lines.append(f"- {name.replace('_', ' ').title()}: {value}/100")
+    if parsed["rationale"]:
+        lines.append("")
+        lines.append(parsed["rationale"])
+    return "\n".join(lines)
+
+
+class ScoringMetrics:
+    """Thread-safe counters for structured evaluation outcomes."""
+
+    FIELDS = ("parsed", "repaired", "parse_failures")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counts = {name: 0 for name in self.FIELDS}
+
+    def record(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+    def format(self) -> str:
+        counts = self.snapshot()
+        return (
+            f"🧾 Structured scoring: {counts['parsed']} parsed, {counts['repaired']} repaired, "
+            f"{counts['parse_failures']} parse failures"
+        )
@@ -27,6 +27,7 @@ def main(path: str):
         {
             "description_key": enriched.get("description_data_key"),
             "attachment_keys": enriched.get("attachment_keys", []),
+            "failed_links": enriched.get("failed_links", []),
         },
         indent=2,
     ))
@@ -1,28 +1,54 @@
+import os
+from datetime import datetime, timezone
+
 from llama_api_client import LlamaAPIClient
-from langchain_ollama.embeddings import OllamaEmbeddings
+from rag.milvus_collection import matches_filters
 from rag.milvus_store import MilvusStore
 from utils.prompt_loader import load_prompt
-from utils.rag_helpers import filter_valid_opportunities
+from utils.rag_helpers import ACTIONABLE_TYPES, filter_valid_opportunities
+
+MODEL = "Llama-4-Maverick-17B-128E-Instruct-FP8"
+
 
 class LlamaRAG:
-    def __init__(self, vectorstore_path="vector_store", api_key=None):
+    def __init__(self, vectorstore_path="vector_store", api_key=None, store=None):
         self.llm_client = LlamaAPIClient(api_key=api_key)
-        self.embed_model = OllamaEmbeddings(model="nomic-embed-text")
-        self.vectorstore = MilvusStore().index
+        # Reuse the caller's store (and its cached embedder) when given
+        self.store = store or MilvusStore(
+            host=os.getenv("MILVUS_HOST") or "localhost",
+            port=os.getenv("MILVUS_PORT") or "19530",
+        )
+        self.embed_model = self.store.embed_model
+        self.vectorstore = self.store.index
         self.prompt_template = load_prompt("rag_prompt.txt")
 
     def retrieve_docs(self, query, k=10, setasides=None, naics_codes=None):
         """Retrieve documents matching the query with optional filters."""
-        docs = self.vectorstore.similarity_search(query, k=k * 4)
+        if self.store.supports_filters():
+            # Milvus applies every filter, so one query returns k usable notices
+            docs = self.store.filtered_search(
+                query,
+                k=k,
+                setasides=setasides,
+                naics_codes=naics_codes,
+                notice_types=ACTIONABLE_TYPES,
+                deadline_after=datetime.now(timezone.utc),
+            )
+            return self._actionable(docs, k)
 
-        if setasides:
-            allowed_setaside = {sa.lower() for sa in setasides}
-            docs = [d for d in docs if d.metadata.get("setaside", "").lower() in allowed_setaside]
+        # Collections without typed scalar fields: filter here with the same
+        # rules Milvus would apply, paging through candidates until k pass
+        def keep(doc):
+            if not matches_filters(doc.metadata, setasides, naics_codes):
+                return False
+            return bool(self._actionable([doc], 1))
 
-        if naics_codes:
-            allowed_naics = {code.strip() for code in naics_codes}
-            docs = [d for d in docs if d.metadata.get("naics") in allowed_naics]
+        docs, scanned = self.store.adaptive_search(query, k=k, predicate=keep)
+        print(f"🔍 Scanned {scanned} candidates for {len(docs)} filtered notices")
+        return docs
 
+    @staticmethod
+    def _actionable(docs, k):
         # Apply filtering based on notice type and deadline
         filtered = []
         for d in docs:
@@ -41,17 +67,43 @@ class LlamaRAG:
 
     def retrieve_context(self, query, k=10, setasides=None, naics_codes=None):
         docs = self.retrieve_docs(query, k=k, setasides=setasides, naics_codes=naics_codes)
-        return "\n\n".join([doc.page_content for doc in docs]), docs
+        return self.build_context(docs), docs
 
-    def generate_response(self, query, k=10, setasides=None, naics_codes=None):
-        context, _ = self.retrieve_context(query, k=k, setasides=setasides, naics_codes=naics_codes)
+    @staticmethod
+    def build_context(docs):
+        return "\n\n".join([doc.page_content for doc in docs])
+
+    def _messages(self, query, k, setasides, naics_codes, docs):
+        if docs is None:
+            context, _ = self.retrieve_context(query, k=k, setasides=setasides, naics_codes=naics_codes)
+        else:
+            context = self.build_context(docs)
         prompt = self.prompt_template.format(query=query, context=context)
+        return [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": query}
+        ]
+
+    def generate_response(self, query, k=10, setasides=None, naics_codes=None, docs=None):
+        """Answer ``query`` from retrieved notices.
 
+        Pass ``docs`` from an earlier ``retrieve_docs`` call to skip a second
+        embedding and search; otherwise they are retrieved here.
+        """
         completion = self.llm_client.chat.completions.create(
-            model="Llama-4-Maverick-17B-128E-Instruct-FP8",
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": query}
-            ],
+            model=MODEL,
+            messages=self._messages(query, k, setasides, naics_codes, docs),
+        )
+        return completion.completion_message.content.text
+
+    def stream_response(self, query, k=10, setasides=None, naics_codes=None, docs=None):
+        """Like ``generate_response`` but yield the answer text as it is generated."""
+        stream = self.llm_client.chat.completions.create(
+            model=MODEL,
+            messages=self._messages(query, k, setasides, naics_codes, docs),
+            stream=True,
         )
-        return completion.completion_message.content.text
\ No newline at end of file
+        for chunk in stream:
+            delta = chunk.event.delta
+            if getattr(delta, "type", None) == "text" and delta.text:
+                yield delta.text
@@ -1,23 +1,41 @@
 import argparse
 from utils.env_loader import load_env
-from utils.solicitation_assets import enrich_record_with_details, parse_s3_path
-from agents.solicitation_agent import SolicitationAgent
-from agents.csv_opportunity_agent import CSVOpportunityAgent
-from chains.semantic_search_chain import SemanticSearchChain
-from chains.rerank_chain import RerankChain
-from rag.milvus_store import MilvusStore
-from llm import LlamaRAG
-from scripts.rag_setup import run as run_rag_setup
-
-def ingest(config, store):
+
+# Heavy dependencies (LangChain, pymilvus, boto3, pdfplumber, the Llama client)
+# are imported inside the modes that use them so each mode only pays for its
+# own. scripts/startup_benchmark.py reads those imports from this file and
+# measures them.
+
+# Modes that work against the shared Milvus store
+STORE_MODES = {"ingest", "search", "rerank", "rag", "csv-load", "csv-match", "aayeaye", "benchmark", "stats", "serve"}
+
+
+def connect_store(config, args):
+    from rag.milvus_store import MilvusStore
+
+    return MilvusStore(
+        host=config.get("MILVUS_HOST") or "localhost",
+        port=config.get("MILVUS_PORT") or "19530",
+        search_ef=args.ef,
+        search_nprobe=args.nprobe,
+    )
+
+def ingest(config, store, incremental=False):
+    from agents.solicitation_agent import SolicitationAgent
+
     agent = SolicitationAgent(config, store)
-    agent.run()
+    if incremental:
+        agent.run_incremental()
+    else:
+        agent.run()
 
 def search(store, query, k=10, setasides=None, naics_codes=None):
+    from chains.semantic_search_chain import SemanticSearchChain
+    from rag.milvus_collection import build_filter_expr, matches_filters
+
     # Check if store has data
     try:
-        from pymilvus import utility
-        collection_exists = utility.has_collection(store.collection_name)
+        collection_exists = store.has_collection()
         
         if not collection_exists:
             print("⚠️ No documents found in vector store. You may need to:")
@@ -29,43 +47,45 @@ def search(store, query, k=10, setasides=None, naics_codes=None):
         print(f"⚠️ Error checking collection: {e}")
     
     search_chain = SemanticSearchChain(store.index)
-    results = search_chain.execute(query, k=k)
-    
-    if setasides:
-        allowed = [sa.lower() for sa in setasides]
-        original_count = len(results)
-        
-        # Use partial matching for set-aside filtering
-        def matches_setaside(doc):
-            # Check both field names: setaside (SAM.gov) and set_aside (CSV)
-            setaside_value = doc.metadata.get("setaside", "") or doc.metadata.get("set_aside", "")
-            if not setaside_value:
-                return False
-            setaside_lower = setaside_value.lower()
-            return any(allowed_term in setaside_lower for allowed_term in allowed)
-        
-        results = [d for d in results if matches_setaside(d)]
-        print(f"🔍 After set-aside filtering: {len(results)} results (filtered out {original_count - len(results)})")
-    
-    if naics_codes:
-        allowed_naics = {code.strip() for code in naics_codes}
-        original_count = len(results)
-        results = [d for d in results if d.metadata.get("naics") in allowed_naics or d.metadata.get("naics_code") in allowed_naics]
-        print(f"🔍 After NAICS filtering: {len(results)} results (filtered out {original_count - len(results)})")
-    
-    return results[:k]
+    if store.supports_filters():
+        # Filters run inside Milvus, so exactly k matching results come back
+        return search_chain.execute(query, k=k, expr=build_filter_expr(setasides, naics_codes))
+
+    # Legacy collection without typed scalar fields: filter after searching,
+    # widening the candidate window until k results survive
+    if not (setasides or naics_codes):
+        return search_chain.execute(query, k=k)
+
+    print(f"🔎 Performing semantic search for: '{query}'")
+    results, scanned = store.adaptive_search(
+        query, k=k, predicate=lambda doc: matches_filters(doc.metadata, setasides, naics_codes)
+    )
+    print(f"🔍 Scanned {scanned} candidates for {len(results)} filtered results")
+    return results
 
 def rerank(store, query):
+    from chains.semantic_search_chain import SemanticSearchChain
+    from chains.rerank_chain import RerankChain
+
     search_chain = SemanticSearchChain(store.index)
     results = search_chain.execute(query)
 
     rerank_chain = RerankChain()
-    top_5 = rerank_chain.execute(query, results)
+    top_5 = rerank_chain.execute(query, results, top_n=5)
     print("\n✅ Top Recommended Opportunities:\n")
-    print(top_5)
+    for item in top_5:
+        meta = item["document"].metadata
+        print(f"--- [{item['rank']}] score {item['score']:.0f} ---")
+        print(f"Title: {meta.get('title')}")
+        print(f"Solicitation #: {meta.get('solicitation_number') or meta.get('sol_number')}")
+        print(f"Set-Aside: {meta.get('setaside') or meta.get('set_aside')}")
+        print(f"Link: {meta.get('link')}")
+        print()
 
-def run_rag(query, api_key, setasides=None, naics_codes=None, k=10):
-    rag = LlamaRAG("vector_store", api_key=api_key)
+def run_rag(store, query, api_key, setasides=None, naics_codes=None, k=10, stream=False):
+    from llm import LlamaRAG
+
+    rag = LlamaRAG("vector_store", api_key=api_key, store=store)
     docs = rag.retrieve_docs(query, k=k, setasides=setasides, naics_codes=naics_codes)
     print(f"\n✅ Top {len(docs)} Results:\n")
     for i, doc in enumerate(docs, 1):
@@ -79,9 +99,13 @@ def run_rag(query, api_key, setasides=None, naics_codes=None, k=10):
         print(f"Set-Aside: {meta.get('setaside')}")
         print()
 
-    response = rag.generate_response(query, k=k, setasides=setasides, naics_codes=naics_codes)
     print("\n📄 RAG-Enhanced Response:\n")
-    print(response)
+    if stream:
+        for text in rag.stream_response(query, docs=docs):
+            print(text, end="", flush=True)
+        print()
+    else:
+        print(rag.generate_response(query, docs=docs))
 
 def search_aayeaye_capabilities(store, k=10):
     """Search for opportunities matching AAyeAye LLC's capabilities statement."""
@@ -101,73 +125,98 @@ def search_aayeaye_capabilities(store, k=10):
     print(f"🎯 NAICS Codes: {', '.join(naics_codes)}")
     print(f"🔍 Technical Query: {capabilities_query}")
     
-    # Search for small business opportunities
-    print("\n--- SMALL BUSINESS OPPORTUNITIES ---")
-    sb_results = search(store, capabilities_query, k=k, setasides=["small business"], naics_codes=naics_codes)
-    
-    if sb_results:
-        print(f"✅ Found {len(sb_results)} Small Business opportunities:")
-        for i, doc in enumerate(sb_results, 1):
-            meta = doc.metadata
-            print(f"--- [{i}] ---")
-            print(f"Title: {meta.get('title')}")
-            print(f"Solicitation #: {meta.get('solicitation_number') or meta.get('sol_number')}")
-            print(f"NAICS: {meta.get('naics') or meta.get('naics_code')}")
-            print(f"Set-Aside: {meta.get('setaside') or meta.get('set_aside')}")
-            print(f"Department: {meta.get('department')}")
-            print(f"Link: {meta.get('link')}")
-            print()
-    else:
-        print("❌ No Small Business opportunities found")
-    
-    # Search for SDVOSB opportunities (for when certification is complete)
-    print("\n--- SDVOSB OPPORTUNITIES (For Future Reference) ---")
-    sdvosb_results = search(store, capabilities_query, k=k, setasides=["veteran"], naics_codes=naics_codes)
-    
-    if sdvosb_results:
-        print(f"✅ Found {len(sdvosb_results)} SDVOSB opportunities:")
-        for i, doc in enumerate(sdvosb_results, 1):
-            meta = doc.metadata
-            print(f"--- [{i}] ---")
-            print(f"Title: {meta.get('title')}")
-            print(f"Solicitation #: {meta.get('solicitation_number') or meta.get('sol_number')}")
-            print(f"NAICS: {meta.get('naics') or meta.get('naics_code')}")
-            print(f"Set-Aside: {meta.get('setaside') or meta.get('set_aside')}")
-            print(f"Department: {meta.get('department')}")
-            print(f"Link: {meta.get('link')}")
-            print()
-    else:
-        print("❌ No SDVOSB opportunities found")
-    
-    # Search for unrestricted opportunities in your NAICS codes
-    print("\n--- UNRESTRICTED OPPORTUNITIES ---")
-    unrestricted_results = search(store, capabilities_query, k=k, naics_codes=naics_codes)
-    
-    if unrestricted_results:
-        print(f"✅ Found {len(unrestricted_results)} total opportunities in your NAICS codes:")
-        for i, doc in enumerate(unrestricted_results, 1):
-            meta = doc.metadata
-            set_aside = meta.get('setaside') or meta.get('set_aside') or "None"
-            print(f"--- [{i}] ---")
-            print(f"Title: {meta.get('title')}")
-            print(f"Solicitation #: {meta.get('solicitation_number') or meta.get('sol_number')}")
-            print(f"NAICS: {meta.get('naics') or meta.get('naics_code')}")
-            print(f"Set-Aside: {set_aside}")
-            print(f"Department: {meta.get('department')}")
-            print(f"Link: {meta.get('link')}")
-            print()
-    else:
-        print("❌ No opportunities found in your NAICS codes")
+    if not store.has_collection():
+        print("⚠️ No documents found in vector store. Run 'csv-load' or 'ingest' mode first.")
+        return
+
+    # One query embedding and one Milvus search, split into the three views
+    sweeps = [
+        ("SMALL BUSINESS OPPORTUNITIES", "Small Business opportunities",
+         {"setasides": ["small business"], "naics_codes": naics_codes}),
+        ("SDVOSB OPPORTUNITIES (For Future Reference)", "SDVOSB opportunities",
+         {"setasides": ["veteran"], "naics_codes": naics_codes}),
+        ("UNRESTRICTED OPPORTUNITIES", "opportunities in your NAICS codes",
+         {"naics_codes": naics_codes}),
+    ]
+    results = store.multi_filtered_search(
+        capabilities_query, {heading: filters for heading, _, filters in sweeps}, k=k
+    )
+
+    for heading, label, _ in sweeps:
+        print(f"\n--- {heading} ---")
+        print_opportunities(results[heading], label)
+
+
+def print_opportunities(docs, label):
+    if not docs:
+        print(f"❌ No {label} found")
+        return
+    print(f"✅ Found {len(docs)} {label}:")
+    for i, doc in enumerate(docs, 1):
+        meta = doc.metadata
+        print(f"--- [{i}] ---")
+        print(f"Title: {meta.get('title')}")
+        print(f"Solicitation #: {meta.get('solicitation_number') or meta.get('sol_number')}")
+        print(f"NAICS: {meta.get('naics') or meta.get('naics_code')}")
+        print(f"Set-Aside: {meta.get('setaside') or meta.get('set_aside') or 'None'}")
+        print(f"Department: {meta.get('department')}")
+        print(f"Link: {meta.get('link')}")
+        print()
+
+def print_match_progress(stream=False):
+    """Return an on_progress callback that prints the running top-k when it changes.
+
+    With ``stream`` every evaluation is also printed as soon as it completes.
+    """
+    shown = []
+
+    def on_progress(completed, total, result, top):
+        if stream and result is not None:
+            meta = result['metadata']
+            score = result['match_score']
+            score = "unscored" if score is None else f"{score}/100"
+            print(f"\n🧾 [{completed}/{total}] {score} - {meta.get('title', 'N/A')}")
+            print(result.get('rationale') or result['evaluation'])
+        current = [id(r) for r in top]
+        if current != shown:
+            shown[:] = current
+            leaders = "; ".join(f"{r['match_score']} {r['metadata'].get('title', 'N/A')[:40]}" for r in top[:3])
+            print(f"📈 {completed}/{total} evaluated - top {len(top)} so far: {leaders}")
+        elif completed % 10 == 0 or completed == total:
+            print(f"📊 Progress: {completed}/{total} opportunities evaluated")
+
+    return on_progress
+
+def print_store_stats(stats):
+    if not stats["exists"]:
+        print(f"⚠️ Collection '{stats['collection']}' does not exist yet.")
+        return
+    print(f"📦 Collection: {stats['collection']} -> {stats['physical_collection']}")
+    print(f"   Rows: {stats['row_count']}")
+    print(f"   Load state: {stats['load_state']}")
+    print(f"   Last ingest: {stats['last_ingest'] or 'unknown'}")
+    for index in stats["indexes"]:
+        print(
+            f"   Index on {index['field']}: {index['index_type']} {index['params']} "
+            f"({index['indexed_rows']} indexed, {index['pending_rows']} pending)"
+        )
+    for field, count in stats["cardinalities"].items():
+        print(f"   Distinct {field}: {count}")
 
 def main():
     parser = argparse.ArgumentParser(description="SAM Solicitation Agent CLI")
     parser.add_argument(
         "--mode",
-        choices=["ingest", "search", "rerank", "rag", "enrich", "ragsetup", "csv-load", "csv-match", "aayeaye"],
+        choices=["ingest", "search", "rerank", "rag", "enrich", "ragsetup", "csv-load", "csv-match", "aayeaye", "benchmark", "stats", "serve"],
         required=True,
         help="Mode to run",
     )
     parser.add_argument("--query", type=str, help="Search query (required for search/rerank/rag)")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Ingest only notices newer than the stored watermark instead of rebuilding the collection",
+    )
     parser.add_argument(
         "--setaside",
         type=str,
@@ -215,6 +264,33 @@ def main():
         default=10,
         help="Number of top opportunities to return (default: 10)",
     )
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address for serve mode (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port for serve mode (default: 8080)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Concurrent requests in serve mode (default: 4) or notices in enrich --all/--date (default: 8)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream output as it is generated (rag: answer tokens; csv-match: each evaluation as it completes)",
+    )
+    parser.add_argument(
+        "--cascade-cutoff",
+        type=int,
+        help="Candidates promoted from feature scoring to LLM evaluation in csv-match (default: top-k)",
+    )
+    parser.add_argument(
+        "--ef",
+        type=int,
+        help="HNSW search breadth (higher = better recall, slower)",
+    )
+    parser.add_argument(
+        "--nprobe",
+        type=int,
+        help="Number of IVF clusters to probe per search",
+    )
 
     args = parser.parse_args()
     setaside_list = None
@@ -225,13 +301,10 @@ def main():
         naics_list = [c.strip() for c in args.naics.split(',') if c.strip()]
 
     config = load_env()
-    store = MilvusStore(
-        host=config.get("MILVUS_HOST") or "localhost",
-        port=config.get("MILVUS_PORT") or "19530",
-    )
+    store = connect_store(config, args) if args.mode in STORE_MODES else None
 
     if args.mode == "ingest":
-        ingest(config, store)
+        ingest(config, store, incremental=args.incremental)
 
     elif args.mode == "search":
         if not args.query:
@@ -270,16 +343,20 @@ def main():
             print("❌ --query is required for rag mode.")
             return
         run_rag(
+            store,
             args.query,
             config["LLAMA_API_KEY"],
             setasides=setaside_list,
             naics_codes=naics_list,
             k=args.top_k,
+            stream=args.stream,
         )
 
     elif args.mode == "enrich":
         import json
         import boto3
+        from utils.archive_segments import iter_archive_records, load_record
+        from utils.solicitation_assets import enrich_record_with_details, parse_s3_path
 
         if not args.path and not args.all and not args.date:
             print("❌ --path, --date, or --all is required for enrich mode.")
@@ -295,36 +372,36 @@ def main():
 
         api_key = config.get("SAM_API_KEY")
 
-        def process_record(bucket: str, key: str) -> None:
-            obj = s3.get_object(Bucket=bucket, Key=key)
-            record = json.loads(obj["Body"].read())
-            enriched = enrich_record_with_details(record, s3, bucket, api_key=api_key)
+        from utils.resource_index import default_resource_index
+
+        resource_index = default_resource_index()
+
+        def process_record(bucket: str, record: dict) -> None:
+            enriched = enrich_record_with_details(record, s3, bucket, api_key=api_key, resource_index=resource_index)
             print(json.dumps({
                 "noticeId": record.get("noticeId"),
                 "description_key": enriched.get("description_data_key"),
                 "attachment_keys": enriched.get("attachment_keys", []),
+                "failed_links": enriched.get("failed_links", []),
             }, indent=2))
 
-        if args.all:
-            bucket = args.bucket
-            paginator = s3.get_paginator("list_objects_v2")
-            for page in paginator.paginate(Bucket=bucket):
-                for obj in page.get("Contents", []):
-                    key = obj["Key"]
-                    if not key.endswith(".json"):
-                        continue
-                    process_record(bucket, key)
-        elif args.date:
-            bucket = args.bucket
-            from utils.solicitation_assets import list_json_keys_for_date
+        # Records may be plain <notice_id>.json objects or compressed day segments
+        if args.all or args.date:
+            from utils.enrichment_engine import EnrichmentEngine
+            from utils.solicitation_assets import date_to_prefix
 
-            for key in list_json_keys_for_date(s3, bucket, args.date):
-                process_record(bucket, key)
+            bucket = args.bucket
+            engine = EnrichmentEngine(
+                s3, bucket, api_key=api_key, workers=args.workers, resource_index=resource_index
+            )
+            prefix = date_to_prefix(args.date) if args.date else ""
+            engine.run(iter_archive_records(s3, bucket, prefix=prefix, skip=engine.is_done))
         else:
             bucket, key = parse_s3_path(args.path, args.bucket)
-            process_record(bucket, key)
+            process_record(bucket, load_record(s3, bucket, key))
 
     elif args.mode == "ragsetup":
+        from scripts.rag_setup import run as run_rag_setup
         run_rag_setup()
 
     elif args.mode == "csv-load":
@@ -332,6 +409,7 @@ def main():
             print("❌ --csv-file is required for csv-load mode.")
             return
             
+        from agents.csv_opportunity_agent import CSVOpportunityAgent
         print("🚀 Loading CSV opportunities and embedding in vector store...")
         csv_agent = CSVOpportunityAgent(args.csv_file, store)
         count = csv_agent.load_and_embed_opportunities()
@@ -349,6 +427,7 @@ def main():
             print("❌ --company-profile is required for csv-match mode.")
             return
             
+        from agents.csv_opportunity_agent import CSVOpportunityAgent
         print("🎯 Finding opportunities that match your company profile...")
         csv_agent = CSVOpportunityAgent(args.csv_file, store)
         
@@ -360,7 +439,14 @@ def main():
             print(f"📊 Found existing data in vector store (approximately {data_count} opportunities)")
             print("🎯 Searching existing embeddings (not reloading CSV)...")
             
-            results = csv_agent.search_existing_opportunities(args.company_profile, args.top_k)
+            results = csv_agent.search_existing_opportunities(
+                args.company_profile,
+                args.top_k,
+                on_progress=print_match_progress(stream=args.stream),
+                cutoff=args.cascade_cutoff,
+                naics_codes=naics_list,
+                setasides=setaside_list,
+            )
             if not results:
                 print("⚠️ No opportunities matched your company profile in the existing data.")
                 print("💡 Try adjusting your company profile, using different keywords, or run csv-load first.")
@@ -400,5 +486,17 @@ def main():
     elif args.mode == "aayeaye":
         search_aayeaye_capabilities(store, k=args.top_k)
 
+    elif args.mode == "serve":
+        from utils.query_server import QueryService, serve
+        serve(QueryService(store, config, search), host=args.host, port=args.port, workers=args.workers or 4)
+
+    elif args.mode == "stats":
+        print_store_stats(store.stats())
+
+    elif args.mode == "benchmark":
+        from scripts.milvus_benchmark import run_benchmark, print_results
+        queries = [args.query] if args.query else None
+        print_results(run_benchmark(store, k=args.top_k, query_texts=queries), args.top_k)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,126 @@
+"""Content-hash embedding cache shared by the Milvus and FAISS stores."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_ollama.embeddings import OllamaEmbeddings
+
+from utils.sqlite_cache import SQLiteCache
+
+DEFAULT_CACHE_PATH = os.path.join("vector_store", "embedding_cache.sqlite")
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_QUERY_LRU_SIZE = 256
+
+
+def _pack(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class CachedEmbeddings(Embeddings):
+    """Wrap an embedder so identical texts are only ever embedded once.
+
+    Vectors are stored as float32 blobs keyed by
+    ``<kind>:<model>:<sha256(text)>``, where ``kind`` separates document and
+    query embeddings in case a model treats them differently. Query vectors
+    are also kept in an in-process LRU of ``query_lru_size`` entries, so
+    repeated queries skip both Ollama and SQLite.
+    """
+
+    def __init__(self, embedder: Embeddings, model_name: str, cache: SQLiteCache,
+                 query_lru_size: Optional[int] = None) -> None:
+        self.embedder = embedder
+        self.model_name = model_name
+        self.cache = cache
+        self.query_lru_size = DEFAULT_QUERY_LRU_SIZE if query_lru_size is None else query_lru_size
+        self.query_lru_hits = 0
+        self._query_lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lru_lock = threading.Lock()
+
+    def _key(self, kind: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{kind}:{self.model_name}:{digest}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key("doc", t) for t in texts]
+        cached = self.cache.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.embedder.embed_documents(list(missing.values()))
+            fresh = {key: _pack(vec) for key, vec in zip(missing, vectors)}
+            self.cache.put_many(fresh.items())
+            cached.update(fresh)
+
+        return [_unpack(cached[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key("query", text)
+        with self._lru_lock:
+            if key in self._query_lru:
+                self._query_lru.move_to_end(key)
+                self.query_lru_hits += 1
+                return list(self._query_lru[key])
+
+        blob = self.cache.get(key)
+        if blob is None:
+            vector = self.embedder.embed_query(text)
+            self.cache.put(key, _pack(vector))
+        else:
+            vector = _unpack(blob)
+        self._remember_query(key, vector)
+        return vector
+
+    def _remember_query(self, key: str, vector: List[float]) -> None:
+        if self.query_lru_size <= 0:
+            return
+        with self._lru_lock:
+            self._query_lru[key] = list(vector)
+            self._query_lru.move_to_end(key)
+            while len(self._query_lru) > self.query_lru_size:
+                self._query_lru.popitem(last=False)
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats["query_lru_hits"] = self.query_lru_hits
+        return stats
+
+
+def cached_ollama_embeddings(model: str = "nomic-embed-text") -> CachedEmbeddings:
+    """Return Ollama embeddings backed by the on-disk cache.
+
+    The cache location and size bound come from ``EMBED_CACHE_PATH`` and
+    ``EMBED_CACHE_MAX_ENTRIES``; ``QUERY_EMBED_LRU_SIZE`` sizes the in-process
+    query LRU.
+    """
+    cache = SQLiteCache(
+        os.getenv("EMBED_CACHE_PATH") or DEFAULT_CACHE_PATH,
+        max_entries=int(os.getenv("EMBED_CACHE_MAX_ENTRIES") or DEFAULT_MAX_ENTRIES),
+    )
+    lru_size = os.getenv("QUERY_EMBED_LRU_SIZE")
+    return CachedEmbeddings(
+        OllamaEmbeddings(model=model), model, cache, query_lru_size=int(lru_size) if lru_size else None
+    )
+
+
+def format_cache_stats(stats) -> str:
+    return (
+        f"🗃️ Embedding cache: {stats['hits']} hits / {stats['misses']} misses "
+        f"({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries, "
+        f"{stats['evictions']} evicted"
+    )
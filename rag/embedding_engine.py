@@ -0,0 +1,73 @@
+"""Split documents into batches and embed them with concurrent requests."""
+
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_WORKERS = 4
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BatchEmbeddingEngine:
+    """Embed documents in fixed-size batches across a small worker pool.
+
+    Each batch is one ``embed_documents`` call, i.e. one request to the
+    Ollama embed endpoint, and up to ``workers`` requests run at once.
+    Finished batches are yielded as soon as they complete (not in input
+    order) so callers can insert them while later batches are still being
+    embedded; at most ``2 * workers`` batches are held at any time.
+    ``EMBED_BATCH_SIZE`` and ``EMBED_WORKERS`` override the defaults.
+    """
+
+    def __init__(self, embedder: Embeddings, batch_size: int | None = None, workers: int | None = None) -> None:
+        self.embedder = embedder
+        self.batch_size = batch_size or int(os.getenv("EMBED_BATCH_SIZE") or DEFAULT_BATCH_SIZE)
+        self.workers = workers or int(os.getenv("EMBED_WORKERS") or DEFAULT_WORKERS)
+        self.last_docs_per_sec = 0.0
+
+    def _embed(self, batch: List[Dict]) -> Tuple[List[Dict], List[List[float]]]:
+        return batch, self.embedder.embed_documents([d["text"] for d in batch])
+
+    def iter_embedded(self, docs_with_metadata: Iterable[Dict]) -> Iterator[Tuple[List[Dict], List[List[float]]]]:
+        """Yield ``(batch_docs, vectors)`` pairs as batches finish embedding."""
+        started = time.perf_counter()
+        total = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = set()
+            for batch in _chunks(docs_with_metadata, self.batch_size):
+                pending.add(executor.submit(self._embed, batch))
+                if len(pending) < self.workers * 2:
+                    continue
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    total += len(result[0])
+                    yield result
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    total += len(result[0])
+                    yield result
+
+        elapsed = time.perf_counter() - started
+        self.last_docs_per_sec = total / elapsed if elapsed > 0 else 0.0
+        print(
+            f"🧠 Embedded {total} documents in {elapsed:.1f}s "
+            f"({self.last_docs_per_sec:.1f} docs/sec, batch {self.batch_size} × {self.workers} workers)"
+        )
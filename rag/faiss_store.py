@@ -1,12 +1,13 @@
 import os
 import faiss
 from langchain_community.vectorstores import FAISS
-from langchain_ollama.embeddings import OllamaEmbeddings
+
+from .embedding_cache import cached_ollama_embeddings, format_cache_stats
 
 class FaissStore:
     def __init__(self, persist_dir="vector_store"):
         self.persist_dir = persist_dir
-        self.embed_model = OllamaEmbeddings(model="nomic-embed-text")
+        self.embed_model = cached_ollama_embeddings("nomic-embed-text")
         self.index = None
 
         # Load existing index if it exists
@@ -46,6 +47,7 @@ class FaissStore:
         else:
             self.index = FAISS.from_texts(texts, embedding=self.embed_model, metadatas=metadatas)
 
+        print(format_cache_stats(self.embed_model.stats()))
         print(f"💾 Saving FAISS index to '{self.persist_dir}'")
         self.index.save_local(self.persist_dir)
 
@@ -59,5 +61,6 @@ class FaissStore:
         os.makedirs(self.persist_dir, exist_ok=True)
         self.index = FAISS.from_texts(texts, embedding=self.embed_model, metadatas=metadatas)
 
+        print(format_cache_stats(self.embed_model.stats()))
         print(f"💾 Saving FAISS index to '{self.persist_dir}'")
         self.index.save_local(self.persist_dir)
@@ -0,0 +1,251 @@
+"""Explicit Milvus schema with typed scalar fields and filter push-down."""
+
+from __future__ import annotations
+
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain_community.vectorstores import Milvus
+from langchain_core.documents import Document
+from pymilvus import Collection, CollectionSchema, DataType, FieldSchema
+
+from utils.rag_helpers import _parse_date
+
+from .milvus_index import INDEX_TYPES, build_search_params
+
+# name -> (dtype, max_length, scalar index type)
+SCALAR_FIELDS: Dict[str, Tuple[DataType, Optional[int], str]] = {
+    "notice_id": (DataType.VARCHAR, 128, "INVERTED"),
+    "naics": (DataType.VARCHAR, 32, "INVERTED"),
+    "set_aside_lc": (DataType.VARCHAR, 512, "INVERTED"),
+    "set_aside_code": (DataType.VARCHAR, 64, "INVERTED"),
+    "notice_type": (DataType.VARCHAR, 128, "INVERTED"),
+    "response_deadline_ts": (DataType.INT64, None, "STL_SORT"),
+}
+
+
+def scalar_values(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Map SAM.gov or CSV metadata onto the typed scalar fields.
+
+    The two sources use different keys (``naics`` vs ``naics_code``,
+    ``setaside`` vs ``set_aside``), so both are folded into one column.
+    ``set_aside_lc`` is a lower-cased copy so partial matches are
+    case-insensitive, and the deadline becomes a UTC epoch (0 when unknown).
+    """
+    deadline = _parse_date(metadata.get("response_deadline") or "")
+    set_aside = metadata.get("set_aside") or metadata.get("setaside") or ""
+    return {
+        "notice_id": str(metadata.get("notice_id") or "")[:128],
+        "naics": str(metadata.get("naics_code") or metadata.get("naics") or "")[:32],
+        "set_aside_lc": set_aside.lower()[:512],
+        "set_aside_code": str(metadata.get("set_aside_code") or "")[:64],
+        "notice_type": str(metadata.get("notice_type") or "")[:128],
+        "response_deadline_ts": int(deadline.timestamp()) if deadline else 0,
+    }
+
+
+def _literal(value: str) -> str:
+    return json.dumps(value)
+
+
+def build_filter_expr(
+    setasides: Optional[Iterable[str]] = None,
+    naics_codes: Optional[Iterable[str]] = None,
+    notice_types: Optional[Iterable[str]] = None,
+    deadline_after: Optional[datetime] = None,
+) -> Optional[str]:
+    """Build a Milvus boolean expression over the typed scalar fields.
+
+    Set-asides match as case-insensitive substrings (``"small business"``
+    matches ``"Total Small Business Set-Aside (FAR 19.5)"``), the same way
+    the old Python post-filter did. Returns ``None`` when there is nothing
+    to filter on.
+    """
+    clauses = []
+    setasides = [s.strip().lower() for s in setasides or [] if s.strip()]
+    if setasides:
+        likes = [f"set_aside_lc like {_literal('%' + s + '%')}" for s in setasides]
+        clauses.append("(" + " or ".join(likes) + ")")
+    naics_codes = [c.strip() for c in naics_codes or [] if c.strip()]
+    if naics_codes:
+        clauses.append(f"naics in {json.dumps(naics_codes)}")
+    notice_types = [t for t in notice_types or [] if t]
+    if notice_types:
+        clauses.append(f"notice_type in {json.dumps(notice_types)}")
+    if deadline_after is not None:
+        clauses.append(f"response_deadline_ts > {int(deadline_after.timestamp())}")
+    return " and ".join(clauses) or None
+
+
+def matches_filters(
+    metadata: Dict[str, Any],
+    setasides: Optional[Iterable[str]] = None,
+    naics_codes: Optional[Iterable[str]] = None,
+    notice_types: Optional[Iterable[str]] = None,
+    deadline_after: Optional[datetime] = None,
+) -> bool:
+    """Evaluate the ``build_filter_expr`` filters in Python against ``metadata``."""
+    values = scalar_values(metadata)
+    setasides = [s.strip().lower() for s in setasides or [] if s.strip()]
+    if setasides and not any(s in values["set_aside_lc"] for s in setasides):
+        return False
+    naics_codes = {c.strip() for c in naics_codes or [] if c.strip()}
+    if naics_codes and values["naics"] not in naics_codes:
+        return False
+    notice_types = {t for t in notice_types or [] if t}
+    if notice_types and values["notice_type"] not in notice_types:
+        return False
+    if deadline_after is not None and values["response_deadline_ts"] <= int(deadline_after.timestamp()):
+        return False
+    return True
+
+
+class SolicitationMilvus(Milvus):
+    """LangChain ``Milvus`` with an explicit schema for solicitation documents.
+
+    New collections get typed, indexed scalar columns for filtering plus a
+    dynamic field that holds the rest of the metadata (title, link,
+    department, ...). Searches return every stored field as metadata.
+
+    ``search_ef`` and ``search_nprobe`` tune searches for HNSW and IVF
+    indexes respectively and can be overridden per call with ``ef=`` or
+    ``nprobe=``.
+    """
+
+    def __init__(self, *args: Any, search_ef: Optional[int] = None, search_nprobe: Optional[int] = None, **kwargs: Any):
+        self.search_ef = search_ef
+        self.search_nprobe = search_nprobe
+        super().__init__(*args, **kwargs)
+
+    def _create_collection(self, embeddings: list, metadatas: Optional[list[dict]] = None) -> None:
+        fields = [
+            FieldSchema(self._primary_field, DataType.INT64, is_primary=True, auto_id=True),
+            FieldSchema(self._text_field, DataType.VARCHAR, max_length=65_535),
+            FieldSchema(self._vector_field, DataType.FLOAT_VECTOR, dim=len(embeddings[0])),
+        ]
+        for name, (dtype, max_length, _) in SCALAR_FIELDS.items():
+            if max_length:
+                fields.append(FieldSchema(name, dtype, max_length=max_length))
+            else:
+                fields.append(FieldSchema(name, dtype))
+        schema = CollectionSchema(fields, description=self.collection_description, enable_dynamic_field=True)
+        self.col = Collection(
+            name=self.collection_name,
+            schema=schema,
+            consistency_level=self.consistency_level,
+            using=self.alias,
+        )
+
+    def _create_index(self) -> None:
+        super()._create_index()
+        if not isinstance(self.col, Collection):
+            return
+        indexed = {index.field_name for index in self.col.indexes}
+        for name, (_, _, index_type) in SCALAR_FIELDS.items():
+            if name in self.fields and name not in indexed:
+                self.col.create_index(name, index_params={"index_type": index_type}, index_name=f"{name}_idx")
+
+    def index_type(self) -> Optional[str]:
+        index = self._get_index() if self.col is not None else None
+        return index["index_param"]["index_type"] if index else None
+
+    def metric_type(self) -> Optional[str]:
+        """The metric the live vector index was built with."""
+        index = self._get_index() if self.col is not None else None
+        return index["index_param"].get("metric_type") if index else None
+
+    def _create_search_params(self) -> None:
+        if self.search_params is None and self.index_type() in INDEX_TYPES:
+            index = self._get_index()
+            self.search_params = build_search_params(
+                index["index_param"]["index_type"],
+                index["index_param"]["metric_type"],
+                ef=self.search_ef,
+                nprobe=self.search_nprobe,
+            )
+            return
+        super()._create_search_params()
+
+    def _search_params_for(self, k: int, ef: Optional[int], nprobe: Optional[int]) -> Optional[dict]:
+        base = self.search_params
+        index_type = self.index_type()
+        if base is None or index_type not in INDEX_TYPES:
+            return base
+        current = base.get("params", {})
+        return build_search_params(
+            index_type,
+            base.get("metric_type", "L2"),
+            ef=ef or current.get("ef"),
+            nprobe=nprobe or current.get("nprobe"),
+            k=k,
+        )
+
+    @property
+    def supports_filters(self) -> bool:
+        """True when the collection has the typed scalar columns."""
+        return all(name in self.fields for name in SCALAR_FIELDS)
+
+    def _primary_field_schema(self):
+        return next((field for field in self.col.schema.fields if field.is_primary), None)
+
+    def row_for(self, doc: Dict, vector: List[float]) -> Dict[str, Any]:
+        """Build an insert row for ``doc`` that matches this collection's schema.
+
+        Legacy collections whose primary key Milvus does not generate get a
+        UUID for a VARCHAR key, as ``Milvus.add_texts`` would; any other key
+        type cannot be filled in and requires a full rebuild.
+        """
+        if self.supports_filters:
+            row = dict(doc["metadata"])
+            row.update(scalar_values(doc["metadata"]))
+        else:
+            row = {k: v for k, v in doc["metadata"].items() if k in self.fields}
+            primary = self._primary_field_schema()
+            if primary is not None and not primary.auto_id:
+                if primary.dtype != DataType.VARCHAR:
+                    raise ValueError(
+                        f"Collection '{self.collection_name}' has a {primary.dtype.name} primary key that "
+                        "Milvus does not generate; rebuild it with a full ingest before writing to it"
+                    )
+                row[self._primary_field] = str(uuid.uuid4())
+        row[self._text_field] = doc["text"]
+        row[self._vector_field] = vector
+        return row
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        param: Optional[dict] = None,
+        expr: Optional[str] = None,
+        timeout: Optional[float] = None,
+        ef: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        offset: int = 0,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        if self.col is None:
+            return []
+        if offset:
+            # Skip the first ``offset`` neighbours; HNSW's ef must cover both
+            kwargs["offset"] = offset
+        res = self.col.search(
+            data=[embedding],
+            anns_field=self._vector_field,
+            param=param or self._search_params_for(offset + k, ef, nprobe),
+            limit=k,
+            expr=expr,
+            output_fields=["*"],
+            timeout=self.timeout or timeout,
+            **kwargs,
+        )
+        results = []
+        for hit in res[0]:
+            data = dict(hit.fields)
+            data.pop(self._vector_field, None)
+            data.pop(self._primary_field, None)
+            text = data.pop(self._text_field, "")
+            results.append((Document(page_content=text, metadata=data), hit.score))
+        return results
@@ -0,0 +1,93 @@
+"""Vector index selection and search-time tuning for Milvus collections."""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Optional
+
+INDEX_TYPES = ("HNSW", "IVF_FLAT", "IVF_SQ8", "FLAT")
+DEFAULT_INDEX_TYPE = "HNSW"
+DEFAULT_METRIC = "L2"
+
+# Build-time parameters per index type
+DEFAULT_BUILD_PARAMS: Dict[str, Dict[str, int]] = {
+    "HNSW": {"M": 16, "efConstruction": 200},
+    "IVF_FLAT": {"nlist": 128},
+    "IVF_SQ8": {"nlist": 128},
+    "FLAT": {},
+}
+
+DEFAULT_EF = 64
+DEFAULT_NPROBE = 16
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def normalize_index_type(index_type: Optional[str]) -> str:
+    index_type = (index_type or DEFAULT_INDEX_TYPE).upper()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unsupported Milvus index type {index_type!r}; choose one of {', '.join(INDEX_TYPES)}")
+    return index_type
+
+
+def build_index_params(
+    index_type: Optional[str] = None,
+    metric_type: str = DEFAULT_METRIC,
+    **overrides: int,
+) -> Dict[str, Any]:
+    """Return ``create_index`` parameters for the vector field.
+
+    ``overrides`` replace the build defaults, e.g. ``M``/``efConstruction``
+    for HNSW or ``nlist`` for the IVF indexes. Unknown keys are ignored.
+    """
+    index_type = normalize_index_type(index_type)
+    params = dict(DEFAULT_BUILD_PARAMS[index_type])
+    params.update({k: v for k, v in overrides.items() if k in params and v})
+    return {"index_type": index_type, "metric_type": metric_type, "params": params}
+
+
+def build_search_params(
+    index_type: Optional[str] = None,
+    metric_type: str = DEFAULT_METRIC,
+    ef: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    k: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Return search parameters matching ``index_type``.
+
+    HNSW takes ``ef`` (raised to ``k`` when given, since Milvus rejects
+    ``ef < k``); the IVF indexes take ``nprobe``; FLAT needs neither.
+    """
+    index_type = normalize_index_type(index_type)
+    if index_type == "HNSW":
+        ef = ef or DEFAULT_EF
+        params = {"ef": max(ef, k or 0)}
+    elif index_type in ("IVF_FLAT", "IVF_SQ8"):
+        params = {"nprobe": nprobe or DEFAULT_NPROBE}
+    else:
+        params = {}
+    return {"metric_type": metric_type, "params": params}
+
+
+def index_settings_from_env() -> Dict[str, Any]:
+    """Read index and search settings from the environment.
+
+    ``MILVUS_INDEX_TYPE`` (HNSW, IVF_FLAT, IVF_SQ8 or FLAT), ``MILVUS_METRIC``,
+    ``MILVUS_HNSW_M``, ``MILVUS_HNSW_EF_CONSTRUCTION`` and ``MILVUS_IVF_NLIST``
+    control how new collections are indexed; ``MILVUS_SEARCH_EF`` and
+    ``MILVUS_SEARCH_NPROBE`` control searches.
+    """
+    return {
+        "index_type": os.getenv("MILVUS_INDEX_TYPE") or DEFAULT_INDEX_TYPE,
+        "metric_type": os.getenv("MILVUS_METRIC") or DEFAULT_METRIC,
+        "build_params": {
+            "M": _env_int("MILVUS_HNSW_M"),
+            "efConstruction": _env_int("MILVUS_HNSW_EF_CONSTRUCTION"),
+            "nlist": _env_int("MILVUS_IVF_NLIST"),
+        },
+        "ef": _env_int("MILVUS_SEARCH_EF"),
+        "nprobe": _env_int("MILVUS_SEARCH_NPROBE"),
+    }
@@ -1,39 +1,378 @@
 import os
-from typing import List, Dict
+import json
+import time
+from datetime import datetime
+from typing import Callable, List, Dict, Optional, Tuple
 
-from langchain_community.vectorstores import Milvus
-from langchain_ollama.embeddings import OllamaEmbeddings
-from pymilvus import utility, connections
+from pymilvus import MilvusException, utility, connections
+
+from .embedding_cache import cached_ollama_embeddings, format_cache_stats
+from .embedding_engine import BatchEmbeddingEngine
+from .milvus_collection import SolicitationMilvus, build_filter_expr, matches_filters
+from .milvus_index import build_index_params, index_settings_from_env
+
+
+LAST_INGEST_PROPERTY = "sam.last_ingest"
+CARDINALITY_FIELDS = ("naics", "set_aside_code", "notice_type")
+DEFAULT_MAX_CANDIDATES = 1000
+# Milvus rejects searches whose offset + limit exceeds this
+MAX_SEARCH_WINDOW = 16384
+# Shadow collections younger than this may still be filling in another process
+DEFAULT_STALE_SHADOW_HOURS = 24
+
+
+def mark_ingested(col) -> None:
+    """Stamp the collection with the current UTC time as its last ingest."""
+    stamp = datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+    try:
+        col.set_properties({LAST_INGEST_PROPERTY: stamp})
+    except MilvusException as e:
+        print(f"⚠️ Could not record last-ingest time: {e}")
+
+
+def insert_embedded(index: SolicitationMilvus, docs_with_metadata: List[Dict], vectors: List[List[float]]) -> None:
+    """Insert documents whose vectors were already computed into ``index``."""
+    if index.col is None:
+        # Creates the collection with the explicit schema, its indexes, and loads it
+        index._init(embeddings=vectors, metadatas=[d["metadata"] for d in docs_with_metadata])
+    index.col.insert([index.row_for(doc, vector) for doc, vector in zip(docs_with_metadata, vectors)])
+
+
+class CollectionRebuild:
+    """A full rebuild written into a shadow collection and promoted via alias.
+
+    Documents are added to a fresh physical collection while searches keep
+    hitting the collection the alias currently points to. ``commit`` seals
+    the shadow collection, waits for its index, then atomically repoints the
+    alias and drops the previous collection. ``abort`` drops the shadow and
+    leaves the live collection untouched.
+    """
+
+    def __init__(self, store: "MilvusStore", physical_name: str):
+        self.store = store
+        self.physical_name = physical_name
+        self.index = store._connect_index(physical_name)
+        self.count = 0
+
+    def add_documents(self, docs_with_metadata: List[Dict]) -> None:
+        for batch, vectors in self.store.engine.iter_embedded(docs_with_metadata):
+            insert_embedded(self.index, batch, vectors)
+            self.count += len(batch)
+
+    def commit(self) -> None:
+        if self.index.col is None:
+            print("⚠️ Rebuild produced no documents; keeping the live collection.")
+            return
+        self.index.col.flush()
+        mark_ingested(self.index.col)
+        utility.wait_for_index_building_complete(self.physical_name)
+        self.index.col.load()
+        utility.wait_for_loading_complete(self.physical_name)
+        self.store._promote(self.physical_name)
+        print(f"🔀 Promoted '{self.physical_name}' ({self.count} documents) to '{self.store.collection_name}'")
+
+    def abort(self) -> None:
+        if utility.has_collection(self.physical_name):
+            utility.drop_collection(self.physical_name)
 
 
 class MilvusStore:
     def __init__(self,
                  host: str = "localhost",
                  port: str = "19530",
-                 collection_name: str = "sam_solicitations"):
+                 collection_name: str = "sam_solicitations",
+                 index_type: Optional[str] = None,
+                 search_ef: Optional[int] = None,
+                 search_nprobe: Optional[int] = None):
+        # ``collection_name`` is the alias queries go through; the physical
+        # collection behind it is swapped on every full rebuild.
         self.collection_name = collection_name
-        self.embed_model = OllamaEmbeddings(model="nomic-embed-text")
+        settings = index_settings_from_env()
+        # The index type only applies when a collection is (re)built; the
+        # search parameters apply to every query.
+        self.index_params = build_index_params(
+            index_type or settings["index_type"], settings["metric_type"], **settings["build_params"]
+        )
+        self.search_ef = search_ef or settings["ef"]
+        self.search_nprobe = search_nprobe or settings["nprobe"]
+        self.embed_model = cached_ollama_embeddings("nomic-embed-text")
+        self.engine = BatchEmbeddingEngine(self.embed_model)
         self.connection_args = {"host": host, "port": port}
         connections.connect(**self.connection_args)
-        self.index = Milvus(
+        self.index = self._connect_index()
+
+    def _connect_index(self, name: Optional[str] = None) -> SolicitationMilvus:
+        return SolicitationMilvus(
             embedding_function=self.embed_model,
-            collection_name=self.collection_name,
+            collection_name=name or self.collection_name,
             connection_args=self.connection_args,
+            auto_id=True,
+            index_params=dict(self.index_params),
+            search_ef=self.search_ef,
+            search_nprobe=self.search_nprobe,
         )
 
+    def supports_filters(self) -> bool:
+        """True if the live collection has typed scalar fields to filter on.
+
+        Collections built before the explicit schema existed need one full
+        re-ingest before filters can be pushed down.
+        """
+        return self.index.col is not None and self.index.supports_filters
+
+    def filtered_search(self, query: str, k: int = 10, *, setasides=None, naics_codes=None,
+                        notice_types=None, deadline_after: Optional[datetime] = None):
+        """Vector search with the filters evaluated inside Milvus.
+
+        Unlike searching first and filtering afterwards, this returns up to
+        ``k`` documents that all satisfy the filters.
+        """
+        expr = build_filter_expr(setasides, naics_codes, notice_types, deadline_after)
+        return self.index.similarity_search(query, k=k, expr=expr)
+
+    def multi_filtered_search(self, query: str, filter_sets: Dict[str, Dict], k: int = 10,
+                              fetch_k: Optional[int] = None) -> Dict[str, List]:
+        """Run one embedding and one ANN query, then split the hits per filter set.
+
+        ``filter_sets`` maps a name to ``filtered_search`` keyword filters.
+        Milvus is asked for up to ``fetch_k`` candidates matching any of the
+        sets (default ``max(10 * k, 100)``); each set then keeps its first
+        ``k`` matches in similarity order. The broadest set can crowd a narrow
+        one out of that window, so a set left with fewer than ``k`` matches
+        while the window was full gets a search of its own (pushed down when
+        the collection supports filters, ``adaptive_search`` otherwise).
+        """
+        fetch_k = fetch_k or max(k * 10, 100)
+        filtered = self.supports_filters()
+        expr = None
+        if filtered:
+            exprs = [build_filter_expr(**filters) for filters in filter_sets.values()]
+            if exprs and all(exprs):
+                expr = " or ".join(f"({e})" for e in dict.fromkeys(exprs))
+        vector = self.embed_model.embed_query(query)
+        candidates = self.index.similarity_search_by_vector(vector, k=fetch_k, expr=expr)
+        results = {
+            name: [d for d in candidates if matches_filters(d.metadata, **filters)][:k]
+            for name, filters in filter_sets.items()
+        }
+        if len(candidates) < fetch_k:
+            return results  # every match of every set was in the window
+        for name, filters in filter_sets.items():
+            if len(results[name]) >= k:
+                continue
+            if filtered:
+                results[name] = self.index.similarity_search_by_vector(
+                    vector, k=k, expr=build_filter_expr(**filters)
+                )
+            else:
+                # Carry on past the shared window instead of re-scanning it
+                results[name], _ = self.adaptive_search(
+                    query, k, lambda d, filters=filters: matches_filters(d.metadata, **filters),
+                    start=len(candidates), found=results[name],
+                )
+        return results
+
+    def adaptive_search(self, query: str, k: int = 10, predicate: Optional[Callable] = None, *,
+                        expr: Optional[str] = None, max_candidates: Optional[int] = None,
+                        start: int = 0, found: Optional[List] = None) -> Tuple[List, int]:
+        """Page through nearest neighbours until ``k`` of them pass ``predicate``.
+
+        The first page holds ``2 * k`` candidates and every further page
+        doubles the window, fetched with a search offset so no candidate is
+        returned twice. Paging stops once ``k`` matches are collected, the
+        collection runs out or ``max_candidates`` (``SEARCH_MAX_CANDIDATES``,
+        default 1000) have been scanned. A caller that already scanned the
+        first ``start`` candidates passes them as ``start`` and the matches
+        among them as ``found``; paging then resumes at that offset. Returns
+        the matches in similarity order and the number of candidates scanned.
+        """
+        if max_candidates is None:
+            max_candidates = int(os.getenv("SEARCH_MAX_CANDIDATES") or DEFAULT_MAX_CANDIDATES)
+        max_candidates = min(max(max_candidates, k), MAX_SEARCH_WINDOW)
+        vector = self.embed_model.embed_query(query)
+        matches: List = list(found or [])
+        scanned = start
+        window = min(start + 2 * k, max_candidates)
+        while len(matches) < k and scanned < window:
+            page = self.index.similarity_search_with_score_by_vector(
+                vector, k=window - scanned, expr=expr, offset=scanned
+            )
+            scanned += len(page)
+            matches.extend(doc for doc, _ in page if predicate is None or predicate(doc))
+            if scanned < window:
+                break  # fewer rows than requested: nothing left to scan
+            window = min(window * 2, max_candidates)
+        return matches[:k], scanned
+
+    def report_cache_stats(self) -> None:
+        print(format_cache_stats(self.embed_model.stats()))
+
+    def has_collection(self) -> bool:
+        return self._alias_target() is not None or utility.has_collection(self.collection_name)
+
+    def row_count(self) -> int:
+        """Number of entities in the live collection, without running a search."""
+        col = self.index.col
+        if col is None:
+            return 0
+        try:
+            return int(col.query(expr="", output_fields=["count(*)"])[0]["count(*)"])
+        except MilvusException:
+            # Collection not loaded: fall back to the flushed segment count
+            return col.num_entities
+
+    def stats(self, cardinality_fields=CARDINALITY_FIELDS) -> Dict:
+        """Describe the live collection from Milvus metadata.
+
+        Returns row count, the physical collection behind the alias, load
+        state, per-index build progress, the last-ingest time and the number
+        of distinct values for each of ``cardinality_fields``. Nothing is
+        embedded; cardinalities scan only the requested scalar columns.
+        """
+        col = self.index.col
+        stats = {
+            "collection": self.collection_name,
+            "exists": col is not None,
+            "physical_collection": None,
+            "row_count": 0,
+            "load_state": None,
+            "indexes": [],
+            "last_ingest": None,
+            "cardinalities": {},
+        }
+        if col is None:
+            return stats
+
+        physical = self._alias_target() or self.collection_name
+        stats["physical_collection"] = physical
+        stats["row_count"] = self.row_count()
+        stats["load_state"] = str(utility.load_state(physical))
+        for index in col.indexes:
+            progress = utility.index_building_progress(physical, index_name=index.index_name)
+            stats["indexes"].append({
+                "field": index.field_name,
+                "index_type": index.params.get("index_type"),
+                "params": index.params.get("params", {}),
+                "indexed_rows": progress.get("indexed_rows"),
+                "pending_rows": progress.get("pending_index_rows", 0),
+            })
+        properties = dict(col.describe().get("properties") or {})
+        stats["last_ingest"] = properties.get(LAST_INGEST_PROPERTY) or self._timestamp_from_name(physical)
+
+        fields = [f for f in cardinality_fields if f in self.index.fields]
+        if fields:
+            distinct = {f: set() for f in fields}
+            iterator = col.query_iterator(batch_size=1000, output_fields=fields)
+            try:
+                while True:
+                    batch = iterator.next()
+                    if not batch:
+                        break
+                    for row in batch:
+                        for f in fields:
+                            distinct[f].add(row.get(f))
+            finally:
+                iterator.close()
+            stats["cardinalities"] = {f: len(values) for f, values in distinct.items()}
+        return stats
+
+    def _timestamp_from_name(self, physical_name: Optional[str]) -> Optional[str]:
+        # Rebuilds are named ``<alias>__YYYYmmddHHMMSS``
+        if not physical_name or not physical_name.startswith(self._shadow_prefix()):
+            return None
+        try:
+            stamp = datetime.strptime(physical_name[len(self._shadow_prefix()):], "%Y%m%d%H%M%S")
+        except ValueError:
+            return None
+        return stamp.isoformat()
+
+    # ------------------------------------------------------------------
+    def _alias_target(self) -> Optional[str]:
+        """Return the physical collection the alias points to, if any."""
+        for name in utility.list_collections():
+            if self.collection_name in utility.list_aliases(name):
+                return name
+        return None
+
+    def _shadow_prefix(self) -> str:
+        return f"{self.collection_name}__"
+
+    def _promote(self, physical_name: str) -> None:
+        """Point the alias at ``physical_name`` and drop the collection it replaces.
+
+        Repointing an existing alias is atomic. Migrating a plain collection
+        is not: Milvus refuses an alias named like an existing collection, and
+        readers in other processes only know that name, so the collection is
+        dropped right before the alias is created and searches fail in between.
+        """
+        previous = self._alias_target()
+        if previous:
+            utility.alter_alias(physical_name, self.collection_name)
+        else:
+            if utility.has_collection(self.collection_name):
+                print(f"⚠️ Migrating plain collection '{self.collection_name}' to an alias; "
+                      f"searches fail until the alias is created")
+                utility.drop_collection(self.collection_name)
+            utility.create_alias(physical_name, self.collection_name)
+        self.index = self._connect_index()
+        if previous and previous != physical_name:
+            utility.drop_collection(previous)
+
+    def begin_rebuild(self) -> CollectionRebuild:
+        """Start a blue/green rebuild into a new shadow collection.
+
+        Shadows left behind by a crashed rebuild are dropped once they are
+        older than ``MILVUS_STALE_SHADOW_HOURS`` (default 24); younger ones
+        may belong to a rebuild still running elsewhere (e.g. ``csv-load``
+        during the nightly ingest) and are left alone.
+        """
+        live = self._alias_target()
+        max_age = float(os.getenv("MILVUS_STALE_SHADOW_HOURS") or DEFAULT_STALE_SHADOW_HOURS) * 3600
+        now = datetime.now()
+        for name in utility.list_collections():
+            if not name.startswith(self._shadow_prefix()) or name == live:
+                continue
+            stamp = self._timestamp_from_name(name)
+            if stamp is None:
+                continue
+            if (now - datetime.fromisoformat(stamp)).total_seconds() > max_age:
+                print(f"🧹 Dropping stale shadow collection '{name}'")
+                utility.drop_collection(name)
+            else:
+                print(f"⏳ Leaving shadow collection '{name}'; another rebuild may still be writing it")
+        physical_name = f"{self._shadow_prefix()}{now.strftime('%Y%m%d%H%M%S')}"
+        return CollectionRebuild(self, physical_name)
+
+    # ------------------------------------------------------------------
     def add_documents(self, docs_with_metadata: List[Dict]):
-        texts = [d["text"] for d in docs_with_metadata]
-        metadatas = [d["metadata"] for d in docs_with_metadata]
-        self.index.add_texts(texts, metadatas=metadatas)
+        """Embed in concurrent batches and insert each batch as it completes."""
+        inserted = False
+        for batch, vectors in self.engine.iter_embedded(docs_with_metadata):
+            insert_embedded(self.index, batch, vectors)
+            inserted = True
+        if inserted:
+            mark_ingested(self.index.col)
 
-    def overwrite_documents(self, docs_with_metadata: List[Dict]):
-        if utility.has_collection(self.collection_name):
-            utility.drop_collection(self.collection_name)
-        self.index = Milvus.from_texts(
-            [d["text"] for d in docs_with_metadata],
-            embedding=self.embed_model,
-            metadatas=[d["metadata"] for d in docs_with_metadata],
-            collection_name=self.collection_name,
-            connection_args=self.connection_args,
-        )
+    def delete_by_notice_ids(self, notice_ids: List[str], batch_size: int = 500) -> None:
+        """Delete every entity whose ``notice_id`` is in ``notice_ids``."""
+        if self.index.col is None or not notice_ids:
+            return
+        for i in range(0, len(notice_ids), batch_size):
+            batch = notice_ids[i:i + batch_size]
+            self.index.delete(expr=f"notice_id in {json.dumps(batch)}")
 
+    def upsert_documents(self, docs_with_metadata: List[Dict]):
+        """Replace any stored versions of these notices with the new documents."""
+        notice_ids = [d["metadata"]["notice_id"] for d in docs_with_metadata if d["metadata"].get("notice_id")]
+        self.delete_by_notice_ids(notice_ids)
+        self.add_documents(docs_with_metadata)
+
+    def overwrite_documents(self, docs_with_metadata: List[Dict]):
+        """Rebuild the collection from ``docs_with_metadata`` without a search outage."""
+        rebuild = self.begin_rebuild()
+        try:
+            rebuild.add_documents(docs_with_metadata)
+            rebuild.commit()
+        except Exception:
+            rebuild.abort()
+            raise
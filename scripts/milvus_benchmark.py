@@ -0,0 +1,196 @@
+"""Benchmark Milvus index types on the stored corpus.
+
+Copies the live collection's vectors into throwaway collections, one per
+index type, and reports recall@k against exact FLAT search together with
+p50/p99 search latency for each ``ef`` / ``nprobe`` setting::
+
+    pipenv run python -m scripts.milvus_benchmark --k 10 --queries 200
+"""
+
+import argparse
+import math
+import random
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, utility
+
+from rag.milvus_index import INDEX_TYPES, build_index_params, build_search_params
+
+DEFAULT_EF_VALUES = (16, 32, 64, 128, 256)
+DEFAULT_NPROBE_VALUES = (1, 4, 16, 64)
+
+
+def recall_at_k(approx_ids: Sequence, exact_ids: Sequence, k: int) -> float:
+    """Fraction of the exact top ``k`` that the approximate search returned."""
+    truth = set(list(exact_ids)[:k])
+    if not truth:
+        return 1.0
+    return len(truth & set(list(approx_ids)[:k])) / len(truth)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (``pct`` in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), math.ceil(pct / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def _load_vectors(col: Collection, vector_field: str, limit: Optional[int] = None) -> List[List[float]]:
+    vectors = []
+    iterator = col.query_iterator(batch_size=1000, output_fields=[vector_field])
+    try:
+        while True:
+            batch = iterator.next()
+            if not batch:
+                break
+            vectors.extend(list(row[vector_field]) for row in batch)
+            if limit and len(vectors) >= limit:
+                break
+    finally:
+        iterator.close()
+    return vectors[:limit] if limit else vectors
+
+
+def _build_collection(name: str, vectors: List[List[float]], index_params: Dict) -> Collection:
+    # Rows are renumbered 0..n-1: the source pks may be INT64 or legacy
+    # VARCHAR uuids, and recall only needs ids that agree across collections
+    ids = list(range(len(vectors)))
+    if utility.has_collection(name):
+        utility.drop_collection(name)
+    schema = CollectionSchema([
+        FieldSchema("pk", DataType.INT64, is_primary=True),
+        FieldSchema("vector", DataType.FLOAT_VECTOR, dim=len(vectors[0])),
+    ])
+    col = Collection(name, schema)
+    for i in range(0, len(ids), 1000):
+        col.insert([ids[i:i + 1000], vectors[i:i + 1000]])
+    col.flush()
+    col.create_index("vector", index_params=index_params)
+    utility.wait_for_index_building_complete(name)
+    col.load()
+    return col
+
+
+def _search_ids(col: Collection, queries: List[List[float]], k: int, params: Dict):
+    results, latencies = [], []
+    for vector in queries:
+        started = time.perf_counter()
+        hits = col.search(data=[vector], anns_field="vector", param=params, limit=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append([hit.id for hit in hits[0]])
+    return results, latencies
+
+
+def _settings(index_type: str, ef_values: Iterable[int], nprobe_values: Iterable[int]):
+    if index_type == "HNSW":
+        return [{"ef": ef} for ef in ef_values]
+    if index_type in ("IVF_FLAT", "IVF_SQ8"):
+        return [{"nprobe": nprobe} for nprobe in nprobe_values]
+    return [{}]
+
+
+def run_benchmark(
+    store,
+    index_types: Iterable[str] = INDEX_TYPES,
+    k: int = 10,
+    num_queries: int = 100,
+    query_texts: Optional[List[str]] = None,
+    ef_values: Iterable[int] = DEFAULT_EF_VALUES,
+    nprobe_values: Iterable[int] = DEFAULT_NPROBE_VALUES,
+    limit: Optional[int] = None,
+    seed: int = 13,
+) -> List[Dict]:
+    """Return one result row per index type and search setting."""
+    source = store.index
+    if source.col is None:
+        print("⚠️ No collection to benchmark. Run ingest or csv-load first.")
+        return []
+
+    metric = source.metric_type() or store.index_params["metric_type"]
+    vectors = _load_vectors(source.col, source._vector_field, limit)
+    if not vectors:
+        print("⚠️ Collection is empty.")
+        return []
+    if query_texts:
+        queries = [store.embed_model.embed_query(text) for text in query_texts]
+    else:
+        queries = random.Random(seed).sample(vectors, min(num_queries, len(vectors)))
+    print(f"📊 Benchmarking {len(vectors)} vectors with {len(queries)} queries, k={k}")
+
+    prefix = f"bench__{store.collection_name}__"
+    built = []
+    rows = []
+    try:
+        flat = _build_collection(f"{prefix}flat", vectors, build_index_params("FLAT", metric))
+        built.append(flat.name)
+        truth, _ = _search_ids(flat, queries, k, build_search_params("FLAT", metric))
+
+        for index_type in index_types:
+            index_type = index_type.upper()
+            if index_type == "FLAT":
+                col = flat
+            else:
+                col = _build_collection(f"{prefix}{index_type.lower()}", vectors,
+                                        build_index_params(index_type, metric))
+                built.append(col.name)
+            for setting in _settings(index_type, ef_values, nprobe_values):
+                params = build_search_params(index_type, metric, k=k, **setting)
+                found, latencies = _search_ids(col, queries, k, params)
+                recall = sum(recall_at_k(a, e, k) for a, e in zip(found, truth)) / len(queries)
+                rows.append({
+                    "index_type": index_type,
+                    "params": params["params"],
+                    "recall": recall,
+                    "p50_ms": percentile(latencies, 50),
+                    "p99_ms": percentile(latencies, 99),
+                })
+    finally:
+        for name in built:
+            utility.drop_collection(name)
+    return rows
+
+
+def print_results(rows: List[Dict], k: int) -> None:
+    print(f"\n{'index':<10} {'params':<18} {'recall@' + str(k):>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for row in rows:
+        params = ",".join(f"{key}={value}" for key, value in row["params"].items()) or "-"
+        print(f"{row['index_type']:<10} {params:<18} {row['recall']:>10.3f} {row['p50_ms']:>9.2f} {row['p99_ms']:>9.2f}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from utils.env_loader import load_env
+    from rag.milvus_store import MilvusStore
+
+    parser = argparse.ArgumentParser(description="Milvus index recall/latency benchmark")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100, help="Number of stored vectors to use as queries")
+    parser.add_argument("--query", action="append", help="Use this text as a query (repeatable)")
+    parser.add_argument("--index-types", default=",".join(INDEX_TYPES))
+    parser.add_argument("--ef", default=",".join(map(str, DEFAULT_EF_VALUES)))
+    parser.add_argument("--nprobe", default=",".join(map(str, DEFAULT_NPROBE_VALUES)))
+    parser.add_argument("--limit", type=int, help="Only copy this many vectors")
+    args = parser.parse_args(argv)
+
+    config = load_env()
+    store = MilvusStore(
+        host=config.get("MILVUS_HOST") or "localhost",
+        port=config.get("MILVUS_PORT") or "19530",
+    )
+    rows = run_benchmark(
+        store,
+        index_types=[t.strip() for t in args.index_types.split(",") if t.strip()],
+        k=args.k,
+        num_queries=args.queries,
+        query_texts=args.query,
+        ef_values=[int(v) for v in args.ef.split(",") if v],
+        nprobe_values=[int(v) for v in args.nprobe.split(",") if v],
+        limit=args.limit,
+    )
+    print_results(rows, args.k)
+
+
+if __name__ == "__main__":
+    main()
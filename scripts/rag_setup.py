@@ -9,6 +9,8 @@ from botocore.exceptions import ClientError
 
 from utils.env_loader import load_env
 from utils.rag_helpers import filter_valid_opportunities
+from utils.archive_segments import iter_archive_records
+from utils.solicitation_assets import attachment_pointers
 from rag.milvus_store import MilvusStore
 
 
@@ -35,95 +37,89 @@ def run() -> None:
     )
 
     bucket = "sam-archive"
-    paginator = s3.get_paginator("list_objects_v2")
-
     docs: List[dict] = []
     processed = skipped = failed = 0
     pdf_missing = 0
 
-    for page in paginator.paginate(Bucket=bucket):
-        for obj in page.get("Contents", []):
-            key = obj["Key"]
-            if not key.endswith(".json"):
-                continue
-            parts = key.split("/")
-            # Expect keys like YYYY/MM/DD/<notice_id>.json
-            if len(parts) != 4:
-                continue
-
-            processed += 1
-
-            try: 
-                body = s3.get_object(Bucket=bucket, Key=key)["Body"].read()
-                record = json.loads(body)
-            except Exception as e:
-                print(f"⚠️ Failed to load {key}: {e}")
-                failed += 1
-                continue
-
-            if not filter_valid_opportunities([record]):
-                print(f"skipped filter_valid_opportunities {record}")
-                skipped += 1
-                continue
-
-            set_aside = (record.get("typeOfSetAside") or "").lower()
-            if "sba" not in set_aside and "sdvosbc" not in set_aside:
-                print(f"skipped set-aside {set_aside}")
-                skipped += 1
-                continue
-
-            notice_id = record.get("noticeId") or os.path.splitext(os.path.basename(key))[0]
-            date_prefix = os.path.dirname(key)
-            asset_prefix = f"{date_prefix}/{notice_id}/"
-
-            pdf_texts = []
-
-            # description.json contains additional text if present
+    def load_failed(key, error):
+        nonlocal failed
+        print(f"⚠️ Failed to load {key}: {error}")
+        failed += 1
+
+    # Plain YYYY/MM/DD/<notice_id>.json objects and compressed day segments
+    for key, record in iter_archive_records(s3, bucket, on_error=load_failed):
+        processed += 1
+
+        if not filter_valid_opportunities([record]):
+            print(f"skipped filter_valid_opportunities {record}")
+            skipped += 1
+            continue
+
+        set_aside = (record.get("typeOfSetAside") or "").lower()
+        if "sba" not in set_aside and "sdvosbc" not in set_aside:
+            print(f"skipped set-aside {set_aside}")
+            skipped += 1
+            continue
+
+        notice_id = record.get("noticeId") or os.path.splitext(os.path.basename(key))[0]
+        date_prefix = os.path.dirname(key)
+        asset_prefix = f"{date_prefix}/{notice_id}/"
+
+        pdf_texts = []
+
+        # description.json contains additional text if present
+        try:
+            desc_obj = s3.get_object(Bucket=bucket, Key=f"{asset_prefix}description.json")
+            desc_data = json.loads(desc_obj["Body"].read())
+            extra_desc = desc_data.get("description") if isinstance(desc_data, dict) else None
+        except ClientError:
+            extra_desc = None
+        except Exception as e:
+            print(f"⚠️ Failed to load description for {notice_id}: {e}")
+            extra_desc = None
+
+        resp = s3.list_objects_v2(Bucket=bucket, Prefix=asset_prefix)
+        if resp.get("KeyCount", 0) == 0:
+            pdf_missing += 1
+        # PDFs stored in the notice folder, or shared blobs listed in attachments.json
+        pdf_keys = [item["Key"] for item in resp.get("Contents", []) if item["Key"].lower().endswith(".pdf")]
+        try:
+            pdf_keys.extend(
+                p.get("blob") or p["key"] for p in attachment_pointers(s3, bucket, asset_prefix)
+                if p["key"].lower().endswith(".pdf")
+            )
+        except Exception as e:
+            print(f"⚠️ Failed to load attachment list for {notice_id}: {e}")
+        for pdf_key in dict.fromkeys(pdf_keys):
             try:
-                desc_obj = s3.get_object(Bucket=bucket, Key=f"{asset_prefix}description.json")
-                desc_data = json.loads(desc_obj["Body"].read())
-                extra_desc = desc_data.get("description") if isinstance(desc_data, dict) else None
-            except ClientError:
-                extra_desc = None
+                pdf_bytes = s3.get_object(Bucket=bucket, Key=pdf_key)["Body"].read()
+                pdf_texts.append(extract_pdf_text(pdf_bytes))
             except Exception as e:
-                print(f"⚠️ Failed to load description for {notice_id}: {e}")
-                extra_desc = None
-
-            resp = s3.list_objects_v2(Bucket=bucket, Prefix=asset_prefix)
-            if resp.get("KeyCount", 0) == 0:
-                pdf_missing += 1
-            for item in resp.get("Contents", []):
-                if not item["Key"].lower().endswith(".pdf"):
-                    continue
-                try:
-                    pdf_bytes = s3.get_object(Bucket=bucket, Key=item["Key"])["Body"].read()
-                    pdf_texts.append(extract_pdf_text(pdf_bytes))
-                except Exception as e:
-                    print(f"⚠️ Failed to fetch PDF {item['Key']}: {e}")
-
-            text_parts = [record.get("title"), record.get("description")]
-            if extra_desc:
-                if isinstance(extra_desc, str):
-                    text_parts.append(extra_desc)
-                else:
-                    text_parts.append(json.dumps(extra_desc))
-            text_parts.extend(pdf_texts)
-
-            text_blob = "\n\n".join(part for part in text_parts if part)
-
-            metadata = {
-                "notice_id": notice_id,
-                "title": record.get("title") or "",
-                "naics": record.get("naics") or record.get("naicsCode") or "",
-                "agency": record.get("agency") or "",
-                "setaside": record.get("setAsideCode") or "",
-                "response_deadline": record.get("responseDeadLine") or record.get("responseDeadline") or "",
-                "notice_type": record.get("noticeType") or "",
-                "link": record.get("uiLink") or record.get("url") or "",
-            }
-
-            docs.append({"text": text_blob, "metadata": metadata})
-            print(f"✅ Ingested {notice_id}")
+                print(f"⚠️ Failed to fetch PDF {pdf_key}: {e}")
+
+        text_parts = [record.get("title"), record.get("description")]
+        if extra_desc:
+            if isinstance(extra_desc, str):
+                text_parts.append(extra_desc)
+            else:
+                text_parts.append(json.dumps(extra_desc))
+        text_parts.extend(pdf_texts)
+
+        text_blob = "\n\n".join(part for part in text_parts if part)
+
+        metadata = {
+            "notice_id": notice_id,
+            "title": record.get("title") or "",
+            "naics": record.get("naics") or record.get("naicsCode") or "",
+            "agency": record.get("agency") or "",
+            "setaside": record.get("setAsideCode") or "",
+            "response_deadline": record.get("responseDeadLine") or record.get("responseDeadline") or "",
+            "notice_type": record.get("noticeType") or "",
+            "link": record.get("uiLink") or record.get("url") or "",
+        }
+
+        docs.append({"text": text_blob, "metadata": metadata})
+        print(f"✅ Ingested {notice_id}")
 
     print(
         f"\n📊 Processed: {processed} | Stored: {len(docs)} | "
@@ -0,0 +1,155 @@
+"""Measure CLI start-up import cost for each main.py mode.
+
+Each mode's imports are read from main.py itself: the import statements in
+the mode's ``args.mode == ...`` branch, in the helpers that branch uses and
+in shared set-up such as ``connect_store`` for ``STORE_MODES``. Every mode
+then runs ``import main`` plus exactly those statements in a fresh
+interpreter under ``-X importtime``, without connecting to any service.
+Statements from all of a mode's sub-branches are included, so the figure is
+what the most expensive invocation of the mode loads. Reports the median
+import time, how many modules were loaded and which heavy packages came
+along::
+
+    pipenv run python -m scripts.startup_benchmark --repeat 5
+    pipenv run python -m scripts.startup_benchmark --mode search --mode enrich
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, Iterable, List, Optional
+
+HEAVY_PACKAGES = ("langchain", "langchain_core", "langchain_community", "pymilvus",
+                  "boto3", "pdfplumber", "llama_api_client", "numpy")
+
+_PROBE = """
+import json, sys
+import main
+for statement in json.loads(sys.argv[1]):
+    exec(statement)
+heavy = json.loads(sys.argv[2])
+print(json.dumps({
+    "modules": len(sys.modules),
+    "heavy": [p for p in heavy if p in sys.modules],
+}))
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_PATH = os.path.join(ROOT, "main.py")
+
+
+def _mode_branches(node: ast.AST) -> Dict[str, List[ast.stmt]]:
+    """Map each ``args.mode == "<mode>"`` test in an if/elif chain to its body."""
+    branches: Dict[str, List[ast.stmt]] = {}
+    while isinstance(node, ast.If):
+        test = node.test
+        if (isinstance(test, ast.Compare) and isinstance(test.left, ast.Attribute)
+                and test.left.attr == "mode" and isinstance(test.comparators[0], ast.Constant)):
+            branches[test.comparators[0].value] = node.body
+        node = node.orelse[0] if len(node.orelse) == 1 else None
+    return branches
+
+
+def _imports(nodes: Iterable[ast.AST], functions: Dict[str, ast.FunctionDef]) -> List[str]:
+    """Import statements in ``nodes`` and in the main.py functions they reference."""
+    statements: List[str] = []
+    seen = set()
+    pending = list(nodes)
+    while pending:
+        for node in ast.walk(pending.pop(0)):
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                statement = ast.unparse(node)
+                if statement not in statements:
+                    statements.append(statement)
+            elif isinstance(node, ast.Name) and node.id in functions and node.id not in seen:
+                # Called or passed along (serve hands ``search`` to the query service)
+                seen.add(node.id)
+                pending.append(functions[node.id])
+    return statements
+
+
+def mode_imports(path: str = MAIN_PATH) -> Dict[str, List[str]]:
+    """Return the import statements each main.py mode executes, keyed by mode."""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    functions = {node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)}
+    store_modes = set()
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "STORE_MODES" for t in node.targets):
+            store_modes = ast.literal_eval(node.value)
+
+    main_fn = functions.pop("main")
+    branches: Dict[str, List[ast.stmt]] = {}
+    shared, store_only = [], []
+    for node in main_fn.body:
+        found = _mode_branches(node)
+        if found:
+            branches.update(found)
+        elif any(isinstance(n, ast.Name) and n.id == "STORE_MODES" for n in ast.walk(node)):
+            store_only.append(node)
+        else:
+            shared.append(node)
+
+    return {
+        mode: _imports(shared + (store_only if mode in store_modes else []) + body, functions)
+        for mode, body in branches.items()
+    }
+
+
+def _import_seconds(stderr: str) -> float:
+    """Sum the ``self`` microseconds of every ``-X importtime`` line."""
+    total = 0
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            self_us = line[len("import time:"):].split("|")[0].strip()
+            if self_us.isdigit():
+                total += int(self_us)
+    return total / 1e6
+
+
+def probe(mode: str, statements: Optional[List[str]] = None) -> Dict:
+    """Run one mode's imports in a fresh interpreter and report the cost."""
+    if statements is None:
+        statements = mode_imports()[mode]
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE, json.dumps(statements), json.dumps(HEAVY_PACKAGES)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["seconds"] = _import_seconds(out.stderr)
+    return result
+
+
+def measure(mode: str, statements: List[str], repeat: int = 3) -> Dict:
+    runs = [probe(mode, statements) for _ in range(repeat)]
+    return {
+        "mode": mode,
+        "median_ms": statistics.median(r["seconds"] for r in runs) * 1000,
+        "modules": runs[-1]["modules"],
+        "heavy": runs[-1]["heavy"],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    imports = mode_imports()
+
+    parser = argparse.ArgumentParser(description="Per-mode CLI start-up benchmark")
+    parser.add_argument("--mode", action="append", choices=sorted(imports), help="Mode to measure (repeatable)")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per mode (median is reported)")
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<11} {'median ms':>10} {'modules':>8}  heavy imports")
+    for mode in args.mode or imports:
+        result = measure(mode, imports[mode], args.repeat)
+        print(f"{mode:<11} {result['median_ms']:>10.0f} {result['modules']:>8}  {', '.join(result['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,19 @@
 """Task package exports."""
 
-from .archive_solicitations_task import ArchiveSolicitationsTask
-from .pull_solicitations_task import PullSolicitationsTask
-from .preprocess_task import PreprocessTask
+from importlib import import_module
+
+# Resolved on first access so importing one task (e.g. the CSV loader) does
+# not pull in the dependencies of the others (boto3 for archiving).
+_EXPORTS = {
+    "ArchiveSolicitationsTask": ".archive_solicitations_task",
+    "PullSolicitationsTask": ".pull_solicitations_task",
+    "PreprocessTask": ".preprocess_task",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,17 +4,58 @@ from __future__ import annotations
 
 import os
 import json
-from datetime import datetime
-from typing import Iterable, Dict
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Iterable, Dict, List, Optional, Set
 
 import boto3
 from botocore.exceptions import ClientError
 
+from utils.archive_segments import encode_segment, index_key, is_segment_key, read_manifest, segment_key
+from utils.solicitation_assets import MANIFEST_NAME, is_record_key
 from .base_task import BaseTask
 
+DEFAULT_WORKERS = 8
+DEFAULT_SEGMENT_SIZE = 5000
+DEFAULT_MAX_BUFFERED = 20000
+ARCHIVE_FORMATS = ("json", "segments")
+
+
+def posted_day_prefix(posted: str) -> Optional[str]:
+    """Return the ``YYYY/MM/DD`` archive prefix for a SAM ``postedDate``."""
+    try:
+        dt = datetime.fromisoformat(posted.replace("Z", "+00:00"))
+    except Exception:
+        # Fallback to simple date parsing
+        try:
+            dt = datetime.strptime(posted, "%m/%d/%Y")
+        except Exception:
+            return None
+    return dt.strftime("%Y/%m/%d")
+
 
 class ArchiveSolicitationsTask(BaseTask):
-    """Save full solicitation records to a MinIO bucket and local disk."""
+    """Save full solicitation records to a MinIO bucket and local disk.
+
+    Records are archived a day at a time. The notice ids already stored for
+    a day are learned once, from the day's ``_manifest.json`` or, failing
+    that, a single listing of its ``YYYY/MM/DD/`` prefix, and remembered for
+    the life of the task. Only missing records are uploaded, on a pool of
+    ``workers`` threads (``ARCHIVE_WORKERS``) sharing one S3 client. Days
+    that gained notices are remembered and their manifests are written once,
+    by :meth:`flush` at the end of the run.
+
+    ``archive_format`` (``ARCHIVE_FORMAT``) selects the layout: ``json``
+    stores one object per notice, ``segments`` gzip NDJSON segments plus
+    offset indexes (see ``utils.archive_segments``). Segment records are
+    buffered per day across ``execute`` calls and written when a day holds
+    ``segment_size`` notices (``ARCHIVE_SEGMENT_SIZE``) or on :meth:`flush`,
+    so a run produces one segment per day rather than one per page. At most
+    ``max_buffered`` records (``ARCHIVE_MAX_BUFFERED``) are held across all
+    days; past that the largest day is written early, so a wide backfill
+    leaves a few segments per day instead of holding every record in memory.
+    """
 
     def __init__(
         self,
@@ -23,9 +64,25 @@ class ArchiveSolicitationsTask(BaseTask):
         bucket: str = "sam-archive",
         endpoint_url: str | None = None,
         dry_run: bool = False,
+        workers: int | None = None,
+        archive_format: str | None = None,
+        segment_size: int | None = None,
+        max_buffered: int | None = None,
     ) -> None:
         self.bucket = bucket
         self.dry_run = dry_run
+        self.workers = workers or int(os.getenv("ARCHIVE_WORKERS") or DEFAULT_WORKERS)
+        self.archive_format = (archive_format or os.getenv("ARCHIVE_FORMAT") or "json").lower()
+        if self.archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(
+                f"Unsupported archive format {self.archive_format!r}; expected one of {', '.join(ARCHIVE_FORMATS)}"
+            )
+        self.segment_size = segment_size or int(os.getenv("ARCHIVE_SEGMENT_SIZE") or DEFAULT_SEGMENT_SIZE)
+        self.max_buffered = max_buffered or int(os.getenv("ARCHIVE_MAX_BUFFERED") or DEFAULT_MAX_BUFFERED)
+        self._archived: Dict[str, Set[str]] = {}
+        self._segments: Dict[str, List[str]] = {}
+        self._buffered: Dict[str, Dict[str, Dict]] = defaultdict(dict)
+        self._dirty: Set[str] = set()
 
         self.s3 = boto3.client(
             "s3",
@@ -48,17 +105,59 @@ class ArchiveSolicitationsTask(BaseTask):
             self.s3.create_bucket(Bucket=self.bucket)
 
     # ------------------------------------------------------------------
-    def _object_exists(self, key: str) -> bool:
+    def _archived_ids(self, day: str) -> Set[str]:
+        """Notice ids already archived under ``day``, read from S3 once per day."""
+        if day in self._archived:
+            return self._archived[day]
+        manifest = None
         try:
-            self.s3.head_object(Bucket=self.bucket, Key=key)
-            return True
-        except ClientError:
-            return False
+            manifest = read_manifest(self.s3, self.bucket, day)
+        except ValueError as e:
+            print(f"⚠️ Ignoring unreadable manifest for {day}: {e}")
+        if manifest is not None:
+            ids = set(manifest.get("notices", []))
+            segments = list(manifest.get("segments", []))
+        else:
+            ids, segments = set(), []
+            paginator = self.s3.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{day}/", Delimiter="/"):
+                for obj in page.get("Contents", []):
+                    key = obj["Key"]
+                    if is_record_key(key):
+                        ids.add(os.path.splitext(os.path.basename(key))[0])
+                    elif is_segment_key(key):
+                        segments.append(key)
+            indexed = []
+            for segment in segments:
+                try:
+                    index = self.s3.get_object(Bucket=self.bucket, Key=index_key(segment))["Body"].read()
+                    ids.update(json.loads(index))
+                except (ClientError, ValueError) as e:
+                    # Its notices are archived again into a segment that has an index
+                    print(f"⚠️ Ignoring segment {segment} without a readable index: {e}")
+                    continue
+                indexed.append(segment)
+            segments = indexed
+        self._archived[day] = ids
+        self._segments[day] = segments
+        return ids
+
+    def _write_manifest(self, day: str) -> None:
+        manifest = {
+            "notices": sorted(self._archived[day]),
+            "segments": self._segments[day],
+            "updated": datetime.now(timezone.utc).isoformat(),
+        }
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=f"{day}/{MANIFEST_NAME}",
+            Body=json.dumps(manifest).encode("utf-8"),
+        )
 
     # ------------------------------------------------------------------
-    def _upload_with_retry(self, data: Dict, key: str, retries: int = 3) -> bool:
-        """Upload JSON data to S3 with retry logic."""
-        body = json.dumps(data).encode("utf-8")
+    def _upload_with_retry(self, data: Dict | bytes, key: str, retries: int = 3) -> bool:
+        """Upload JSON data (or an already encoded body) to S3 with retry logic."""
+        body = data if isinstance(data, bytes) else json.dumps(data).encode("utf-8")
         for attempt in range(1, retries + 1):
             try:
                 self.s3.put_object(Bucket=self.bucket, Key=key, Body=body)
@@ -69,42 +168,132 @@ class ArchiveSolicitationsTask(BaseTask):
         return False
 
     # ------------------------------------------------------------------
-    def _save_local_copy(self, data: Dict, path: str) -> None:
+    @staticmethod
+    def _local_path(key: str) -> str:
+        path = os.path.join("raw_data", key)
         os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def _save_local_copy(self, data: Dict, path: str) -> None:
         with open(path, "w", encoding="utf-8") as f:
             json.dump(data, f)
 
+    # ------------------------------------------------------------------
+    def _store_json(self, day: str, records: Dict[str, Dict]) -> List[str]:
+        """Upload one object per notice; returns the notice ids stored."""
+        return [
+            notice_id for notice_id, record in records.items()
+            if self._upload_with_retry(record, f"{day}/{notice_id}.json")
+        ]
+
+    def _store_segment(self, day: str, records: Dict[str, Dict]) -> List[str]:
+        """Upload ``records`` as one segment and its index; returns the notice ids stored."""
+        key = segment_key(day)
+        body, index = encode_segment(records.items())
+        with open(self._local_path(key), "wb") as f:
+            f.write(body)
+        if not self._upload_with_retry(body, key):
+            return []
+        # A segment without its index is an orphan the readers skip, so drop it
+        if not self._upload_with_retry(json.dumps(index).encode("utf-8"), index_key(key)):
+            try:
+                self.s3.delete_object(Bucket=self.bucket, Key=key)
+            except Exception as e:
+                print(f"⚠️ Failed to remove segment {key} without an index: {e}")
+            return []
+        self._segments[day].append(key)
+        return list(index)
+
+    def _store(self, pending: Dict[str, Dict[str, Dict]]) -> None:
+        """Upload ``pending`` notices by day and mark the changed days' manifests dirty."""
+        if self.archive_format == "segments":
+            jobs = [(self._store_segment, day, records) for day, records in pending.items()]
+        else:
+            jobs = [
+                (self._store_json, day, {notice_id: record})
+                for day, records in pending.items()
+                for notice_id, record in records.items()
+            ]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            stored = list(pool.map(lambda job: (job[1], job[0](job[1], job[2])), jobs))
+
+        changed = set()
+        for day, notice_ids in stored:
+            if notice_ids:
+                self._archived[day].update(notice_ids)
+                changed.add(day)
+        self._dirty.update(changed)
+        total = sum(len(records) for records in pending.values())
+        uploaded = sum(len(notice_ids) for _, notice_ids in stored)
+        print(f"📦 Archived {uploaded}/{total} new notices across {len(changed)} day(s)")
+
+    def flush(self) -> None:
+        """Write the buffered segment records, then the manifest of every changed day."""
+        pending = {day: records for day, records in self._buffered.items() if records}
+        self._buffered.clear()
+        if pending:
+            self._store(pending)
+        for day in sorted(self._dirty):
+            try:
+                self._write_manifest(day)
+            except Exception as e:
+                print(f"⚠️ Failed to update manifest for {day}: {e}")
+        self._dirty.clear()
+
     # ------------------------------------------------------------------
     def execute(self, opportunities: Iterable[Dict]) -> None:
+        segments = self.archive_format == "segments"
+        by_day: Dict[str, Dict[str, Dict]] = defaultdict(dict)
         for record in opportunities:
             notice_id = record.get("noticeId")
             posted = record.get("postedDate")
             if not notice_id or not posted:
                 continue
 
-            try:
-                dt = datetime.fromisoformat(posted.replace("Z", "+00:00"))
-            except Exception:
-                # Fallback to simple date parsing
-                try:
-                    dt = datetime.strptime(posted, "%m/%d/%Y")
-                except Exception:
-                    print(f"⚠️ Could not parse postedDate '{posted}'")
-                    continue
-
-            key_prefix = dt.strftime("%Y/%m/%d")
-            key = f"{key_prefix}/{notice_id}.json"
-
-            local_path = os.path.join("raw_data", key)
-            self._save_local_copy(record, local_path)
-
-            if self.dry_run:
-                print(f"[DRY RUN] Would upload {key}")
+            day = posted_day_prefix(posted)
+            if day is None:
+                print(f"⚠️ Could not parse postedDate '{posted}'")
                 continue
 
-            if self._object_exists(key):
-                print(f"⏭️ Skipping existing {key}")
-                continue
+            if not segments:
+                self._save_local_copy(record, self._local_path(f"{day}/{notice_id}.json"))
+            by_day[day][notice_id] = record
+
+        if self.dry_run:
+            for day, records in by_day.items():
+                if segments:
+                    print(f"[DRY RUN] Would upload a segment of {len(records)} notices for {day}")
+                    continue
+                for notice_id in records:
+                    print(f"[DRY RUN] Would upload {day}/{notice_id}.json")
+            return
 
-            self._upload_with_retry(record, key)
+        pending: Dict[str, Dict[str, Dict]] = {}
+        for day, records in by_day.items():
+            archived = self._archived_ids(day)
+            skipped = {
+                notice_id for notice_id in records
+                if notice_id in archived or notice_id in self._buffered.get(day, ())
+            }
+            if skipped:
+                print(f"⏭️ Skipping {len(skipped)} already archived notices for {day}")
+            missing = {notice_id: r for notice_id, r in records.items() if notice_id not in skipped}
+            if missing:
+                pending[day] = missing
+        if not segments:
+            if pending:
+                self._store(pending)
+            return
 
+        full = {}
+        for day, records in pending.items():
+            self._buffered[day].update(records)
+            if len(self._buffered[day]) >= self.segment_size:
+                full[day] = self._buffered.pop(day)
+        buffered = sum(len(records) for records in self._buffered.values())
+        while buffered > self.max_buffered:
+            day = max(self._buffered, key=lambda d: len(self._buffered[d]))
+            full[day] = self._buffered.pop(day)
+            buffered -= len(full[day])
+        if full:
+            self._store(full)
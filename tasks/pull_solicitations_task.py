@@ -3,10 +3,26 @@ from .base_task import BaseTask
 from datetime import datetime, timedelta
 
 class PullSolicitationsTask(BaseTask):
-    def __init__(self, api_key):
-        self.client = SamAPIClient(api_key)
+    def __init__(self, api_key, *, use_async=False):
+        if use_async:
+            from utils.async_sam_api import AsyncSamAPIClient
 
-    def execute(self):
-        opportunities = self.client.search_opportunities(limit=100)
+            self.client = AsyncSamAPIClient(api_key)
+        else:
+            self.client = SamAPIClient(api_key)
+
+    @property
+    def failed_pages(self):
+        """Pages the client could not fetch on the last run (async client only)."""
+        return getattr(self.client, "failed_pages", [])
+
+    def execute(self, posted_from=None):
+        opportunities = self.client.search_opportunities(posted_from=posted_from, limit=100)
 
         return opportunities
+
+    def iter_pages(self, posted_from=None):
+        """Return an iterator (async for the async client) over result pages."""
+        if hasattr(self.client, "iter_pages_async"):
+            return self.client.iter_pages_async(posted_from=posted_from, limit=100)
+        return self.client.iter_pages(posted_from=posted_from, limit=100)
@@ -0,0 +1,134 @@
+import json
+
+from tests.test_archive_solicitations import FakeS3, make_task
+from utils.archive_segments import (
+    decode_segment,
+    encode_segment,
+    index_key,
+    is_segment_key,
+    iter_archive_records,
+    load_record,
+)
+
+
+def test_segment_round_trip_and_member_offsets():
+    records = [("a", {"noticeId": "a", "title": "one"}), ("b", {"noticeId": "b", "title": "two"})]
+    body, index = encode_segment(records)
+
+    assert list(decode_segment(body)) == [r for _, r in records]
+    offset, length = index["b"]
+    assert list(decode_segment(body[offset:offset + length])) == [records[1][1]]
+
+
+def test_segment_archive_is_readable_in_bulk_and_by_notice(monkeypatch, tmp_path):
+    s3 = FakeS3({"2025/06/16/plain.json": json.dumps({"noticeId": "plain"}).encode()})
+    task = make_task(monkeypatch, tmp_path, s3, archive_format="segments")
+    task.execute([{"noticeId": nid, "postedDate": "2025-06-16"} for nid in ("plain", "a")])
+    task.execute([{"noticeId": nid, "postedDate": "2025-06-16"} for nid in ("a", "b")])
+    assert not [k for k in s3.objects if is_segment_key(k)]  # buffered until the run ends
+    task.flush()
+
+    segments = [k for k in s3.objects if is_segment_key(k)]
+    assert len(segments) == 1
+    assert json.loads(s3.objects[index_key(segments[0])]).keys() == {"a", "b"}
+    manifest = json.loads(s3.objects["2025/06/16/_manifest.json"])
+    assert manifest["notices"] == ["a", "b", "plain"]
+    assert manifest["segments"] == segments
+    assert (tmp_path / "raw_data" / segments[0]).exists()
+
+    keys = sorted(key for key, _ in iter_archive_records(s3, "bucket", prefix="2025/06/16/"))
+    assert keys == ["2025/06/16/a.json", "2025/06/16/b.json", "2025/06/16/plain.json"]
+
+    s3.calls.clear()
+    assert load_record(s3, "bucket", "2025/06/16/b.json") == {"noticeId": "b", "postedDate": "2025-06-16"}
+    assert s3.calls[-1] == ("get", segments[0])
+    assert load_record(s3, "bucket", "2025/06/16/plain.json") == {"noticeId": "plain"}
+
+
+def test_listing_fallback_reads_segment_indexes(monkeypatch, tmp_path):
+    s3 = FakeS3()
+    task = make_task(monkeypatch, tmp_path, s3, archive_format="segments")
+    task.execute([{"noticeId": "a", "postedDate": "2025-06-16"}])
+    task.flush()
+    del s3.objects["2025/06/16/_manifest.json"]
+
+    task = make_task(monkeypatch, tmp_path, s3, archive_format="json")
+    s3.calls.clear()
+    task.execute([{"noticeId": "a", "postedDate": "2025-06-16"}])
+    assert not [key for name, key in s3.calls if name == "put"]
+
+
+def test_full_day_is_written_before_the_run_ends(monkeypatch, tmp_path):
+    s3 = FakeS3()
+    task = make_task(monkeypatch, tmp_path, s3, archive_format="segments", segment_size=2)
+
+    task.execute([{"noticeId": nid, "postedDate": "2025-06-16"} for nid in ("a", "b", "c")])
+    task.execute([{"noticeId": "d", "postedDate": "2025-06-16"}])
+    task.flush()
+
+    segments = [k for k in s3.objects if is_segment_key(k)]
+    assert sorted(len(json.loads(s3.objects[index_key(k)])) for k in segments) == [1, 3]
+
+
+def test_buffer_cap_writes_the_largest_day_early(monkeypatch, tmp_path):
+    s3 = FakeS3()
+    task = make_task(monkeypatch, tmp_path, s3, archive_format="segments", max_buffered=4)
+
+    task.execute([{"noticeId": f"a{i}", "postedDate": "2025-06-16"} for i in range(3)]
+                 + [{"noticeId": "b0", "postedDate": "2025-06-17"}])
+    assert not [k for k in s3.objects if is_segment_key(k)]
+    task.execute([{"noticeId": "b1", "postedDate": "2025-06-17"}])
+    # Five buffered records: the 16th, the largest day, is written early
+    assert [k.split("/_")[0] for k in s3.objects if is_segment_key(k)] == ["2025/06/16"]
+    assert "2025/06/16/_manifest.json" not in s3.objects
+    task.flush()
+
+    assert sorted(k.split("/_")[0] for k in s3.objects if is_segment_key(k)) == ["2025/06/16", "2025/06/17"]
+    assert json.loads(s3.objects["2025/06/17/_manifest.json"])["notices"] == ["b0", "b1"]
+
+
+def test_segment_without_index_is_removed_and_skipped(monkeypatch, tmp_path):
+    s3 = FakeS3()
+    put_object = s3.put_object
+
+    def failing_index_put(Bucket, Key, Body):
+        if Key.endswith(".index.json"):
+            raise ConnectionError("upload dropped")
+        put_object(Bucket=Bucket, Key=Key, Body=Body)
+
+    s3.put_object = failing_index_put
+    task = make_task(monkeypatch, tmp_path, s3, archive_format="segments")
+    task.execute([{"noticeId": "a", "postedDate": "2025-06-16"}])
+    task.flush()
+    assert not s3.objects
+
+    # An orphan left behind by an older run neither aborts the next one nor is read twice
+    s3.put_object = put_object
+    body, _ = encode_segment([("a", {"noticeId": "a"})])
+    s3.objects["2025/06/16/_segment-20250616T000000000000.ndjson.gz"] = body
+    task = make_task(monkeypatch, tmp_path, s3, archive_format="segments")
+    task.execute([{"noticeId": "a", "postedDate": "2025-06-16"}])
+    task.flush()
+
+    errors = []
+    records = list(iter_archive_records(s3, "bucket", on_error=lambda key, e: errors.append(key)))
+    assert [key for key, _ in records] == ["2025/06/16/a.json"]
+    assert errors == ["2025/06/16/_segment-20250616T000000000000.ndjson.gz"]
+
+
+def test_corrupt_and_truncated_segments_are_reported_not_fatal():
+    body, index = encode_segment([("a", {"noticeId": "a"}), ("b", {"noticeId": "b"})])
+    corrupt = "2025/06/16/_segment-20250616T000000000000.ndjson.gz"
+    truncated = "2025/06/17/_segment-20250617T000000000000.ndjson.gz"
+    s3 = FakeS3({
+        index_key(corrupt): json.dumps(index).encode(),
+        corrupt: body[:10] + b"\x00" * 20 + body[30:],
+        index_key(truncated): json.dumps(index).encode(),
+        truncated: body[:-4],
+        "2025/06/18/c.json": json.dumps({"noticeId": "c"}).encode(),
+    })
+
+    errors = []
+    records = list(iter_archive_records(s3, "bucket", on_error=lambda key, e: errors.append(key)))
+    assert [key for key, _ in records if key.startswith("2025/06/18/")] == ["2025/06/18/c.json"]
+    assert errors == [corrupt, truncated]
@@ -0,0 +1,112 @@
+import io
+import json
+import threading
+
+from botocore.exceptions import ClientError
+
+from tasks import archive_solicitations_task
+from tasks.archive_solicitations_task import ArchiveSolicitationsTask, posted_day_prefix
+from utils.solicitation_assets import is_record_key
+
+
+class FakeS3:
+    def __init__(self, objects=None):
+        self.objects = dict(objects or {})
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _record(self, name, key):
+        with self.lock:
+            self.calls.append((name, key))
+
+    def head_bucket(self, Bucket):
+        pass
+
+    def get_object(self, Bucket, Key, Range=None):
+        self._record("get", Key)
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        body = self.objects[Key]
+        if Range:
+            start, end = Range[len("bytes="):].split("-")
+            body = body[int(start):int(end) + 1]
+        return {"Body": io.BytesIO(body)}
+
+    def put_object(self, Bucket, Key, Body):
+        self._record("put", Key)
+        with self.lock:
+            self.objects[Key] = Body
+
+    def delete_object(self, Bucket, Key):
+        self._record("delete", Key)
+        with self.lock:
+            self.objects.pop(Key, None)
+
+    def get_paginator(self, name):
+        s3 = self
+
+        class Pager:
+            def paginate(self, Bucket, Prefix, Delimiter=None):
+                s3._record("list", Prefix)
+                keys = sorted(k for k in s3.objects if k.startswith(Prefix))
+                if Delimiter:
+                    keys = [k for k in keys if Delimiter not in k[len(Prefix):]]
+                return iter([{"Contents": [{"Key": k} for k in keys]}])
+
+        return Pager()
+
+
+def make_task(monkeypatch, tmp_path, s3, **kwargs):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(archive_solicitations_task.boto3, "client", lambda *a, **kw: s3)
+    return ArchiveSolicitationsTask("key", "secret", workers=4, **kwargs)
+
+
+def test_posted_day_prefix():
+    assert posted_day_prefix("2025-06-16T10:00:00Z") == "2025/06/16"
+    assert posted_day_prefix("06/17/2025") == "2025/06/17"
+    assert posted_day_prefix("soon") is None
+
+
+def test_uploads_only_missing_records_and_writes_manifest(monkeypatch, tmp_path):
+    s3 = FakeS3({
+        "2025/06/16/old.json": b"{}",
+        "2025/06/16/old/description.json": b"{}",
+    })
+    task = make_task(monkeypatch, tmp_path, s3)
+    records = [{"noticeId": nid, "postedDate": "2025-06-16"} for nid in ("old", "a", "b")]
+
+    task.execute(records)
+    task.flush()
+
+    puts = sorted(key for name, key in s3.calls if name == "put")
+    assert puts == ["2025/06/16/_manifest.json", "2025/06/16/a.json", "2025/06/16/b.json"]
+    assert [c for c in s3.calls if c[0] == "list"] == [("list", "2025/06/16/")]
+    manifest = json.loads(s3.objects["2025/06/16/_manifest.json"])
+    assert manifest["notices"] == ["a", "b", "old"]
+    assert (tmp_path / "raw_data" / "2025" / "06" / "16" / "a.json").exists()
+
+    # A later page for the same day neither lists nor re-uploads anything
+    s3.calls.clear()
+    task.execute([{"noticeId": "a", "postedDate": "2025-06-16"}, {"noticeId": "c", "postedDate": "2025-06-16"}])
+    assert s3.calls == [("put", "2025/06/16/c.json")]
+    # The manifest is written once, when the run ends
+    task.flush()
+    assert s3.calls[1:] == [("put", "2025/06/16/_manifest.json")]
+    task.flush()
+    assert len(s3.calls) == 2
+
+
+def test_manifest_replaces_listing(monkeypatch, tmp_path):
+    s3 = FakeS3({"2025/06/16/_manifest.json": json.dumps({"notices": ["a"]}).encode()})
+    task = make_task(monkeypatch, tmp_path, s3)
+
+    task.execute([{"noticeId": "a", "postedDate": "2025-06-16"}])
+
+    assert s3.calls == [("get", "2025/06/16/_manifest.json")]
+
+
+def test_readers_skip_bookkeeping_keys():
+    assert is_record_key("2025/06/16/abc.json")
+    assert not is_record_key("2025/06/16/_manifest.json")
+    assert not is_record_key("2025/06/16/abc/description.json")
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from utils.async_sam_api import AdaptiveConcurrencyLimiter, AsyncSamAPIClient
+
+
+class StubSamServer:
+    """Local SAM.gov stand-in that rejects the first request for some pages."""
+
+    def __init__(self, total_records, throttle_offsets=(), always_fail_offsets=()):
+        self.total_records = total_records
+        self.throttle_offsets = set(throttle_offsets)
+        self.always_fail_offsets = set(always_fail_offsets)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                stub.requests.append(params)
+                limit, offset = int(params["limit"]), int(params["offset"])
+
+                if offset in stub.always_fail_offsets or (
+                    limit > 1 and offset in stub.throttle_offsets
+                ):
+                    stub.throttle_offsets.discard(offset)
+                    self._send(429, {"error": "slow down"}, {"Retry-After": "0"})
+                    return
+
+                records = [
+                    {"noticeId": f"n{i}"}
+                    for i in range(offset, min(offset + limit, stub.total_records))
+                ]
+                self._send(200, {"totalRecords": stub.total_records, "opportunitiesData": records})
+
+            def _send(self, status, payload, headers=None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/search"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_async_client_retries_throttled_pages():
+    with StubSamServer(total_records=25, throttle_offsets={10, 20}) as stub:
+        client = AsyncSamAPIClient("dummy", base_url=stub.url, backoff_base=0.01)
+        results = client.search_opportunities(limit=10)
+
+    assert sorted(r["noticeId"] for r in results) == sorted(f"n{i}" for i in range(25))
+    assert client.failed_pages == []
+    assert client.retries == 2
+    assert all(r["api_key"] == "dummy" for r in stub.requests)
+
+
+def test_async_client_records_failed_pages():
+    with StubSamServer(total_records=20, always_fail_offsets={10}) as stub:
+        client = AsyncSamAPIClient("dummy", base_url=stub.url, max_retries=2, backoff_base=0.01)
+        results = client.search_opportunities(limit=10)
+
+    assert len(results) == 10
+    assert client.failed_pages == [1]
+
+
+def test_limiter_additive_increase_multiplicative_decrease():
+    async def scenario():
+        limiter = AdaptiveConcurrencyLimiter(initial=4, max_limit=8, cooldown=0)
+        for _ in range(5):
+            limiter.on_success(0.1)
+        grown = limiter.limit
+        limiter.on_overload()
+        return grown, limiter.limit
+
+    grown, shrunk = asyncio.run(scenario())
+    assert grown == 5
+    assert shrunk == 2
+
+
+def test_limiter_blocks_beyond_limit():
+    async def scenario():
+        limiter = AdaptiveConcurrencyLimiter(initial=1, max_limit=1)
+        await limiter.acquire()
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(limiter.acquire(), timeout=0.05)
+        await limiter.release()
+        await asyncio.wait_for(limiter.acquire(), timeout=0.05)
+
+    asyncio.run(scenario())
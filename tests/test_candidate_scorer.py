@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+from langchain_core.documents import Document
+
+from agents.csv_opportunity_agent import CSVOpportunityAgent
+from chains.candidate_scorer import CandidateScorer, candidate_pool, default_cutoff, profile_naics, profile_set_asides
+
+NOW = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+
+def candidate(title, naics="", set_aside="", days=None, award=""):
+    deadline = (NOW + timedelta(days=days)).isoformat() if days is not None else ""
+    return {"text": title, "metadata": {
+        "title": title, "naics_code": naics, "set_aside": set_aside,
+        "response_deadline": deadline, "award_amount": award,
+    }}
+
+
+def test_profile_terms_from_text_and_flags():
+    profile = "Service Disabled Veteran owned small business, NAICS 541511 and 541715"
+    assert profile_naics(profile, ["541519"]) == ["541519", "541511", "541715"]
+    terms = profile_set_asides(profile)
+    assert "sdvosb" in terms and "small business" in terms and "veteran" in terms
+
+
+def test_features_are_vectorized_and_bounded():
+    scorer = CandidateScorer()
+    candidates = [
+        candidate("exact", naics="541511", set_aside="Total Small Business Set-Aside", days=45, award="$1,000,000"),
+        candidate("group", naics="541519", set_aside="", days=15, award="10000"),
+        candidate("other", naics="236220", set_aside="8(a) Set-Aside", days=-1),
+    ]
+    features = scorer.features(candidates, [0.1, 0.5, 0.9], ["541511"], ["small business"], now=NOW)
+
+    assert features.shape == (3, 5)
+    assert np.all((features >= 0) & (features <= 1))
+    np.testing.assert_allclose(features[:, 0], [1.0, 0.5, 0.0])   # similarity
+    np.testing.assert_allclose(features[:, 1], [1.0, 0.5, 0.0])   # naics
+    np.testing.assert_allclose(features[:, 2], [1.0, 0.3, 0.0])   # set-aside
+    np.testing.assert_allclose(features[:, 3], [1.0, 0.5, 0.0])   # deadline
+    assert features[0, 4] == 1.0 and features[2, 4] == 0.0        # award
+
+
+def test_select_promotes_the_best_slice():
+    scorer = CandidateScorer()
+    candidates = [candidate(f"far {i}", days=10) for i in range(8)]
+    candidates.insert(5, candidate("match", naics="541511", set_aside="Small Business", days=20))
+    distances = [0.2] * len(candidates)
+
+    selected = scorer.select(candidates, distances, cutoff=3, naics_codes=["541511"],
+                             set_asides=["small business"], now=NOW)
+
+    assert len(selected) == 3
+    assert selected[0]["metadata"]["title"] == "match"
+    assert selected[0]["feature_score"] >= selected[1]["feature_score"]
+    # Ties keep vector-search order
+    assert [s["metadata"]["title"] for s in selected[1:]] == ["far 0", "far 1"]
+
+
+class LiveIndex:
+    def __init__(self, metric):
+        self.metric = metric
+        self.k = None
+
+    def metric_type(self):
+        return self.metric
+
+    def similarity_search_with_score(self, query, k):
+        self.k = k
+        return [(Document(page_content=str(i), metadata={"title": str(i)}), score)
+                for i, score in enumerate((0.1, 0.9, 0.5))]
+
+
+def test_cascade_cuts_an_order_of_magnitude_using_the_live_metric(monkeypatch):
+    monkeypatch.delenv("RANK_CASCADE_CUTOFF", raising=False)
+    assert candidate_pool(default_cutoff(10)) == 100
+    assert candidate_pool(500) == 1000
+
+    agent = object.__new__(CSVOpportunityAgent)
+    agent.scorer = CandidateScorer()
+    agent.matching_chain = SimpleNamespace(rank_opportunities=lambda shortlisted, *a, **kw: shortlisted)
+    # Configured for L2, but the collection was built with inner product
+    agent.store = SimpleNamespace(index=LiveIndex("IP"), index_params={"metric_type": "L2"})
+
+    shortlisted = agent.find_matching_opportunities("profile", top_k=5, cutoff=1)
+
+    assert agent.store.index.k == 10
+    assert [s["metadata"]["title"] for s in shortlisted] == ["1"]
+
+
+class WideIndex(LiveIndex):
+    def similarity_search_with_score(self, query, k):
+        self.k = k
+        return [(Document(page_content=str(i), metadata={"title": str(i)}), i / k) for i in range(k)]
+
+
+def test_default_cascade_makes_one_llm_call_per_result(monkeypatch):
+    monkeypatch.delenv("RANK_CASCADE_CUTOFF", raising=False)
+    agent = object.__new__(CSVOpportunityAgent)
+    agent.scorer = CandidateScorer()
+    agent.matching_chain = SimpleNamespace(rank_opportunities=lambda shortlisted, *a, **kw: shortlisted)
+    agent.store = SimpleNamespace(index=WideIndex("L2"), index_params={"metric_type": "L2"})
+
+    evaluated = agent.find_matching_opportunities("profile", top_k=10)
+
+    assert agent.store.index.k == 100
+    assert len(evaluated) == 10
@@ -0,0 +1,83 @@
+from langchain_core.embeddings import Embeddings
+
+from rag.embedding_cache import CachedEmbeddings
+from utils.sqlite_cache import SQLiteCache
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(t)), 0.5] for t in texts]
+
+    def embed_query(self, text):
+        self.embedded.append(text)
+        return [float(len(text)), 1.5]
+
+
+def test_cached_embeddings_only_embed_new_texts(tmp_path):
+    inner = CountingEmbeddings()
+    cached = CachedEmbeddings(inner, "nomic-embed-text", SQLiteCache(str(tmp_path / "c.sqlite")))
+
+    first = cached.embed_documents(["alpha", "beta", "alpha"])
+    second = cached.embed_documents(["beta", "gamma"])
+
+    assert first == [[5.0, 0.5], [4.0, 0.5], [5.0, 0.5]]
+    assert second == [[4.0, 0.5], [5.0, 0.5]]
+    assert inner.embedded == ["alpha", "beta", "gamma"]
+    stats = cached.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 3
+
+
+def test_cache_persists_and_is_keyed_by_model(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    CachedEmbeddings(CountingEmbeddings(), "model-a", SQLiteCache(path)).embed_documents(["text"])
+
+    inner = CountingEmbeddings()
+    CachedEmbeddings(inner, "model-a", SQLiteCache(path)).embed_documents(["text"])
+    assert inner.embedded == []
+
+    CachedEmbeddings(inner, "model-b", SQLiteCache(path)).embed_documents(["text"])
+    assert inner.embedded == ["text"]
+
+
+def test_query_embeddings_are_cached_separately(tmp_path):
+    inner = CountingEmbeddings()
+    cached = CachedEmbeddings(inner, "m", SQLiteCache(str(tmp_path / "c.sqlite")))
+    cached.embed_documents(["same"])
+    assert cached.embed_query("same") == [4.0, 1.5]
+    assert cached.embed_query("same") == [4.0, 1.5]
+    assert inner.embedded == ["same", "same"]
+
+
+def test_repeated_queries_are_served_from_memory(tmp_path):
+    inner = CountingEmbeddings()
+    cache = SQLiteCache(str(tmp_path / "c.sqlite"))
+    cached = CachedEmbeddings(inner, "m", cache, query_lru_size=1)
+
+    assert cached.embed_query("one") == [3.0, 1.5]
+    assert cached.embed_query("one") == [3.0, 1.5]
+    assert inner.embedded == ["one"]
+    assert cached.stats()["query_lru_hits"] == 1
+    assert cache.stats()["hits"] == 0
+
+    # "two" evicts "one" from memory, so "one" comes back from SQLite
+    cached.embed_query("two")
+    cached.embed_query("one")
+    assert inner.embedded == ["one", "two"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_sqlite_cache_evicts_least_recently_used(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.sqlite"), max_entries=2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    cache.get("a")
+    cache.put("c", b"3")
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert cache.stats()["evictions"] == 1
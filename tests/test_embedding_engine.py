@@ -0,0 +1,44 @@
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+from rag.embedding_engine import BatchEmbeddingEngine
+
+
+class SlowEmbeddings(Embeddings):
+    def __init__(self):
+        self.batch_sizes = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.batch_sizes.append(len(texts))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.02)
+        with self._lock:
+            self.in_flight -= 1
+        return [[float(len(t))] for t in texts]
+
+    def embed_query(self, text):
+        return [float(len(text))]
+
+
+def test_engine_batches_and_embeds_concurrently():
+    embedder = SlowEmbeddings()
+    engine = BatchEmbeddingEngine(embedder, batch_size=10, workers=3)
+    docs = [{"text": "x" * i, "metadata": {"i": i}} for i in range(95)]
+
+    seen = {}
+    for batch, vectors in engine.iter_embedded(docs):
+        assert len(batch) == len(vectors)
+        for doc, vec in zip(batch, vectors):
+            seen[doc["metadata"]["i"]] = vec
+
+    assert sorted(embedder.batch_sizes) == [5] + [10] * 9
+    assert embedder.max_in_flight > 1
+    assert seen == {i: [float(i)] for i in range(95)}
+    assert engine.last_docs_per_sec > 0
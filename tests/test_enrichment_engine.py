@@ -0,0 +1,164 @@
+import json
+import threading
+import time
+
+from tests.test_solicitation_assets import DummyS3
+from utils.enrichment_engine import EnrichmentEngine, HostLimiter, LimitedSession
+
+
+class FakeResponse:
+    def __init__(self, content=b"data"):
+        self.content = content
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        raise ValueError()
+
+    def iter_content(self, chunk_size=1):
+        yield self.content
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self):
+        self.urls = []
+        self.lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self.lock:
+            self.urls.append(url)
+        return FakeResponse(url.encode())
+
+
+def record(notice_id, links=2):
+    return {
+        "noticeId": notice_id,
+        "postedDate": "2025-06-16",
+        "resourceLinks": [f"http://files.example/{notice_id}-{i}/download" for i in range(links)],
+    }
+
+
+def test_host_limiter_caps_concurrency_per_host():
+    limiter = HostLimiter(per_host=2)
+    active = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+    lock = threading.Lock()
+
+    def hit(host):
+        with limiter.limit(f"http://{host}/x"):
+            with lock:
+                active[host] += 1
+                peak[host] = max(peak[host], active[host])
+            time.sleep(0.01)
+            with lock:
+                active[host] -= 1
+
+    threads = [threading.Thread(target=hit, args=(h,)) for h in "ab" * 6]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak == {"a": 2, "b": 2}
+
+
+def test_streamed_bodies_hold_the_host_slot_until_closed():
+    active = {"count": 0, "peak": 0}
+    lock = threading.Lock()
+
+    class SlowBody:
+        def __init__(self):
+            with lock:
+                active["count"] += 1
+                active["peak"] = max(active["peak"], active["count"])
+
+        def iter_content(self, chunk_size=1):
+            for _ in range(3):
+                time.sleep(0.01)
+                yield b"x"
+
+        def close(self):
+            with lock:
+                active["count"] -= 1
+
+    class StreamingSession:
+        def get(self, url, **kwargs):
+            return SlowBody()
+
+    session = LimitedSession(StreamingSession(), HostLimiter(per_host=2))
+
+    def download():
+        resp = session.get("http://files.example/a/download", stream=True)
+        try:
+            b"".join(resp.iter_content())
+        finally:
+            resp.close()
+
+    threads = [threading.Thread(target=download) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert active["peak"] == 2 and active["count"] == 0
+
+
+def test_engine_enriches_in_parallel_and_clears_checkpoint(tmp_path):
+    s3 = DummyS3()
+    session = FakeSession()
+    checkpoint = tmp_path / "checkpoint.json"
+    engine = EnrichmentEngine(s3, "bucket", workers=3, session=session, checkpoint_path=str(checkpoint))
+
+    stats = engine.run((f"2025/06/16/n{i}.json", record(f"n{i}")) for i in range(5))
+
+    assert stats == {"notices": 5, "attachments": 10, "failed": 0}
+    assert len(session.urls) == 10
+    # Ten attachment blobs plus one attachments.json per notice
+    assert len(s3.objects) == 15
+    assert not checkpoint.exists()
+
+
+def test_engine_resumes_from_checkpoint(tmp_path):
+    checkpoint = tmp_path / "checkpoint.json"
+    checkpoint.write_text(json.dumps({"done": ["2025/06/16/n0.json"]}))
+    session = FakeSession()
+    engine = EnrichmentEngine(DummyS3(), "bucket", workers=2, session=session, checkpoint_path=str(checkpoint))
+
+    records = [(f"2025/06/16/n{i}.json", record(f"n{i}", links=1)) for i in range(2)]
+    records.append(("2025/06/16/broken.json", {"noticeId": "broken", "postedDate": "2025-06-16",
+                                               "resourceLinks": None}))
+    engine.s3.list_objects_v2 = _failing_list(engine.s3.list_objects_v2, "broken")
+    stats = engine.run(records)
+
+    assert session.urls == ["http://files.example/n1-0/download"]
+    assert stats["notices"] == 1 and stats["failed"] == 1
+    # The failed notice keeps the checkpoint so the next run retries only it
+    assert set(json.loads(checkpoint.read_text())["done"]) == {"2025/06/16/n0.json", "2025/06/16/n1.json"}
+
+
+def test_partial_downloads_count_as_failed_and_stay_out_of_the_checkpoint(tmp_path):
+    class FlakySession(FakeSession):
+        def get(self, url, **kwargs):
+            if "n1-1" in url:
+                raise ConnectionError("reset")
+            return super().get(url, **kwargs)
+
+    checkpoint = tmp_path / "checkpoint.json"
+    engine = EnrichmentEngine(DummyS3(), "bucket", workers=2, session=FlakySession(),
+                              checkpoint_path=str(checkpoint))
+
+    stats = engine.run((f"2025/06/16/n{i}.json", record(f"n{i}")) for i in range(2))
+
+    assert stats == {"notices": 1, "attachments": 2, "failed": 1}
+    assert json.loads(checkpoint.read_text())["done"] == ["2025/06/16/n0.json"]
+
+
+def _failing_list(list_objects, notice_id):
+    def list_objects_v2(Bucket, Prefix, MaxKeys=1000):
+        if notice_id in Prefix:
+            raise RuntimeError("listing failed")
+        return list_objects(Bucket=Bucket, Prefix=Prefix, MaxKeys=MaxKeys)
+    return list_objects_v2
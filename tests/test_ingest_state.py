@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+
+from utils.ingest_state import IngestState
+
+
+def _doc(notice_id, text="body", deadline="12/31/2999"):
+    return {"text": text, "metadata": {"notice_id": notice_id, "response_deadline": deadline}}
+
+
+def test_watermark_round_trip(tmp_path):
+    path = tmp_path / "state.json"
+    state = IngestState(str(path))
+    assert not state.has_watermark()
+
+    state.advance([
+        {"noticeId": "a", "postedDate": "2025-06-15"},
+        {"noticeId": "b", "postedDate": "2025-06-16"},
+        {"noticeId": "c", "postedDate": "2025-06-16"},
+    ])
+    state.save()
+
+    reloaded = IngestState(str(path))
+    assert reloaded.posted_from() == "06/16/2025"
+    assert reloaded.watermark["notice_ids"] == ["b", "c"]
+
+
+def test_is_new_skips_already_seen_boundary_records(tmp_path):
+    state = IngestState(str(tmp_path / "state.json"))
+    state.advance([{"noticeId": "b", "postedDate": "2025-06-16"}])
+
+    assert not state.is_new({"noticeId": "a", "postedDate": "2025-06-15"})
+    assert not state.is_new({"noticeId": "b", "postedDate": "2025-06-16"})
+    assert state.is_new({"noticeId": "c", "postedDate": "2025-06-16"})
+    assert state.is_new({"noticeId": "d", "postedDate": "2025-06-17"})
+
+
+def test_changed_documents_and_expiry(tmp_path):
+    state = IngestState(str(tmp_path / "state.json"))
+    state.record_documents([_doc("a"), _doc("b"), _doc("old", deadline="01/01/2000")])
+
+    changed = state.changed_documents([_doc("a"), _doc("b", text="amended"), _doc("new")])
+    assert [d["metadata"]["notice_id"] for d in changed] == ["b", "new"]
+
+    expired = state.expired_notice_ids(now=datetime(2025, 1, 1, tzinfo=timezone.utc))
+    assert expired == ["old"]
+    state.forget(expired)
+    assert "old" not in state.notices
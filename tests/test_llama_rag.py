@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+
+from llm import llama_rag_wrapper
+from llm.llama_rag_wrapper import LlamaRAG
+
+
+class FakeStore:
+    def __init__(self, docs):
+        self.docs = docs
+        self.searches = 0
+        self.embed_model = object()
+        self.index = self
+
+    def supports_filters(self):
+        return True
+
+    def filtered_search(self, query, k=10, **filters):
+        self.searches += 1
+        return self.docs[:k]
+
+
+class FakeLlamaClient:
+    def __init__(self, api_key=None):
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages):
+        self.prompts.append(messages[0]["content"])
+        return SimpleNamespace(completion_message=SimpleNamespace(content=SimpleNamespace(text="answer")))
+
+
+def test_generate_response_reuses_retrieved_docs(monkeypatch):
+    monkeypatch.setattr(llama_rag_wrapper, "LlamaAPIClient", FakeLlamaClient)
+    monkeypatch.setattr(llama_rag_wrapper, "load_prompt", lambda name: "Q: {query}\n{context}")
+    docs = [Document(page_content="notice one", metadata={
+        "notice_type": "Solicitation", "response_deadline": "2999-01-01T00:00:00Z",
+    })]
+    store = FakeStore(docs)
+
+    rag = LlamaRAG(api_key="key", store=store)
+    retrieved = rag.retrieve_docs("cloud", k=5)
+    answer = rag.generate_response("cloud", docs=retrieved)
+
+    assert answer == "answer"
+    assert store.searches == 1
+    assert rag.embed_model is store.embed_model
+    assert "notice one" in rag.llm_client.prompts[0]
+
+
+def text_chunk(text):
+    return SimpleNamespace(event=SimpleNamespace(delta=SimpleNamespace(type="text", text=text)))
+
+
+def test_stream_response_yields_text_deltas(monkeypatch):
+    monkeypatch.setattr(llama_rag_wrapper, "LlamaAPIClient", FakeLlamaClient)
+    monkeypatch.setattr(llama_rag_wrapper, "load_prompt", lambda name: "Q: {query}\n{context}")
+    rag = LlamaRAG(api_key="key", store=FakeStore([]))
+    calls = []
+
+    def create(model, messages, stream=False):
+        calls.append(stream)
+        return iter([text_chunk("Hel"), text_chunk(""), text_chunk("lo")])
+
+    rag.llm_client.chat.completions.create = create
+    assert list(rag.stream_response("q", docs=[])) == ["Hel", "lo"]
+    assert calls == [True]
+
+
+class LegacyStore(FakeStore):
+    def supports_filters(self):
+        return False
+
+    def adaptive_search(self, query, k=10, predicate=None):
+        self.searches += 1
+        matches = [d for d in self.docs if predicate(d)]
+        return matches[:k], len(self.docs)
+
+
+def test_legacy_collection_pages_until_filters_pass(monkeypatch):
+    monkeypatch.setattr(llama_rag_wrapper, "LlamaAPIClient", FakeLlamaClient)
+    monkeypatch.setattr(llama_rag_wrapper, "load_prompt", lambda name: "Q: {query}\n{context}")
+    open_notice = {"notice_type": "Solicitation", "response_deadline": "2999-01-01T00:00:00Z"}
+    docs = [
+        Document(page_content="wrong naics", metadata={**open_notice, "naics": "111111"}),
+        Document(page_content="closed", metadata={"notice_type": "Award Notice", "naics": "541511"}),
+        Document(page_content="match", metadata={**open_notice, "naics": "541511"}),
+    ]
+    rag = LlamaRAG(api_key="key", store=LegacyStore(docs))
+
+    retrieved = rag.retrieve_docs("cloud", k=5, naics_codes=["541511"])
+
+    assert [d.page_content for d in retrieved] == ["match"]
+    assert rag.store.searches == 1
+
+
+def test_legacy_setaside_filter_matches_like_push_down(monkeypatch):
+    monkeypatch.setattr(llama_rag_wrapper, "LlamaAPIClient", FakeLlamaClient)
+    monkeypatch.setattr(llama_rag_wrapper, "load_prompt", lambda name: "Q: {query}\n{context}")
+    open_notice = {"notice_type": "Solicitation", "response_deadline": "2999-01-01T00:00:00Z"}
+    docs = [
+        Document(page_content="sdvosb", metadata={**open_notice, "setaside": "SDVOSB Veteran-Owned Small Business"}),
+        Document(page_content="none", metadata={**open_notice, "setaside": ""}),
+    ]
+    rag = LlamaRAG(api_key="key", store=LegacyStore(docs))
+
+    retrieved = rag.retrieve_docs("cloud", k=5, setasides=["veteran-owned"])
+
+    assert [d.page_content for d in retrieved] == ["sdvosb"]
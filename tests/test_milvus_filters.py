@@ -0,0 +1,222 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+from pymilvus import DataType
+
+from rag.milvus_collection import SolicitationMilvus, build_filter_expr, matches_filters, scalar_values
+from rag.milvus_store import MilvusStore
+
+
+def test_scalar_values_fold_sam_and_csv_metadata():
+    sam = scalar_values({
+        "notice_id": "abc",
+        "naics": "541511",
+        "setaside": "Total Small Business Set-Aside (FAR 19.5)",
+        "notice_type": "Solicitation",
+        "response_deadline": "2030-01-02T00:00:00Z",
+    })
+    assert sam["naics"] == "541511"
+    assert sam["set_aside_lc"] == "total small business set-aside (far 19.5)"
+    assert sam["response_deadline_ts"] == int(datetime(2030, 1, 2, tzinfo=timezone.utc).timestamp())
+
+    csv = scalar_values({"naics_code": "541715", "set_aside": "SDVOSB", "response_deadline": ""})
+    assert csv["naics"] == "541715"
+    assert csv["set_aside_lc"] == "sdvosb"
+    assert csv["response_deadline_ts"] == 0
+    assert csv["notice_id"] == "" and csv["notice_type"] == ""
+
+
+def test_build_filter_expr():
+    assert build_filter_expr() is None
+    assert build_filter_expr(setasides=[" "], naics_codes=[]) is None
+
+    deadline = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    expr = build_filter_expr(
+        setasides=["Small Business", "veteran"],
+        naics_codes=["541511 "],
+        notice_types=["Solicitation"],
+        deadline_after=deadline,
+    )
+    assert expr == (
+        '(set_aside_lc like "%small business%" or set_aside_lc like "%veteran%")'
+        ' and naics in ["541511"]'
+        ' and notice_type in ["Solicitation"]'
+        f" and response_deadline_ts > {int(deadline.timestamp())}"
+    )
+
+
+def test_matches_filters_mirrors_filter_expr():
+    meta = {"naics_code": "541511", "set_aside": "Total Small Business", "notice_type": "Solicitation",
+            "response_deadline": "2030-01-02T00:00:00Z"}
+    assert matches_filters(meta)
+    assert matches_filters(meta, setasides=["small business", "veteran"], naics_codes=["541511 "])
+    assert not matches_filters(meta, setasides=["veteran"])
+    assert not matches_filters(meta, naics_codes=["541715"])
+    assert not matches_filters(meta, notice_types=["Sources Sought"])
+    assert matches_filters(meta, deadline_after=datetime(2030, 1, 1, tzinfo=timezone.utc))
+    assert not matches_filters({"naics": "541511"}, deadline_after=datetime(2030, 1, 1, tzinfo=timezone.utc))
+
+
+def legacy_index(primary):
+    index = object.__new__(SolicitationMilvus)
+    index.collection_name = "sam"
+    index._primary_field, index._text_field, index._vector_field = "pk", "text", "vector"
+    index.fields = ["pk", "text", "vector", "naics"]
+    fields = [primary, SimpleNamespace(name="text", is_primary=False)]
+    index.col = SimpleNamespace(schema=SimpleNamespace(fields=fields))
+    return index
+
+
+def test_legacy_rows_get_ids_milvus_does_not_generate():
+    doc = {"text": "t", "metadata": {"naics": "541511", "title": "dropped"}}
+
+    auto = legacy_index(SimpleNamespace(name="pk", is_primary=True, auto_id=True, dtype=DataType.INT64))
+    assert auto.row_for(doc, [0.1]) == {"naics": "541511", "text": "t", "vector": [0.1]}
+
+    varchar = legacy_index(SimpleNamespace(name="pk", is_primary=True, auto_id=False, dtype=DataType.VARCHAR))
+    rows = [varchar.row_for(doc, [0.1]) for _ in range(2)]
+    assert rows[0]["pk"] != rows[1]["pk"] and isinstance(rows[0]["pk"], str)
+
+    manual = legacy_index(SimpleNamespace(name="pk", is_primary=True, auto_id=False, dtype=DataType.INT64))
+    with pytest.raises(ValueError, match="rebuild"):
+        manual.row_for(doc, [0.1])
+
+
+class RecordingIndex:
+    col = object()
+    supports_filters = True
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = []
+
+    def similarity_search_by_vector(self, vector, k, expr=None):
+        self.calls.append({"vector": vector, "k": k, "expr": expr})
+        if expr and len(self.calls) > 1:
+            # Follow-up searches return only what their own filter matches
+            return [d for d in self.docs if "veteran" in d.metadata["setaside"].lower()][:k]
+        return self.docs[:k]
+
+
+def test_multi_filtered_search_embeds_and_searches_once():
+    docs = [
+        Document(page_content="a", metadata={"naics": "541511", "setaside": "Small Business"}),
+        Document(page_content="b", metadata={"naics": "541511", "setaside": "SDVOSB veteran-owned"}),
+        Document(page_content="c", metadata={"naics": "541715", "setaside": ""}),
+        Document(page_content="d", metadata={"naics": "541511", "setaside": "small business"}),
+    ]
+    store = object.__new__(MilvusStore)
+    store.index = RecordingIndex(docs)
+    queries = []
+    store.embed_model = SimpleNamespace(embed_query=lambda q: queries.append(q) or [0.1, 0.2])
+
+    naics = ["541511", "541715"]
+    results = store.multi_filtered_search("ml platforms", {
+        "sb": {"setasides": ["small business"], "naics_codes": naics},
+        "vet": {"setasides": ["veteran"], "naics_codes": naics},
+        "all": {"naics_codes": naics},
+    }, k=2)
+
+    assert queries == ["ml platforms"]
+    assert len(store.index.calls) == 1
+    call = store.index.calls[0]
+    assert call["k"] == 100
+    assert call["expr"] == " or ".join([
+        f"({build_filter_expr(['small business'], naics)})",
+        f"({build_filter_expr(['veteran'], naics)})",
+        f"({build_filter_expr(naics_codes=naics)})",
+    ])
+    assert [d.page_content for d in results["sb"]] == ["a", "d"]
+    assert [d.page_content for d in results["vet"]] == ["b"]
+    assert [d.page_content for d in results["all"]] == ["a", "b"]
+
+
+def test_multi_filtered_search_requeries_sets_crowded_out_of_a_full_window():
+    docs = [Document(page_content=str(i), metadata={"naics": "541511", "setaside": ""}) for i in range(5)]
+    docs.append(Document(page_content="v", metadata={"naics": "541511", "setaside": "SDVOSB veteran-owned"}))
+    store = object.__new__(MilvusStore)
+    store.index = RecordingIndex(docs)
+    store.embed_model = SimpleNamespace(embed_query=lambda q: [0.1])
+
+    results = store.multi_filtered_search("q", {
+        "vet": {"setasides": ["veteran"], "naics_codes": ["541511"]},
+        "all": {"naics_codes": ["541511"]},
+    }, k=2, fetch_k=4)
+
+    assert [d.page_content for d in results["all"]] == ["0", "1"]
+    assert [d.page_content for d in results["vet"]] == ["v"]
+    assert [c["expr"] for c in store.index.calls[1:]] == [build_filter_expr(["veteran"], ["541511"])]
+
+
+class UnfilteredIndex(RecordingIndex):
+    supports_filters = False
+
+    def __init__(self, docs):
+        super().__init__(docs)
+        self.pages = []
+
+    def similarity_search_with_score_by_vector(self, vector, k, expr=None, offset=0):
+        self.pages.append((offset, k))
+        return [(d, 0.0) for d in self.docs[offset:offset + k]]
+
+
+def test_crowded_out_sets_resume_after_the_shared_window_without_filters():
+    docs = [Document(page_content=str(i), metadata={"naics": "541511", "setaside": ""}) for i in range(8)]
+    docs[1].metadata["setaside"] = docs[6].metadata["setaside"] = "SDVOSB veteran-owned"
+    store = object.__new__(MilvusStore)
+    store.index = UnfilteredIndex(docs)
+    store.embed_model = SimpleNamespace(embed_query=lambda q: [0.1])
+
+    results = store.multi_filtered_search("q", {
+        "vet": {"setasides": ["veteran"]},
+        "all": {},
+    }, k=2, fetch_k=4)
+
+    assert [d.page_content for d in results["vet"]] == ["1", "6"]
+    assert store.index.pages == [(4, 4)]
+
+
+class PagedIndex:
+    def __init__(self, docs):
+        self.docs = docs
+        self.pages = []
+
+    def similarity_search_with_score_by_vector(self, vector, k, expr=None, offset=0):
+        self.pages.append((offset, k))
+        return [(d, 0.0) for d in self.docs[offset:offset + k]]
+
+
+def paged_store(docs):
+    store = object.__new__(MilvusStore)
+    store.index = PagedIndex(docs)
+    store.embed_model = SimpleNamespace(embed_query=lambda q: [0.0])
+    return store
+
+
+def test_adaptive_search_widens_window_until_k_matches():
+    docs = [Document(page_content=str(i), metadata={"naics": "541511" if i % 5 == 4 else "999999"})
+            for i in range(40)]
+    store = paged_store(docs)
+
+    results, scanned = store.adaptive_search(
+        "q", k=3, predicate=lambda d: matches_filters(d.metadata, naics_codes=["541511"])
+    )
+
+    assert [d.page_content for d in results] == ["4", "9", "14"]
+    assert store.index.pages == [(0, 6), (6, 6), (12, 12)]
+    assert scanned == 24
+
+
+def test_adaptive_search_stops_at_cap_or_end_of_collection():
+    docs = [Document(page_content=str(i), metadata={}) for i in range(10)]
+    never = lambda d: False  # noqa: E731
+
+    store = paged_store(docs)
+    assert store.adaptive_search("q", k=2, predicate=never, max_candidates=6) == ([], 6)
+    assert store.index.pages == [(0, 4), (4, 2)]
+
+    store = paged_store(docs)
+    assert store.adaptive_search("q", k=2, predicate=never, max_candidates=100) == ([], 10)
+    assert store.index.pages == [(0, 4), (4, 4), (8, 8)]
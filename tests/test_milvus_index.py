@@ -0,0 +1,31 @@
+import pytest
+
+from rag.milvus_index import build_index_params, build_search_params
+from scripts.milvus_benchmark import percentile, recall_at_k
+
+
+def test_index_params_per_type():
+    assert build_index_params("hnsw", M=32) == {
+        "index_type": "HNSW", "metric_type": "L2", "params": {"M": 32, "efConstruction": 200},
+    }
+    assert build_index_params("IVF_SQ8", nlist=256, M=4)["params"] == {"nlist": 256}
+    assert build_index_params("FLAT", "IP")["params"] == {}
+    with pytest.raises(ValueError):
+        build_index_params("DISKANN")
+
+
+def test_search_params_pass_ef_and_nprobe():
+    assert build_search_params("HNSW", ef=128)["params"] == {"ef": 128}
+    # Milvus rejects ef < k
+    assert build_search_params("HNSW", ef=16, k=50)["params"] == {"ef": 50}
+    assert build_search_params("IVF_FLAT", nprobe=8)["params"] == {"nprobe": 8}
+    assert build_search_params("FLAT", ef=10, nprobe=10)["params"] == {}
+
+
+def test_recall_and_percentile():
+    assert recall_at_k([1, 2, 9], [1, 2, 3], 3) == pytest.approx(2 / 3)
+    assert recall_at_k([], [], 5) == 1.0
+    latencies = list(range(1, 101))
+    assert percentile(latencies, 50) == 50
+    assert percentile(latencies, 99) == 99
+    assert percentile([], 50) == 0.0
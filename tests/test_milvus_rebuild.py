@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from rag import milvus_store
+from rag.milvus_store import MilvusStore
+
+
+class FakeUtility:
+    def __init__(self, collections=(), aliases=None):
+        self.collections = set(collections)
+        self.aliases = dict(aliases or {})
+        self.dropped = []
+
+    def list_collections(self):
+        return sorted(self.collections)
+
+    def list_aliases(self, name):
+        return [alias for alias, target in self.aliases.items() if target == name]
+
+    def has_collection(self, name):
+        return name in self.collections
+
+    def drop_collection(self, name):
+        self.collections.discard(name)
+        self.dropped.append(name)
+
+    def create_alias(self, collection, alias):
+        assert alias not in self.aliases and alias not in self.collections
+        self.aliases[alias] = collection
+
+    def alter_alias(self, collection, alias):
+        assert alias in self.aliases
+        self.aliases[alias] = collection
+
+    def wait_for_index_building_complete(self, name):
+        pass
+
+    def wait_for_loading_complete(self, name):
+        pass
+
+
+class FakeCol:
+    def __init__(self):
+        self.calls = []
+
+    def flush(self):
+        self.calls.append("flush")
+
+    def load(self):
+        self.calls.append("load")
+
+    def set_properties(self, properties):
+        self.calls.append("set_properties")
+
+
+@pytest.fixture
+def make_store(monkeypatch):
+    def make(utility):
+        monkeypatch.setattr(milvus_store, "utility", utility)
+        store = object.__new__(MilvusStore)
+        store.collection_name = "sam"
+        store.connected = []
+
+        def connect(name=None):
+            store.connected.append(name)
+            # The rebuild "creates" its collection on first insert
+            if name:
+                utility.collections.add(name)
+            return SimpleNamespace(col=FakeCol(), name=name)
+
+        store._connect_index = connect
+        return store
+    return make
+
+
+def shadow(hours_ago):
+    return f"sam__{(datetime.now() - timedelta(hours=hours_ago)):%Y%m%d%H%M%S}"
+
+
+def test_begin_rebuild_creates_shadow_and_drops_only_stale_ones(make_store):
+    stale, running = shadow(48), shadow(1)
+    utility = FakeUtility(collections=["sam__20200101000000", stale, running], aliases={"sam": "sam__20200101000000"})
+    store = make_store(utility)
+
+    rebuild = store.begin_rebuild()
+
+    assert rebuild.physical_name.startswith("sam__") and rebuild.physical_name not in (stale, running)
+    assert utility.dropped == [stale]
+    assert running in utility.collections and "sam__20200101000000" in utility.collections
+
+
+def test_commit_repoints_alias_and_drops_previous(make_store):
+    utility = FakeUtility(collections=["sam__old"], aliases={"sam": "sam__old"})
+    store = make_store(utility)
+    rebuild = store.begin_rebuild()
+
+    rebuild.commit()
+
+    assert rebuild.index.col.calls == ["flush", "set_properties", "load"]
+    assert utility.aliases == {"sam": rebuild.physical_name}
+    assert utility.collections == {rebuild.physical_name}
+    assert store.connected[-1] is None  # reconnected through the alias
+
+
+def test_abort_leaves_live_collection(make_store):
+    utility = FakeUtility(collections=["sam__old"], aliases={"sam": "sam__old"})
+    store = make_store(utility)
+    rebuild = store.begin_rebuild()
+
+    rebuild.abort()
+
+    assert utility.collections == {"sam__old"}
+    assert utility.aliases == {"sam": "sam__old"}
+
+
+def test_first_rebuild_migrates_plain_collection_to_alias(make_store):
+    utility = FakeUtility(collections=["sam"])
+    store = make_store(utility)
+    assert store.has_collection()
+
+    rebuild = store.begin_rebuild()
+    rebuild.commit()
+
+    assert "sam" not in utility.collections
+    assert utility.aliases == {"sam": rebuild.physical_name}
+    assert store.has_collection()
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+from rag import milvus_store
+from rag.milvus_store import MilvusStore
+
+
+class FakeIterator:
+    def __init__(self, rows):
+        self.batches = [rows[:2], rows[2:], []]
+
+    def next(self):
+        return self.batches.pop(0)
+
+    def close(self):
+        pass
+
+
+class FakeCollection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.indexes = [SimpleNamespace(
+            field_name="vector",
+            index_name="vector_idx",
+            params={"index_type": "HNSW", "metric_type": "L2", "params": {"M": 16}},
+        )]
+
+    def query(self, expr, output_fields):
+        assert output_fields == ["count(*)"]
+        return [{"count(*)": len(self.rows)}]
+
+    def describe(self):
+        return {"properties": {milvus_store.LAST_INGEST_PROPERTY: "2025-06-16T12:00:00Z"}}
+
+    def query_iterator(self, batch_size, output_fields):
+        return FakeIterator([{f: row.get(f) for f in output_fields} for row in self.rows])
+
+
+def make_store(col, fields):
+    store = object.__new__(MilvusStore)
+    store.collection_name = "sam_solicitations"
+    store.index = SimpleNamespace(col=col, fields=fields)
+    return store
+
+
+def test_stats_reads_metadata_without_searching(monkeypatch):
+    rows = [
+        {"naics": "541511", "notice_type": "Solicitation"},
+        {"naics": "541511", "notice_type": "Sources Sought"},
+        {"naics": "541715", "notice_type": "Solicitation"},
+    ]
+    store = make_store(FakeCollection(rows), ["text", "vector", "naics", "notice_type"])
+    monkeypatch.setattr(store, "_alias_target", lambda: "sam_solicitations__20250616120000")
+    monkeypatch.setattr(milvus_store.utility, "load_state", lambda name: "Loaded")
+    monkeypatch.setattr(
+        milvus_store.utility,
+        "index_building_progress",
+        lambda name, index_name: {"total_rows": 3, "indexed_rows": 3, "pending_index_rows": 0},
+    )
+
+    stats = store.stats()
+
+    assert stats["row_count"] == 3
+    assert stats["physical_collection"] == "sam_solicitations__20250616120000"
+    assert stats["last_ingest"] == "2025-06-16T12:00:00Z"
+    assert stats["indexes"] == [{
+        "field": "vector", "index_type": "HNSW", "params": {"M": 16}, "indexed_rows": 3, "pending_rows": 0,
+    }]
+    assert stats["cardinalities"] == {"naics": 2, "notice_type": 2}
+
+
+def test_stats_for_missing_collection():
+    store = make_store(None, [])
+    assert store.row_count() == 0
+    stats = store.stats()
+    assert stats["exists"] is False and stats["row_count"] == 0
+
+
+def test_last_ingest_falls_back_to_rebuild_name():
+    store = make_store(None, [])
+    assert store._timestamp_from_name("sam_solicitations__20250616120000") == "2025-06-16T12:00:00"
+    assert store._timestamp_from_name("sam_solicitations") is None
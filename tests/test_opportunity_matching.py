@@ -0,0 +1,202 @@
+import threading
+import time
+
+from chains.evaluation_cache import EvaluationCache
+from chains.opportunity_matching_chain import OpportunityMatchingChain
+from chains.structured_evaluation import EVALUATION_SCHEMA, SUB_SCORES, ScoringMetrics
+from utils.sqlite_cache import SQLiteCache
+
+
+class FakeChain(OpportunityMatchingChain):
+    """Skips the LLM: the score is read from the opportunity metadata."""
+
+    def __init__(self, max_concurrency=3, timeout=5.0):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.structured = False
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def evaluate_opportunity(self, opportunity, company_profile):
+        meta = opportunity["metadata"]
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(meta.get("delay", 0.01))
+            if meta.get("fail"):
+                raise RuntimeError("boom")
+            return {"opportunity": opportunity, "evaluation": "", "match_score": meta["score"], "metadata": meta}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def opp(score, **extra):
+    return {"text": "", "metadata": {"title": f"t{score}", "score": score, **extra}}
+
+
+def test_rank_runs_concurrently_and_reports_progress():
+    chain = FakeChain(max_concurrency=3)
+    opportunities = [opp(s) for s in (10, 90, 50, 70, 30, 80)] + [opp(0, fail=True)]
+    progress = []
+
+    top = chain.rank_opportunities(
+        opportunities, "profile", top_k=3,
+        on_progress=lambda done, total, result, current: progress.append((done, total, len(current))),
+    )
+
+    assert [r["match_score"] for r in top] == [90, 80, 70]
+    assert chain.max_in_flight == 3
+    assert [p[0] for p in progress] == list(range(1, 8))
+    assert all(p[1] == 7 and p[2] <= 3 for p in progress)
+
+
+def test_slow_evaluations_time_out_without_blocking_the_rest():
+    chain = FakeChain(max_concurrency=2, timeout=0.2)
+    opportunities = [opp(99, delay=0.6), opp(40), opp(60)]
+
+    results = list(chain.iter_evaluations(opportunities, "profile"))
+
+    scores = [r["match_score"] for _, r in results if r is not None]
+    assert sorted(scores) == [40, 60]
+    assert [o["metadata"]["score"] for o, r in results if r is None] == [99]
+
+
+def test_timeout_counts_from_start_not_from_queueing_behind_a_stuck_worker():
+    chain = FakeChain(max_concurrency=1, timeout=0.2)
+    opportunities = [opp(99, delay=0.5), opp(40, delay=0.1)]
+
+    started = time.monotonic()
+    results = list(chain.iter_evaluations(opportunities, "profile"))
+
+    # The replacement waits for the stuck worker, then gets its full timeout
+    assert [(o["metadata"]["score"], r and r["match_score"]) for o, r in results] == [(99, None), (40, 40)]
+    assert time.monotonic() - started < 1.0
+
+
+class CountingLLMChain:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, inputs):
+        self.calls += 1
+        return f"MATCH SCORE: {len(inputs['title'])}"
+
+
+def make_cached_chain(path, model="llama3", prompt="prompt v1"):
+    chain = object.__new__(OpportunityMatchingChain)
+    chain.evaluation_chain = CountingLLMChain()
+    chain.structured = False
+    chain.cache = EvaluationCache(SQLiteCache(str(path)), model, prompt)
+    return chain
+
+
+def test_evaluations_are_cached_by_model_prompt_profile_and_notice(tmp_path):
+    path = tmp_path / "eval.sqlite"
+    notice = {"text": "Title: x\nDescription: build it", "metadata": {"title": "abcd"}}
+
+    chain = make_cached_chain(path)
+    first = chain.evaluate_opportunity(notice, "profile")
+    again = make_cached_chain(path)
+    second = again.evaluate_opportunity(notice, "profile")
+    assert (first["match_score"], first["cached"]) == (4, False)
+    assert (second["match_score"], second["cached"]) == (4, True)
+    assert second["evaluation"] == first["evaluation"]
+    assert again.evaluation_chain.calls == 0
+
+    changed_notice = {"text": notice["text"] + " now", "metadata": notice["metadata"]}
+    for chain, profile, opportunity in (
+        (make_cached_chain(path), "other profile", notice),
+        (make_cached_chain(path, model="llama3.1"), "profile", notice),
+        (make_cached_chain(path, prompt="prompt v2"), "profile", notice),
+        (make_cached_chain(path), "profile", changed_notice),
+    ):
+        assert chain.evaluate_opportunity(opportunity, profile)["cached"] is False
+        assert chain.evaluation_chain.calls == 1
+
+
+VALID_JSON = (
+    '{"score": 82, "sub_scores": {"set_aside_match": 100, "capability_alignment": 90, '
+    '"naics_relevance": 80, "competition_level": 60, "contract_value": 70, "geographic_fit": 120}, '
+    '"rationale": "Strong fit."}'
+)
+
+
+class ScriptedChain:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def invoke(self, inputs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+def make_structured_chain(first, repairs):
+    chain = object.__new__(OpportunityMatchingChain)
+    chain.structured = True
+    chain.max_repairs = 1
+    chain.metrics = ScoringMetrics()
+    chain.evaluation_chain = ScriptedChain([first])
+    chain.repair_chain = ScriptedChain(repairs)
+    return chain
+
+
+def test_structured_evaluation_parses_json():
+    chain = make_structured_chain(VALID_JSON, [])
+    result = chain.evaluate_opportunity(opp(0), "profile")
+    assert result["match_score"] == 82
+    assert result["sub_scores"]["geographic_fit"] == 100
+    assert result["rationale"] == "Strong fit."
+    assert result["evaluation"].startswith("MATCH SCORE: 82/100")
+    assert chain.metrics.snapshot() == {"parsed": 1, "repaired": 0, "parse_failures": 0}
+
+
+def test_evaluation_schema_requires_every_parsed_field():
+    assert set(EVALUATION_SCHEMA["required"]) == {"score", "sub_scores", "rationale"}
+    assert EVALUATION_SCHEMA["properties"]["sub_scores"]["required"] == list(SUB_SCORES)
+
+
+def test_structured_evaluation_repairs_once_then_falls_back():
+    chain = make_structured_chain('{"score": 82, "rationale": "no sub scores"', [VALID_JSON])
+    assert chain.evaluate_opportunity(opp(0), "profile")["match_score"] == 82
+    assert chain.repair_chain.calls == 1
+
+    chain = make_structured_chain("MATCH SCORE: 55 but not JSON", ["still not json"])
+    result = chain.evaluate_opportunity(opp(0), "profile")
+    assert result["match_score"] == 55 and result["parse_failed"] is True
+    assert chain.repair_chain.calls == 1
+    assert chain.metrics.snapshot()["parse_failures"] == 1
+
+
+def test_unparseable_json_and_repair_recover_the_score_or_stay_unscored():
+    truncated = '{"score": 64, "sub_scores": {"set_aside_match": 100'
+    chain = make_structured_chain(truncated, ['{"score": "high"'])
+    result = chain.evaluate_opportunity(opp(0), "profile")
+    assert result["match_score"] == 64 and result["parse_failed"] is True
+
+    chain = make_structured_chain('{"rating": "good"', ['{"verdict": "good"'])
+    result = chain.evaluate_opportunity(opp(0), "profile")
+    assert result["match_score"] is None and result["parse_failed"] is True
+    assert chain.metrics.snapshot()["parse_failures"] == 1
+
+
+def test_unscored_evaluations_are_not_ranked():
+    chain = FakeChain()
+    top = chain.rank_opportunities([opp(40), opp(None), opp(70)], "profile", top_k=3)
+    assert [r["match_score"] for r in top] == [70, 40]
+    assert [r["metadata"]["title"] for r in chain.unscored] == ["tNone"]
+
+
+def test_stream_evaluation_yields_tokens_then_result():
+    chain = object.__new__(OpportunityMatchingChain)
+    chain.structured = False
+    chain.evaluation_chain = type("Streaming", (), {"stream": lambda self, inputs: iter(["MATCH ", "SCORE: ", "77"])})()
+
+    events = list(chain.stream_evaluation(opp(0), "profile"))
+
+    assert events[:3] == [("token", "MATCH "), ("token", "SCORE: "), ("token", "77")]
+    kind, result = events[-1]
+    assert kind == "result" and result["match_score"] == 77 and result["evaluation"] == "MATCH SCORE: 77"
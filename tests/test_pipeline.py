@@ -0,0 +1,65 @@
+import threading
+import time
+
+import pytest
+
+from utils.pipeline import StreamingPipeline
+
+
+def test_pipeline_runs_every_stage_in_order():
+    sink = []
+    pipeline = StreamingPipeline([
+        ("double", lambda x: x * 2),
+        ("drop_odd_inputs", lambda x: x if x % 4 == 0 else None),
+        ("sink", sink.append),
+    ])
+    stats = pipeline.run(range(6))
+
+    assert sink == [0, 4, 8]
+    assert stats["source"]["items"] == 6
+    assert stats["double"]["items"] == 6
+    assert stats["sink"]["items"] == 3
+
+
+def test_pipeline_applies_backpressure():
+    produced = []
+    release = threading.Event()
+
+    def source():
+        for i in range(20):
+            produced.append(i)
+            yield i
+
+    def slow_sink(item):
+        release.wait()
+
+    pipeline = StreamingPipeline([("pass", lambda x: x), ("sink", slow_sink)], queue_size=2)
+    runner = threading.Thread(target=pipeline.run, args=(source(),))
+    runner.start()
+    time.sleep(0.3)
+    # sink holds 1, each of the 2 queues holds 2, the middle stage holds 1, the source holds 1
+    assert len(produced) <= 7
+    release.set()
+    runner.join(timeout=5)
+    assert len(produced) == 20
+
+
+def test_pipeline_propagates_stage_errors():
+    def boom(item):
+        if item == 3:
+            raise ValueError("bad item")
+        return item
+
+    pipeline = StreamingPipeline([("boom", boom), ("sink", lambda x: None)])
+    with pytest.raises(ValueError, match="bad item"):
+        pipeline.run(range(100))
+
+
+def test_pipeline_accepts_async_source():
+    async def pages():
+        for i in range(3):
+            yield [i]
+
+    sink = []
+    StreamingPipeline([("sink", sink.extend)]).run(pages())
+    assert sink == [0, 1, 2]
@@ -0,0 +1,133 @@
+import http.client
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+from langchain_core.documents import Document
+
+from utils.query_server import QueryService, create_server
+
+
+class FakeStore:
+    collection_name = "sam_solicitations"
+
+    def row_count(self):
+        return 42
+
+
+def fake_search(store, query, k=10, setasides=None, naics_codes=None):
+    fake_search.calls.append((query, k, setasides, naics_codes))
+    return [Document(page_content=f"{query} {i}", metadata={"i": i}) for i in range(k)]
+
+
+@pytest.fixture
+def server():
+    fake_search.calls = []
+    server = create_server(QueryService(FakeStore(), {}, fake_search), port=0, workers=2, idle_timeout=0.5)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def call(url, payload=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_health_and_search(server):
+    assert call(f"{server}/health") == (200, {
+        "status": "ok", "collection": "sam_solicitations", "row_count": 42, "warm": [],
+    })
+
+    status, body = call(f"{server}/search", {"query": "cloud", "k": 2, "naics": "541511, 541512"})
+    assert status == 200
+    assert body["results"] == [
+        {"text": "cloud 0", "metadata": {"i": 0}},
+        {"text": "cloud 1", "metadata": {"i": 1}},
+    ]
+    assert fake_search.calls == [("cloud", 2, None, ["541511", "541512"])]
+
+
+def test_errors(server):
+    assert call(f"{server}/search", {})[0] == 400
+    assert call(f"{server}/nope", {"query": "x"})[0] == 404
+    request = urllib.request.Request(f"{server}/search", data=b"not json")
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        urllib.request.urlopen(request, timeout=5)
+    assert excinfo.value.code == 400
+
+
+def test_body_that_is_not_utf8_is_a_client_error(server):
+    request = urllib.request.Request(f"{server}/search", data=b'{"query": "\xff\xfe"}')
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        urllib.request.urlopen(request, timeout=5)
+    assert excinfo.value.code == 400
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_bad_content_length_is_a_client_error(server, length):
+    host, port = server[len("http://"):].split(":")
+    conn = http.client.HTTPConnection(host, int(port), timeout=5)
+    try:
+        conn.putrequest("POST", "/search")
+        conn.putheader("Content-Length", length)
+        conn.endheaders()
+        response = conn.getresponse()
+        assert response.status == 400
+        assert "Content-Length" in json.loads(response.read())["error"]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("path, payload", [
+    ("/search", {"query": "x", "k": "ten"}),
+    ("/search", {"query": "x", "k": 0}),
+    ("/search", {"query": "x", "k": 2.5}),
+    ("/rerank", {"query": "x", "top_n": [1]}),
+    ("/csv-match", {"company_profile": "x", "cutoff": "all"}),
+])
+def test_bad_numbers_are_client_errors(server, path, payload):
+    status, body = call(f"{server}{path}", payload)
+    assert status == 400 and "positive integer" in body["error"]
+
+
+def test_numeric_strings_are_accepted(server):
+    assert call(f"{server}/search", {"query": "x", "k": "3"})[0] == 200
+    assert fake_search.calls[-1][1] == 3
+
+
+def test_idle_keep_alive_connection_is_closed(server):
+    host, port = server[len("http://"):].split(":")
+    conn = http.client.HTTPConnection(host, int(port), timeout=5)
+    try:
+        conn.request("GET", "/health")
+        response = conn.getresponse()
+        assert response.status == 200 and response.getheader("Connection") != "close"
+        response.read()
+        # The worker gives up on the idle connection instead of waiting forever
+        assert conn.sock.recv(1) == b""
+    finally:
+        conn.close()
+
+
+def test_concurrent_requests_share_the_service(server):
+    results = []
+    threads = [
+        threading.Thread(target=lambda i=i: results.append(call(f"{server}/search", {"query": f"q{i}", "k": 1})))
+        for i in range(6)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(status for status, _ in results) == [200] * 6
+    assert len(fake_search.calls) == 6
@@ -0,0 +1,92 @@
+import json
+import re
+
+from langchain_core.documents import Document
+
+from chains.rerank_chain import RerankChain, pack_windows, parse_ranking, truncate_to_tokens
+
+
+class ScoreByNumberLLM:
+    """Ranks documents by the number embedded in their text ("doc 17")."""
+
+    def __init__(self, window_tokens):
+        self.window_tokens = window_tokens
+        self.calls = []
+
+    def invoke(self, inputs):
+        docs = re.findall(r"\[(\d+)\] doc (\d+)", inputs["documents"])
+        assert len(docs) == inputs["count"]
+        self.calls.append(len(docs))
+        ranking = sorted(docs, key=lambda d: -int(d[1]))
+        return json.dumps({"ranking": [{"id": int(i), "score": int(n)} for i, n in ranking]})
+
+
+def make_chain(window_tokens=60, doc_tokens=10, max_candidates=30):
+    chain = object.__new__(RerankChain)
+    chain.window_tokens = window_tokens
+    chain.doc_tokens = doc_tokens
+    chain.max_candidates = max_candidates
+    chain.calls = 0
+    chain.chain = ScoreByNumberLLM(window_tokens)
+    return chain
+
+
+def test_truncate_and_pack():
+    assert truncate_to_tokens("one two three four five", 2) == "one two …"
+    assert truncate_to_tokens("short", 10) == "short"
+    assert pack_windows([10, 10, 10, 25, 5], 30) == [[0, 1, 2], [3, 4]]
+    assert pack_windows([50, 5], 30) == [[0], [1]]
+
+
+def test_parse_ranking_fills_missing_and_falls_back_to_labels():
+    ranking = parse_ranking('Sure! {"ranking": [{"id": 2, "score": 90}, {"id": 9, "score": 80}]}', 3)
+    assert ranking == [{"id": 2, "score": 90.0}, {"id": 0, "score": 0.0}, {"id": 1, "score": 0.0}]
+    assert [r["id"] for r in parse_ranking("Best is [1], then [0]", 3)] == [1, 0, 2]
+
+
+def test_tournament_rerank_returns_structured_top_n():
+    docs = [Document(page_content=f"doc {n} " + "filler " * 40) for n in (3, 17, 8, 11, 2, 25, 5, 14, 1, 9)]
+    chain = make_chain()
+
+    ranked = chain.rerank("query", docs, top_n=3)
+
+    assert len(ranked) == 3
+    assert [r["rank"] for r in ranked] == [1, 2, 3]
+    assert [int(r["document"].page_content.split()[1]) for r in ranked] == [25, 17, 14]
+    assert ranked[0]["score"] == 25
+    # Every prompt stayed within the window budget (14 tokens per doc, 60 per window)
+    assert max(chain.chain.calls) <= 4
+    assert chain.calls == len(chain.chain.calls)
+
+
+def test_rerank_caps_candidates():
+    docs = [Document(page_content=f"doc {n}") for n in range(50)]
+    chain = make_chain(window_tokens=1000, max_candidates=10)
+    ranked = chain.rerank("query", docs, top_n=2)
+    assert [int(r["document"].page_content.split()[1]) for r in ranked] == [9, 8]
+    assert chain.chain.calls == [10]
+
+
+def test_windows_smaller_than_top_n_still_converge():
+    docs = [Document(page_content=f"doc {n} " + "filler " * 40) for n in range(12)]
+    chain = make_chain(window_tokens=30)
+    ranked = chain.rerank("query", docs, top_n=3)
+    assert len(ranked) == 3
+    assert ranked[0]["document"].page_content.startswith("doc 11")
+
+
+class InOrderLLM:
+    """Ranks every window in the order it was given."""
+
+    def invoke(self, inputs):
+        count = inputs["count"]
+        return json.dumps({"ranking": [{"id": i, "score": count - i} for i in range(count)]})
+
+
+def test_unbreakable_text_over_half_a_window_still_terminates():
+    docs = [Document(page_content="x" * 400) for _ in range(6)]
+    chain = make_chain(window_tokens=30, doc_tokens=11)
+    chain.chain = InOrderLLM()
+    ranked = chain.rerank("query", docs, top_n=3)
+    assert len(ranked) == 3
+    assert chain.calls > 0
@@ -1,9 +1,16 @@
+import hashlib
+import io
 import json
+
+import pytest
+from botocore.exceptions import ClientError
+
 from utils.solicitation_assets import (
     enrich_record_with_details,
     parse_s3_path,
     date_to_prefix,
     list_json_keys_for_date,
+    upload_stream,
 )
 
 
@@ -14,6 +21,22 @@ class DummyS3:
     def put_object(self, Bucket, Key, Body):
         self.objects[(Bucket, Key)] = Body
 
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {}
+
+    def copy_object(self, Bucket, Key, CopySource):
+        self.objects[(Bucket, Key)] = self.objects[(CopySource["Bucket"], CopySource["Key"])]
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
     def list_objects_v2(self, Bucket, Prefix, MaxKeys=1000):
         contents = [
             {"Key": k}
@@ -48,10 +71,19 @@ def test_enrich_record_with_details(monkeypatch):
                 raise ValueError()
             return self._json
 
+        def iter_content(self, chunk_size=1):
+            for i in range(0, len(self.content), chunk_size):
+                yield self.content[i:i + chunk_size]
+
+        def close(self):
+            pass
+
     calls = []
 
-    def mock_get(url):
+    def mock_get(url, **kwargs):
         calls.append(url)
+        # Every request is bounded so a stalled host can't pin a per-host slot
+        assert kwargs.get("timeout")
         if url == "http://example.com/desc":
             return DummyResp(b"{}", json_data={"description": "full text"})
         return DummyResp(b"data")
@@ -62,9 +94,15 @@ def test_enrich_record_with_details(monkeypatch):
     enriched = enrich_record_with_details(record, s3, "bucket", dry_run=False)
 
     assert enriched["description_data_key"].endswith("description.json")
-    assert len(enriched["attachment_keys"]) == 2
+    digest = hashlib.sha256(b"data").hexdigest()
+    assert enriched["attachment_keys"] == [f"blobs/sha256/{digest}"] * 2
+    # description, one blob shared by both attachments and the pointer listing
     assert len(s3.objects) == 3
     assert calls[0] == "http://example.com/desc"
+    listing = json.loads(s3.objects[("bucket", "2025/06/16/abc123/attachments.json")])
+    assert [(a["name"], a["size"], a["blob"]) for a in listing] == [
+        ("file1", 4, f"blobs/sha256/{digest}"), ("file2", 4, f"blobs/sha256/{digest}"),
+    ]
 
 
 def test_enrich_record_idempotent(monkeypatch):
@@ -77,7 +115,7 @@ def test_enrich_record_idempotent(monkeypatch):
         ],
     }
 
-    def mock_get(url):
+    def mock_get(url, **kwargs):
         raise AssertionError("requests.get should not be called")
 
     monkeypatch.setattr("requests.get", mock_get)
@@ -95,6 +133,51 @@ def test_enrich_record_idempotent(monkeypatch):
     assert "attachment_keys" not in enriched
 
 
+def test_failed_downloads_are_reported_and_retried(monkeypatch):
+    record = {
+        "noticeId": "abc123",
+        "postedDate": "2025-06-16",
+        "description": "http://example.com/desc",
+        "resourceLinks": ["http://example.com/file1/download", "http://example.com/file2/download"],
+    }
+    broken = {"http://example.com/desc", "http://example.com/file2/download"}
+
+    class Resp:
+        headers = {}
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"description": "full text"}
+
+        def iter_content(self, chunk_size=1):
+            yield b"data"
+
+        def close(self):
+            pass
+
+    def mock_get(url, **kwargs):
+        if url in broken:
+            raise ConnectionError("reset")
+        return Resp()
+
+    monkeypatch.setattr("requests.get", mock_get)
+    s3 = DummyS3()
+    enriched = enrich_record_with_details(dict(record), s3, "bucket")
+
+    assert enriched["failed_links"] == ["http://example.com/desc", "http://example.com/file2/download"]
+    marker = ("bucket", "2025/06/16/abc123/_incomplete.json")
+    assert json.loads(s3.objects[marker])["failed_links"] == enriched["failed_links"]
+
+    # The folder exists, but the marker makes the next run fetch again
+    broken.clear()
+    enriched = enrich_record_with_details(dict(record), s3, "bucket")
+    assert "failed_links" not in enriched
+    assert enriched["description_data_key"].endswith("description.json")
+    assert marker not in s3.objects
+
+
 def test_parse_s3_path():
     b, k = parse_s3_path("sam-archive/2025/06/16/foo.json")
     assert b == "sam-archive"
@@ -138,3 +221,115 @@ def test_list_json_keys_for_date():
     s3 = DummyListS3(pages)
     keys = list(list_json_keys_for_date(s3, "bucket", "2025-06-17"))
     assert keys == ["2025/06/17/a.json", "2025/06/17/c.json"]
+
+
+class MultipartS3(DummyS3):
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.aborted = False
+
+    def create_multipart_upload(self, Bucket, Key):
+        return {"UploadId": "u1"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.parts.append(Body)
+        return {"ETag": f"etag{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        assert [p["PartNumber"] for p in MultipartUpload["Parts"]] == list(range(1, len(self.parts) + 1))
+        self.objects[(Bucket, Key)] = b"".join(self.parts)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted = True
+
+
+def test_upload_stream_uses_fixed_size_parts():
+    s3 = MultipartS3()
+    chunks = [b"abc", b"defgh", b"ij", b"k"]
+    info = upload_stream(s3, "bucket", "big.pdf", chunks, part_size=4)
+
+    assert s3.parts == [b"abcd", b"efgh", b"ijk"]
+    assert s3.objects[("bucket", "big.pdf")] == b"abcdefghijk"
+    assert info == {"size": 11, "sha256": hashlib.sha256(b"abcdefghijk").hexdigest()}
+
+    small = upload_stream(s3, "bucket", "small.pdf", [b"ab"], part_size=4)
+    assert s3.objects[("bucket", "small.pdf")] == b"ab" and small["size"] == 2
+
+
+def test_upload_stream_aborts_failed_multipart():
+    s3 = MultipartS3()
+
+    def broken():
+        yield b"abcdef"
+        raise IOError("connection reset")
+
+    with pytest.raises(IOError):
+        upload_stream(s3, "bucket", "big.pdf", broken(), part_size=4)
+    assert s3.aborted
+    assert ("bucket", "big.pdf") not in s3.objects
+
+
+class ConditionalResp:
+    def __init__(self, status_code=200, content=b"pdf-bytes", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=1):
+        yield self.content
+
+    def close(self):
+        pass
+
+
+def test_shared_attachments_are_stored_once_and_revalidated(monkeypatch, tmp_path):
+    from utils.resource_index import ResourceIndex
+    from utils.sqlite_cache import SQLiteCache
+
+    link = "http://example.com/shared/download"
+    requests_seen = []
+
+    def mock_get(url, headers=None, **kwargs):
+        requests_seen.append(dict(headers or {}))
+        if headers and headers.get("If-None-Match") == '"v1"':
+            return ConditionalResp(status_code=304, content=b"")
+        return ConditionalResp(headers={"ETag": '"v1"', "Content-Disposition": 'filename="spec.pdf"'})
+
+    monkeypatch.setattr("requests.get", mock_get)
+    s3 = DummyS3()
+    index = ResourceIndex(SQLiteCache(str(tmp_path / "index.sqlite")))
+
+    first = enrich_record_with_details(
+        {"noticeId": "n1", "postedDate": "2025-06-16", "resourceLinks": [link]}, s3, "bucket", resource_index=index
+    )
+    second = enrich_record_with_details(
+        {"noticeId": "n2", "postedDate": "2025-06-17", "resourceLinks": [link]}, s3, "bucket", resource_index=index
+    )
+
+    assert requests_seen == [{}, {"If-None-Match": '"v1"'}]
+    assert first["attachment_keys"] == second["attachment_keys"]
+    blobs = [k for _, k in s3.objects if k.startswith("blobs/")]
+    assert blobs == [f"blobs/sha256/{hashlib.sha256(b'pdf-bytes').hexdigest()}"]
+    pointer = json.loads(s3.objects[("bucket", "2025/06/17/n2/attachments.json")])[0]
+    assert pointer["key"] == "2025/06/17/n2/spec.pdf" and pointer["blob"] == blobs[0]
+
+
+def test_urls_without_validators_are_not_fetched_again(monkeypatch, tmp_path):
+    from utils.resource_index import ResourceIndex
+    from utils.sqlite_cache import SQLiteCache
+
+    calls = []
+    monkeypatch.setattr("requests.get", lambda url, **kwargs: calls.append(url) or ConditionalResp())
+    index = ResourceIndex(SQLiteCache(str(tmp_path / "index.sqlite")))
+    link = "http://example.com/file9/download"
+
+    for notice_id in ("n1", "n2"):
+        enrich_record_with_details(
+            {"noticeId": notice_id, "postedDate": "2025-06-16", "resourceLinks": [link]},
+            DummyS3(), "bucket", resource_index=index,
+        )
+    assert calls == [link]
@@ -0,0 +1,41 @@
+import ast
+
+from scripts.startup_benchmark import MAIN_PATH, mode_imports, probe
+
+
+def test_enrich_does_not_import_langchain_or_milvus():
+    heavy = probe("enrich")["heavy"]
+    assert not any(p.startswith("langchain") for p in heavy)
+    assert "pymilvus" not in heavy
+
+
+def test_search_does_not_import_archive_dependencies():
+    heavy = probe("search")["heavy"]
+    assert "boto3" not in heavy and "pdfplumber" not in heavy
+    assert "llama_api_client" not in heavy
+
+
+def test_mode_imports_follow_main_entry_paths():
+    with open(MAIN_PATH, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    choices = next(
+        ast.literal_eval(kw.value)
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Call) and node.args and getattr(node.args[0], "value", None) == "--mode"
+        for kw in node.keywords if kw.arg == "choices"
+    )
+    imports = mode_imports()
+    assert sorted(imports) == sorted(choices)
+
+    # Through helpers (ingest), passed references (serve hands over search) and connect_store
+    assert "from agents.solicitation_agent import SolicitationAgent" in imports["ingest"]
+    assert "from chains.semantic_search_chain import SemanticSearchChain" in imports["serve"]
+    assert "from rag.milvus_store import MilvusStore" in imports["stats"]
+    assert "from utils.enrichment_engine import EnrichmentEngine" in imports["enrich"]
+    assert not any("milvus" in statement for statement in imports["enrich"] + imports["ragsetup"])
+
+
+def test_probe_runs_exactly_the_given_statements():
+    result = probe("stats", ["import json"])
+    assert result["seconds"] > 0
+    assert "pymilvus" not in result["heavy"]
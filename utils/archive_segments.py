@@ -0,0 +1,168 @@
+"""Compressed NDJSON segments for the raw solicitation archive.
+
+A segment holds many notices from one posted day as
+``YYYY/MM/DD/_segment-<stamp>.ndjson.gz``. Every record is its own gzip
+member, so the file is an ordinary gzip NDJSON stream for sequential reads,
+and the ``<segment>.index.json`` object next to it maps each notice id to
+the ``[offset, length]`` of its member for single-notice ranged GETs.
+
+Readers here understand both archive layouts: one ``<notice_id>.json`` per
+notice and segments.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import zlib
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from utils.solicitation_assets import MANIFEST_NAME, is_record_key
+
+SEGMENT_PREFIX = "_segment-"
+SEGMENT_SUFFIX = ".ndjson.gz"
+INDEX_SUFFIX = ".index.json"
+
+
+def segment_key(day: str, now: Optional[datetime] = None) -> str:
+    stamp = (now or datetime.now(timezone.utc)).strftime("%Y%m%dT%H%M%S%f")
+    return f"{day}/{SEGMENT_PREFIX}{stamp}{SEGMENT_SUFFIX}"
+
+
+def index_key(segment: str) -> str:
+    return segment[: -len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+
+
+def is_segment_key(key: str) -> bool:
+    parts = key.split("/")
+    return len(parts) == 4 and parts[-1].startswith(SEGMENT_PREFIX) and key.endswith(SEGMENT_SUFFIX)
+
+
+def encode_segment(records: Iterable[Tuple[str, Dict]]) -> Tuple[bytes, Dict[str, List[int]]]:
+    """Compress ``(notice_id, record)`` pairs into one segment and its offset index."""
+    chunks: List[bytes] = []
+    index: Dict[str, List[int]] = {}
+    offset = 0
+    for notice_id, record in records:
+        member = gzip.compress((json.dumps(record) + "\n").encode("utf-8"))
+        index[notice_id] = [offset, len(member)]
+        chunks.append(member)
+        offset += len(member)
+    return b"".join(chunks), index
+
+
+def decode_member(data: bytes) -> Dict:
+    return json.loads(gzip.decompress(data))
+
+
+def decode_segment(data: bytes) -> Iterator[Dict]:
+    """Yield the records of a segment in the order they were written.
+
+    Raises ``zlib.error`` for corrupt data and ``EOFError`` for a truncated
+    member, which would otherwise decode without complaint.
+    """
+    while data:
+        member = zlib.decompressobj(wbits=31)
+        line = member.decompress(data) + member.flush()
+        if not member.eof:
+            raise EOFError("segment ends in a truncated gzip member")
+        data = member.unused_data
+        if line.strip():
+            yield json.loads(line)
+
+
+def record_key(day: str, notice_id: str) -> str:
+    """The one-object-per-notice key a record has (or would have) in the archive."""
+    return f"{day}/{notice_id}.json"
+
+
+def _print_error(key: str, error: Exception) -> None:
+    print(f"⚠️ Failed to load {key}: {error}")
+
+
+def iter_archive_records(
+    s3_client,
+    bucket: str,
+    prefix: str = "",
+    on_error: Callable[[str, Exception], None] = _print_error,
+    skip: Optional[Callable[[str], bool]] = None,
+) -> Iterator[Tuple[str, Dict]]:
+    """Yield ``(record_key, record)`` for every archived notice under ``prefix``.
+
+    Plain ``<notice_id>.json`` objects are fetched one by one; segments are
+    read with a single GET each. Segment records are reported under the key
+    they would have in the plain layout, so callers can derive the day and
+    notice id the same way for both. Objects that fail to load are passed to
+    ``on_error`` and skipped, as are record keys for which ``skip`` is true
+    (plain objects are then not even fetched). A segment whose index upload
+    failed is an orphan whose notices were archived again, so segments are
+    only read when their index was listed first (S3 lists keys in order, and
+    ``.index.json`` sorts before ``.ndjson.gz``).
+    """
+    indexes = set()
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            key = obj["Key"]
+            if key.endswith(INDEX_SUFFIX):
+                indexes.add(key)
+                continue
+            if is_segment_key(key) and index_key(key) not in indexes:
+                on_error(key, LookupError("segment has no index"))
+                continue
+            try:
+                if is_record_key(key):
+                    if skip and skip(key):
+                        continue
+                    body = s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+                    yield key, json.loads(body)
+                elif is_segment_key(key):
+                    day = os.path.dirname(key)
+                    body = s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+                    for record in decode_segment(body):
+                        rkey = record_key(day, record.get("noticeId"))
+                        if not (skip and skip(rkey)):
+                            yield rkey, record
+            except (ClientError, ValueError, zlib.error, EOFError) as e:
+                on_error(key, e)
+
+
+def read_manifest(s3_client, bucket: str, day: str) -> Optional[Dict]:
+    """Return a day's manifest, or ``None`` when it is missing."""
+    try:
+        body = s3_client.get_object(Bucket=bucket, Key=f"{day}/{MANIFEST_NAME}")["Body"].read()
+    except ClientError:
+        return None
+    return json.loads(body)
+
+
+def load_record(s3_client, bucket: str, key: str) -> Dict:
+    """Load one notice by its ``YYYY/MM/DD/<notice_id>.json`` key in either layout.
+
+    When no such object exists the day's segments are searched through their
+    offset indexes and the record is fetched with a ranged GET.
+    """
+    try:
+        return json.loads(s3_client.get_object(Bucket=bucket, Key=key)["Body"].read())
+    except ClientError:
+        pass
+
+    day = os.path.dirname(key)
+    notice_id = os.path.splitext(os.path.basename(key))[0]
+    manifest = read_manifest(s3_client, bucket, day) or {}
+    for segment in manifest.get("segments", []):
+        try:
+            index = json.loads(s3_client.get_object(Bucket=bucket, Key=index_key(segment))["Body"].read())
+        except ClientError:
+            continue
+        if notice_id in index:
+            offset, length = index[notice_id]
+            body = s3_client.get_object(
+                Bucket=bucket, Key=segment, Range=f"bytes={offset}-{offset + length - 1}"
+            )["Body"].read()
+            return decode_member(body)
+    raise KeyError(f"{key} is not in the archive")
@@ -0,0 +1,249 @@
+"""Asyncio SAM.gov client with pooled connections and adaptive concurrency."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiohttp
+
+from .sam_api import SAM_SEARCH_URL, build_search_params, default_posted_window
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class SamAPIError(RuntimeError):
+    """Raised when a SAM.gov request keeps failing after all retries."""
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit driven by request latency and overload signals.
+
+    Every successful request under ``latency_target`` seconds grows the limit
+    by ``1 / limit`` (roughly one extra slot per window of requests). A 429,
+    a 5xx, a connection error or a slow response multiplies the limit by
+    ``decrease_factor``, at most once per ``cooldown`` seconds so that a burst
+    of rejections from the same window only counts once.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        latency_target: float = 5.0,
+        decrease_factor: float = 0.5,
+        cooldown: float = 1.0,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._in_flight = 0
+        self._last_decrease = float("-inf")
+        self._cond = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+    async def release(self) -> None:
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, latency: float) -> None:
+        if latency > self.latency_target:
+            self.on_overload()
+            return
+        self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+
+    def on_overload(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class AsyncSamAPIClient:
+    """Fetch SAM.gov search pages concurrently over one keep-alive session.
+
+    Pages that hit a retryable status are retried with full-jitter
+    exponential backoff (honouring ``Retry-After`` when present). Pages that
+    still fail are recorded in ``failed_pages`` instead of being dropped
+    silently.
+    """
+
+    BASE_URL = SAM_SEARCH_URL
+
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        base_url: str | None = None,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+        timeout: float = 60.0,
+        pool_size: int = 16,
+        limiter: AdaptiveConcurrencyLimiter | None = None,
+    ) -> None:
+        self.api_key = api_key
+        self.base_url = base_url or self.BASE_URL
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.limiter = limiter
+        self._owns_limiter = limiter is None
+        self.failed_pages: List[int] = []
+        self.retries = 0
+
+    # ------------------------------------------------------------------
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(self.backoff_cap, retry_after)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    # ------------------------------------------------------------------
+    async def _get_json(self, session: aiohttp.ClientSession, params: Dict, label: str) -> Dict:
+        params = {k: v for k, v in params.items() if v is not None}
+        error = "unknown error"
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            await self.limiter.acquire()
+            started = time.monotonic()
+            try:
+                async with session.get(self.base_url, params=params) as resp:
+                    if resp.status in RETRYABLE_STATUSES:
+                        self.limiter.on_overload()
+                        retry_after = _parse_retry_after(resp.headers.get("Retry-After"))
+                        error = f"HTTP {resp.status}"
+                    else:
+                        resp.raise_for_status()
+                        data = await resp.json(content_type=None)
+                        self.limiter.on_success(time.monotonic() - started)
+                        return data
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                self.limiter.on_overload()
+                error = str(e) or type(e).__name__
+            finally:
+                await self.limiter.release()
+
+            if attempt == self.max_retries:
+                break
+            self.retries += 1
+            delay = self._backoff(attempt, retry_after)
+            print(f"⏳ {label}: {error}, retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+            await asyncio.sleep(delay)
+
+        raise SamAPIError(f"{label} failed after {self.max_retries + 1} attempts: {error}")
+
+    # ------------------------------------------------------------------
+    async def _fetch_page(self, session, page, limit, title, ptype, ncode, posted_from, posted_to) -> List[Dict]:
+        offset = page * limit
+        params = build_search_params(self.api_key, limit, offset, title, ptype, ncode, posted_from, posted_to)
+        print(f"🔎 Fetching page {page + 1} (offset {offset}, concurrency {self.limiter.limit})...")
+        data = await self._get_json(session, params, f"page {page + 1}")
+        return data.get("opportunitiesData", [])
+
+    # ------------------------------------------------------------------
+    async def iter_pages_async(
+        self, title=None, ptype=None, ncode=None, posted_from=None, posted_to=None, limit=100, prefetch=None
+    ) -> AsyncIterator[List[Dict]]:
+        """Yield each page of results as soon as it has been downloaded.
+
+        At most ``prefetch`` pages (default: twice the pool size) are in flight
+        or waiting to be consumed, so a slow consumer throttles downloading
+        instead of letting finished pages pile up in memory.
+        """
+        default_from, default_to = default_posted_window()
+        posted_from = posted_from or default_from
+        posted_to = posted_to or default_to
+        prefetch = prefetch or self.pool_size * 2
+
+        # asyncio primitives bind to the running loop, so a default limiter is
+        # created per run rather than in __init__
+        if self._owns_limiter:
+            self.limiter = AdaptiveConcurrencyLimiter(max_limit=self.pool_size)
+        self.failed_pages = []
+        self.retries = 0
+
+        connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            print("🔎 Fetching total record count...")
+            params = build_search_params(self.api_key, 1, 0, title, ptype, ncode, posted_from, posted_to)
+            first = await self._get_json(session, params, "total record count")
+            total_records = first.get("totalRecords", 0)
+            print(f"📈 Total records available: {total_records}")
+
+            total_pages = (total_records + limit - 1) // limit
+            print(f"🗂️ Fetching {total_pages} pages (limit {limit} records per page)")
+
+            async def fetch(page):
+                try:
+                    return await self._fetch_page(
+                        session, page, limit, title, ptype, ncode, posted_from, posted_to
+                    )
+                except (SamAPIError, aiohttp.ClientError) as e:
+                    print(f"⚠️ Error fetching page {page + 1}: {e}")
+                    self.failed_pages.append(page)
+                    return []
+
+            pages = iter(range(total_pages))
+            pending = set()
+            try:
+                while True:
+                    for page in pages:
+                        pending.add(asyncio.ensure_future(fetch(page)))
+                        if len(pending) >= prefetch:
+                            break
+                    if not pending:
+                        break
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        page_data = task.result()
+                        if page_data:
+                            yield page_data
+            finally:
+                for task in pending:
+                    task.cancel()
+
+        if self.failed_pages:
+            print(f"❌ {len(self.failed_pages)} pages could not be fetched: {sorted(p + 1 for p in self.failed_pages)}")
+
+    async def search_opportunities_async(
+        self, title=None, ptype=None, ncode=None, posted_from=None, posted_to=None, limit=100
+    ) -> List[Dict]:
+        all_results: List[Dict] = []
+        async for page_data in self.iter_pages_async(title, ptype, ncode, posted_from, posted_to, limit):
+            all_results.extend(page_data)
+        print(f"✅ Successfully fetched {len(all_results)} total solicitations ({self.retries} retries).")
+        return all_results
+
+    def search_opportunities(self, title=None, ptype=None, ncode=None, posted_from=None, posted_to=None, limit=100) -> List[Dict]:
+        """Synchronous entry point mirroring ``SamAPIClient.search_opportunities``."""
+        return asyncio.run(
+            self.search_opportunities_async(title, ptype, ncode, posted_from, posted_to, limit)
+        )
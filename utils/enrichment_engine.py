@@ -0,0 +1,233 @@
+"""Concurrent enrichment of archived notices with descriptions and attachments."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .solicitation_assets import enrich_record_with_details
+
+DEFAULT_WORKERS = 8
+DEFAULT_PER_HOST = 4
+DEFAULT_CHECKPOINT_PATH = os.path.join("state", "enrich_checkpoint.json")
+PROGRESS_EVERY = 25
+
+
+class HostLimiter:
+    """Allow at most ``per_host`` concurrent requests to any one host."""
+
+    def __init__(self, per_host: int) -> None:
+        self.per_host = per_host
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str) -> threading.BoundedSemaphore:
+        """Wait for a slot on ``url``'s host and return it; the caller releases it."""
+        host = urlparse(url).netloc
+        with self._lock:
+            slot = self._slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        slot.acquire()
+        return slot
+
+    @contextmanager
+    def limit(self, url: str):
+        slot = self.acquire(url)
+        try:
+            yield
+        finally:
+            slot.release()
+
+
+class _SlotResponse:
+    """A streamed response that keeps its host slot until it is closed."""
+
+    def __init__(self, response, slot: threading.BoundedSemaphore) -> None:
+        self._response = response
+        self._slot = slot
+        self._released = False
+        self._release_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def close(self) -> None:
+        try:
+            self._response.close()
+        finally:
+            with self._release_lock:
+                if not self._released:
+                    self._released = True
+                    self._slot.release()
+
+
+class LimitedSession:
+    """A pooled ``requests.Session`` whose ``get`` waits for a per-host slot.
+
+    Plain responses have their body read before the slot is released. With
+    ``stream=True`` the body is still on the wire when ``get`` returns, so
+    the slot is held until the caller closes the response.
+    """
+
+    def __init__(self, session: requests.Session, limiter: HostLimiter) -> None:
+        self.session = session
+        self.limiter = limiter
+
+    def get(self, url: str, **kwargs):
+        slot = self.limiter.acquire(url)
+        try:
+            response = self.session.get(url, **kwargs)
+        except BaseException:
+            slot.release()
+            raise
+        if kwargs.get("stream"):
+            return _SlotResponse(response, slot)
+        slot.release()
+        return response
+
+
+def pooled_session(pool_size: int) -> requests.Session:
+    """Return a session that keeps up to ``pool_size`` connections per host alive."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class EnrichCheckpoint:
+    """Archive keys of notices already enriched, persisted for resuming a run."""
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH) -> None:
+        self.path = path
+        self.done: Set[str] = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.done = set(json.load(f).get("done", []))
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"done": sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        self.done = set()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class EnrichmentEngine:
+    """Enrich many archived notices at once.
+
+    Up to ``workers`` notices (``ENRICH_WORKERS``) are processed at a time and
+    their attachments are downloaded on a second pool of the same size, all
+    through one pooled HTTP session that allows at most ``per_host``
+    concurrent requests to a host (``ENRICH_PER_HOST``). Finished notices are
+    written to a checkpoint every ``PROGRESS_EVERY`` completions, so an
+    interrupted run resumes where it stopped; the checkpoint is removed once a
+    run completes without failures. A notice with any failed download counts
+    as failed and stays out of the checkpoint, so the next run retries it. A ``resource_index`` lets repeat
+    attachment URLs skip the download (see ``enrich_record_with_details``).
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket: str,
+        *,
+        api_key: Optional[str] = None,
+        workers: Optional[int] = None,
+        per_host: Optional[int] = None,
+        checkpoint_path: str = DEFAULT_CHECKPOINT_PATH,
+        session=None,
+        resource_index=None,
+    ) -> None:
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.api_key = api_key
+        self.workers = workers or int(os.getenv("ENRICH_WORKERS") or DEFAULT_WORKERS)
+        per_host = per_host or int(os.getenv("ENRICH_PER_HOST") or DEFAULT_PER_HOST)
+        self.session = session or LimitedSession(pooled_session(self.workers * 2), HostLimiter(per_host))
+        self.resource_index = resource_index
+        self.checkpoint = EnrichCheckpoint(checkpoint_path)
+        self.stats = {"notices": 0, "attachments": 0, "failed": 0}
+
+    def is_done(self, key: str) -> bool:
+        return key in self.checkpoint.done
+
+    def _enrich(self, key: str, record: Dict, attachment_pool: ThreadPoolExecutor) -> Tuple[str, Dict]:
+        enriched = enrich_record_with_details(
+            record,
+            self.s3,
+            self.bucket,
+            api_key=self.api_key,
+            session=self.session,
+            attachment_pool=attachment_pool,
+            resource_index=self.resource_index,
+        )
+        return key, enriched
+
+    def _progress(self, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        rate = self.stats["notices"] / elapsed if elapsed > 0 else 0.0
+        print(
+            f"📈 Enriched {self.stats['notices']} notices ({rate:.1f}/s), "
+            f"{self.stats['attachments']} attachments, {self.stats['failed']} failed"
+        )
+
+    def run(self, records: Iterable[Tuple[str, Dict]]) -> Dict[str, int]:
+        """Enrich ``(archive_key, record)`` pairs, skipping keys in the checkpoint."""
+        if self.checkpoint.done:
+            print(f"↩️ Resuming: {len(self.checkpoint.done)} notices already enriched")
+        started = time.perf_counter()
+
+        def collect(done) -> None:
+            for future in done:
+                try:
+                    key, enriched = future.result()
+                except Exception as e:
+                    print(f"⚠️ Enrichment failed: {e}")
+                    self.stats["failed"] += 1
+                    continue
+                if enriched.get("failed_links"):
+                    print(f"⚠️ {key}: {len(enriched['failed_links'])} download(s) failed, will retry next run")
+                    self.stats["failed"] += 1
+                    continue
+                self.checkpoint.done.add(key)
+                self.stats["notices"] += 1
+                self.stats["attachments"] += len(enriched.get("attachment_keys", []))
+                if self.stats["notices"] % PROGRESS_EVERY == 0:
+                    self.checkpoint.save()
+                    self._progress(started)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="attach") as attachment_pool, \
+                    ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="enrich") as executor:
+                pending = set()
+                for key, record in records:
+                    if self.is_done(key):
+                        continue
+                    pending.add(executor.submit(self._enrich, key, record, attachment_pool))
+                    if len(pending) >= self.workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+        finally:
+            self.checkpoint.save()
+
+        self._progress(started)
+        if not self.stats["failed"]:
+            self.checkpoint.clear()
+        return dict(self.stats)
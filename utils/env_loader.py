@@ -12,5 +12,6 @@ def load_env():
         "MINIO_ENDPOINT": os.getenv("MINIO_ENDPOINT"),
         "MILVUS_HOST": os.getenv("MILVUS_HOST"),
         "MILVUS_PORT": os.getenv("MILVUS_PORT"),
+        "INGEST_STATE_PATH": os.getenv("INGEST_STATE_PATH"),
     }
     return config
@@ -0,0 +1,144 @@
+"""Persisted high-water mark and content hashes for incremental ingest."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List
+
+from .rag_helpers import _parse_date
+
+DEFAULT_STATE_PATH = os.path.join("state", "ingest_state.json")
+
+
+def parse_posted_date(posted: str) -> datetime | None:
+    """Parse a SAM.gov ``postedDate`` into a timezone-aware UTC datetime."""
+    if not posted:
+        return None
+    try:
+        dt = datetime.fromisoformat(posted.replace("Z", "+00:00"))
+    except ValueError:
+        return _parse_date(posted)
+    if not dt.tzinfo:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def document_hash(doc: Dict) -> str:
+    """Return a SHA-256 over a processed document's text and metadata."""
+    payload = doc["text"] + "\0" + json.dumps(doc["metadata"], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IngestState:
+    """Track what has already been pulled and embedded between ingest runs.
+
+    The watermark is the newest ``postedDate`` seen together with the notice
+    IDs posted at exactly that instant, since the SAM.gov ``postedFrom``
+    filter only has day granularity and the boundary day is always refetched.
+    ``notices`` maps every embedded notice ID to its content hash and
+    response deadline so unchanged notices can be skipped and expired ones
+    deleted.
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH) -> None:
+        self.path = path
+        self.watermark: Dict | None = None
+        self.notices: Dict[str, Dict] = {}
+        self.load()
+
+    # ------------------------------------------------------------------
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.watermark = data.get("watermark")
+        self.notices = data.get("notices", {})
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"watermark": self.watermark, "notices": self.notices}, f)
+        os.replace(tmp_path, self.path)
+
+    def reset(self) -> None:
+        self.watermark = None
+        self.notices = {}
+
+    # ------------------------------------------------------------------
+    def has_watermark(self) -> bool:
+        return bool(self.watermark)
+
+    def posted_from(self) -> str | None:
+        """Return the watermark day in the ``MM/DD/YYYY`` form SAM.gov expects."""
+        if not self.watermark:
+            return None
+        return datetime.fromisoformat(self.watermark["posted_date"]).strftime("%m/%d/%Y")
+
+    def is_new(self, record: Dict) -> bool:
+        """Return True if ``record`` was posted after the watermark."""
+        if not self.watermark:
+            return True
+        posted = parse_posted_date(record.get("postedDate"))
+        if posted is None:
+            return True
+        mark = datetime.fromisoformat(self.watermark["posted_date"])
+        if posted > mark:
+            return True
+        return posted == mark and record.get("noticeId") not in self.watermark["notice_ids"]
+
+    def advance(self, records: Iterable[Dict]) -> None:
+        """Move the watermark forward to the newest ``postedDate`` in ``records``."""
+        mark = datetime.fromisoformat(self.watermark["posted_date"]) if self.watermark else None
+        ids = set(self.watermark["notice_ids"]) if self.watermark else set()
+        for record in records:
+            posted = parse_posted_date(record.get("postedDate"))
+            if posted is None:
+                continue
+            if mark is None or posted > mark:
+                mark, ids = posted, set()
+            if posted == mark and record.get("noticeId"):
+                ids.add(record["noticeId"])
+        if mark is not None:
+            self.watermark = {"posted_date": mark.isoformat(), "notice_ids": sorted(ids)}
+
+    # ------------------------------------------------------------------
+    def changed_documents(self, docs: Iterable[Dict]) -> List[Dict]:
+        """Return only the processed documents that are new or whose content changed."""
+        changed = []
+        for doc in docs:
+            notice_id = doc["metadata"].get("notice_id")
+            known = self.notices.get(notice_id)
+            if known and known["hash"] == document_hash(doc):
+                continue
+            changed.append(doc)
+        return changed
+
+    def record_documents(self, docs: Iterable[Dict]) -> None:
+        for doc in docs:
+            meta = doc["metadata"]
+            notice_id = meta.get("notice_id")
+            if not notice_id:
+                continue
+            self.notices[notice_id] = {
+                "hash": document_hash(doc),
+                "response_deadline": meta.get("response_deadline") or "",
+            }
+
+    def expired_notice_ids(self, now: datetime | None = None) -> List[str]:
+        """Return embedded notice IDs whose response deadline has passed."""
+        now = now or datetime.now(timezone.utc)
+        expired = []
+        for notice_id, info in self.notices.items():
+            deadline = _parse_date(info.get("response_deadline"))
+            if deadline and deadline <= now:
+                expired.append(notice_id)
+        return expired
+
+    def forget(self, notice_ids: Iterable[str]) -> None:
+        for notice_id in notice_ids:
+            self.notices.pop(notice_id, None)
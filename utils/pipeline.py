@@ -0,0 +1,126 @@
+"""Thread-per-stage streaming pipeline connected by bounded queues."""
+
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+_DONE = object()
+
+
+class PipelineAborted(Exception):
+    """Internal signal used to unwind stage threads after another stage failed."""
+
+
+class StreamingPipeline:
+    """Run ``source -> stage 1 -> ... -> stage N`` with every stage in its own thread.
+
+    Each pair of neighbouring stages is joined by a ``queue.Queue`` of
+    ``queue_size`` items, so a slow stage blocks the ones upstream of it
+    (backpressure) and at most ``queue_size`` items are buffered between any
+    two stages. A stage returning ``None`` drops the item. The source may be a
+    regular or an async iterable. If any stage raises, the others are stopped
+    and the first exception is re-raised from :meth:`run`.
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable[[Any], Any]]], queue_size: int = 4) -> None:
+        self.stages = stages
+        self.queue_size = queue_size
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self.wall_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    def _put(self, q: queue.Queue, item: Any) -> None:
+        while True:
+            if self._stop.is_set():
+                raise PipelineAborted()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue) -> Any:
+        while True:
+            if self._stop.is_set():
+                raise PipelineAborted()
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _fail(self, exc: BaseException) -> None:
+        self._errors.append(exc)
+        self._stop.set()
+
+    # ------------------------------------------------------------------
+    def _produce(self, source: Iterable, out: queue.Queue) -> None:
+        stats = self.stats["source"]
+        try:
+            if hasattr(source, "__aiter__"):
+                asyncio.run(self._produce_async(source, out))
+            else:
+                for item in source:
+                    stats["items"] += 1
+                    self._put(out, item)
+            self._put(out, _DONE)
+        except PipelineAborted:
+            pass
+        except BaseException as e:  # noqa: BLE001 - surfaced from run()
+            self._fail(e)
+
+    async def _produce_async(self, source, out: queue.Queue) -> None:
+        async for item in source:
+            self.stats["source"]["items"] += 1
+            # Block in a worker thread so in-flight requests keep progressing
+            await asyncio.to_thread(self._put, out, item)
+
+    def _work(self, name: str, fn: Callable, inbox: queue.Queue, out: queue.Queue | None) -> None:
+        stats = self.stats[name]
+        try:
+            while True:
+                item = self._get(inbox)
+                if item is _DONE:
+                    break
+                started = time.perf_counter()
+                result = fn(item)
+                stats["busy_seconds"] += time.perf_counter() - started
+                stats["items"] += 1
+                if result is not None and out is not None:
+                    self._put(out, result)
+            if out is not None:
+                self._put(out, _DONE)
+        except PipelineAborted:
+            pass
+        except BaseException as e:  # noqa: BLE001 - surfaced from run()
+            self._fail(e)
+
+    # ------------------------------------------------------------------
+    def run(self, source: Iterable) -> Dict[str, Dict[str, float]]:
+        """Drain ``source`` through every stage and return per-stage stats."""
+        self._stop.clear()
+        self._errors = []
+        self.stats = {"source": {"items": 0}}
+        self.stats.update({name: {"items": 0, "busy_seconds": 0.0} for name, _ in self.stages})
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads = [threading.Thread(target=self._produce, args=(source, queues[0]), name="pipeline-source")]
+        for i, (name, fn) in enumerate(self.stages):
+            out = queues[i + 1] if i + 1 < len(queues) else None
+            threads.append(threading.Thread(target=self._work, args=(name, fn, queues[i], out), name=f"pipeline-{name}"))
+
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.wall_seconds = time.perf_counter() - started
+
+        if self._errors:
+            raise self._errors[0]
+        return self.stats
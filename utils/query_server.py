@@ -0,0 +1,271 @@
+"""Long-lived HTTP/JSON query service over one warm store and set of chains."""
+
+from __future__ import annotations
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_WORKERS = 4
+DEFAULT_BACKLOG = 16
+DEFAULT_IDLE_TIMEOUT = 30.0
+
+
+class RequestError(ValueError):
+    """A client error, reported as HTTP 400."""
+
+
+def _doc_to_json(doc) -> Dict[str, Any]:
+    return {"text": doc.page_content, "metadata": doc.metadata}
+
+
+def _list(value) -> Optional[List[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(v).strip() for v in value if str(v).strip()] or None
+
+
+def _positive_int(payload: Dict, key: str, default: Optional[int]) -> Optional[int]:
+    value = payload.get(key)
+    if value is None:
+        return default
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise RequestError(f"'{key}' must be a positive integer")
+    return value
+
+
+class QueryService:
+    """Answers API requests with objects that live for the whole process.
+
+    The store (and its Milvus connection and cached embedder) is created by
+    the caller. Chains are built on first use and then shared between
+    requests, so only the first request of each kind pays their start-up.
+    """
+
+    def __init__(self, store, config: Dict, search_fn: Callable) -> None:
+        self.store = store
+        self.config = config
+        self.search_fn = search_fn
+        self._components: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _component(self, name: str, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            if name not in self._components:
+                self._components[name] = factory()
+            return self._components[name]
+
+    def _rag(self):
+        from llm import LlamaRAG
+
+        return self._component(
+            "rag", lambda: LlamaRAG("vector_store", api_key=self.config.get("LLAMA_API_KEY"), store=self.store)
+        )
+
+    def _rerank_chain(self):
+        from chains.rerank_chain import RerankChain
+
+        return self._component("rerank", RerankChain)
+
+    def _csv_agent(self):
+        from agents.csv_opportunity_agent import CSVOpportunityAgent
+
+        # Matching only reads the store, so no CSV file is needed
+        return self._component("csv-match", lambda: CSVOpportunityAgent("", self.store))
+
+    @staticmethod
+    def _query(payload: Dict, key: str = "query") -> str:
+        value = (payload.get(key) or "").strip()
+        if not value:
+            raise RequestError(f"'{key}' is required")
+        return value
+
+    # ------------------------------------------------------------------
+    def health(self, payload: Dict) -> Dict:
+        return {
+            "status": "ok",
+            "collection": self.store.collection_name,
+            "row_count": self.store.row_count(),
+            "warm": sorted(self._components),
+        }
+
+    def search(self, payload: Dict) -> Dict:
+        docs = self.search_fn(
+            self.store,
+            self._query(payload),
+            k=_positive_int(payload, "k", 10),
+            setasides=_list(payload.get("setasides")),
+            naics_codes=_list(payload.get("naics")),
+        )
+        return {"results": [_doc_to_json(d) for d in docs]}
+
+    def rag(self, payload: Dict) -> Dict:
+        query = self._query(payload)
+        rag = self._rag()
+        docs = rag.retrieve_docs(
+            query,
+            k=_positive_int(payload, "k", 10),
+            setasides=_list(payload.get("setasides")),
+            naics_codes=_list(payload.get("naics")),
+        )
+        return {"answer": rag.generate_response(query, docs=docs), "documents": [_doc_to_json(d) for d in docs]}
+
+    def rerank(self, payload: Dict) -> Dict:
+        query = self._query(payload)
+        k, top_n = _positive_int(payload, "k", 10), _positive_int(payload, "top_n", 5)
+        docs = self.search_fn(self.store, query, k=k)
+        ranked = self._rerank_chain().rerank(query, docs, top_n=top_n)
+        return {
+            "results": [
+                {"rank": r["rank"], "score": r["score"], **_doc_to_json(r["document"])} for r in ranked
+            ]
+        }
+
+    def csv_match(self, payload: Dict) -> Dict:
+        profile = self._query(payload, "company_profile")
+        top_k, cutoff = _positive_int(payload, "top_k", 10), _positive_int(payload, "cutoff", None)
+        results = self._csv_agent().find_matching_opportunities(
+            profile,
+            top_k,
+            cutoff=cutoff,
+            naics_codes=_list(payload.get("naics")),
+            setasides=_list(payload.get("setasides")),
+        )
+        return {
+            "results": [
+                {key: value for key, value in r.items() if key != "opportunity"} for r in results
+            ]
+        }
+
+    def routes(self) -> Dict[str, Callable[[Dict], Dict]]:
+        return {
+            "/health": self.health,
+            "/search": self.search,
+            "/rag": self.rag,
+            "/rerank": self.rerank,
+            "/csv-match": self.csv_match,
+        }
+
+
+class BoundedThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """HTTP server that handles requests on a fixed-size worker pool.
+
+    At most ``workers`` requests run at once and at most ``backlog`` more
+    wait for a worker; beyond that clients get an immediate 503 instead of
+    piling up threads.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, handler, workers: int = DEFAULT_WORKERS, backlog: int = DEFAULT_BACKLOG):
+        super().__init__(address, handler)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query")
+        self.slots = threading.BoundedSemaphore(workers + backlog)
+
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            try:
+                request.sendall(
+                    b"HTTP/1.1 503 Service Unavailable\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: 25\r\nConnection: close\r\n\r\n"
+                    b'{"error": "server busy"}\n'
+                )
+            finally:
+                self.shutdown_request(request)
+            return
+        self.executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.process_request_thread(request, client_address)
+        finally:
+            self.slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+
+def make_handler(service: QueryService, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+    routes = service.routes()
+
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive connections hold a worker between requests, so one that
+        # stays idle for ``timeout`` seconds is closed to free the worker
+        protocol_version = "HTTP/1.1"
+        timeout = idle_timeout
+
+        def log_message(self, fmt, *args):
+            print(f"🌐 {self.address_string()} {fmt % args}")
+
+        def _send(self, status: int, payload: Dict) -> None:
+            body = json.dumps(payload, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _handle(self, payload: Dict) -> None:
+            route = routes.get(self.path.split("?", 1)[0])
+            if route is None:
+                self._send(404, {"error": f"unknown endpoint {self.path}"})
+                return
+            try:
+                self._send(200, route(payload))
+            except RequestError as e:
+                self._send(400, {"error": str(e)})
+            except Exception as e:
+                print(f"⚠️ Error handling {self.path}: {e}")
+                self._send(500, {"error": str(e)})
+
+        def do_GET(self):
+            self._handle({})
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                if length < 0:
+                    raise ValueError(length)
+            except ValueError:
+                # The body's extent is unknown, so the connection can't be reused
+                self.close_connection = True
+                self._send(400, {"error": "Content-Length must be a non-negative integer"})
+                return
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                # JSONDecodeError, or UnicodeDecodeError for a body that isn't UTF-8
+                self._send(400, {"error": "request body must be JSON"})
+                return
+            if not isinstance(payload, dict):
+                self._send(400, {"error": "request body must be a JSON object"})
+                return
+            self._handle(payload)
+
+    return Handler
+
+
+def create_server(service: QueryService, host: str = "127.0.0.1", port: int = 8080,
+                  workers: int = DEFAULT_WORKERS,
+                  idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> BoundedThreadingHTTPServer:
+    return BoundedThreadingHTTPServer((host, port), make_handler(service, idle_timeout), workers=workers)
+
+
+def serve(service: QueryService, host: str = "127.0.0.1", port: int = 8080, workers: int = DEFAULT_WORKERS) -> None:
+    server = create_server(service, host, port, workers)
+    print(f"🚀 Serving /search, /rag, /rerank, /csv-match and /health on http://{host}:{server.server_port} "
+          f"({workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+    finally:
+        server.server_close()
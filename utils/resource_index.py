@@ -0,0 +1,38 @@
+"""Local index of SAM.gov resource URLs that have already been downloaded."""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Dict, Optional
+
+from .sqlite_cache import SQLiteCache
+
+DEFAULT_INDEX_PATH = os.path.join("state", "resource_index.sqlite")
+
+
+class ResourceIndex:
+    """Maps a resource URL to the blob it was stored as and its HTTP validators.
+
+    Entries hold ``blob``, ``sha256``, ``size``, ``filename``,
+    ``content_type`` and, when the server sent them, ``etag`` and
+    ``last_modified`` for conditional GETs.
+    """
+
+    def __init__(self, cache: SQLiteCache) -> None:
+        self.cache = cache
+
+    def get(self, url: str) -> Optional[Dict]:
+        blob = self.cache.get(url)
+        return json.loads(blob) if blob is not None else None
+
+    def put(self, url: str, entry: Dict) -> None:
+        self.cache.put(url, json.dumps(entry).encode("utf-8"))
+
+    def stats(self):
+        return self.cache.stats()
+
+
+def default_resource_index() -> ResourceIndex:
+    """Return the resource index at ``RESOURCE_INDEX_PATH`` (``state/resource_index.sqlite``)."""
+    return ResourceIndex(SQLiteCache(os.getenv("RESOURCE_INDEX_PATH") or DEFAULT_INDEX_PATH))
@@ -2,28 +2,43 @@ from datetime import datetime, timedelta
 import requests
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+SAM_SEARCH_URL = "https://api.sam.gov/opportunities/v2/search"
+
+
+def default_posted_window(days=3):
+    """Return ``(posted_from, posted_to)`` covering the last ``days`` days."""
+    now = datetime.now()
+    return (now - timedelta(days=days)).strftime("%m/%d/%Y"), now.strftime("%m/%d/%Y")
+
+
+def build_search_params(api_key, limit, offset, title=None, ptype=None, ncode=None, posted_from=None, posted_to=None):
+    """Build the query parameters for a SAM.gov opportunities search."""
+    params = {
+        "api_key": api_key,
+        "postedFrom": posted_from,
+        "postedTo": posted_to,
+        "limit": limit,
+        "offset": offset
+    }
+
+    if title:
+        params["title"] = title
+    if ptype:
+        params["ptype"] = ptype
+    if ncode:
+        params["ncode"] = ncode
+    return params
+
+
 class SamAPIClient:
-    BASE_URL = "https://api.sam.gov/opportunities/v2/search"
+    BASE_URL = SAM_SEARCH_URL
 
     def __init__(self, api_key):
         self.api_key = api_key
 
     def _fetch_page(self, page, limit, title, ptype, ncode, posted_from, posted_to):
         offset = page * limit
-        params = {
-            "api_key": self.api_key,
-            "postedFrom": posted_from,
-            "postedTo": posted_to,
-            "limit": limit,
-            "offset": offset
-        }
-
-        if title:
-            params["title"] = title
-        if ptype:
-            params["ptype"] = ptype
-        if ncode:
-            params["ncode"] = ncode
+        params = build_search_params(self.api_key, limit, offset, title, ptype, ncode, posted_from, posted_to)
 
         print(f"🔎 Fetching page {page + 1} (offset {offset})...")
         response = requests.get(self.BASE_URL, params=params)
@@ -32,20 +47,7 @@ class SamAPIClient:
 
     def _fetch_total_records(self, title=None, ptype=None, ncode=None, posted_from=None, posted_to=None):
         """Fetch just the first page to see how many total records there are."""
-        params = {
-            "api_key": self.api_key,
-            "postedFrom": posted_from,
-            "postedTo": posted_to,
-            "limit": 1,
-            "offset": 0
-        }
-
-        if title:
-            params["title"] = title
-        if ptype:
-            params["ptype"] = ptype
-        if ncode:
-            params["ncode"] = ncode
+        params = build_search_params(self.api_key, 1, 0, title, ptype, ncode, posted_from, posted_to)
 
         print("🔎 Fetching total record count...")
         response = requests.get(self.BASE_URL, params=params)
@@ -55,11 +57,11 @@ class SamAPIClient:
         print(f"📈 Total records available: {total_records}")
         return total_records
 
-    def search_opportunities(self, title=None, ptype=None, ncode=None, posted_from=None, posted_to=None, limit=100, max_workers=8):
-        if not posted_from:
-            posted_from = (datetime.now() - timedelta(days=3)).strftime("%m/%d/%Y")
-        if not posted_to:
-            posted_to = datetime.now().strftime("%m/%d/%Y")
+    def iter_pages(self, title=None, ptype=None, ncode=None, posted_from=None, posted_to=None, limit=100, max_workers=8):
+        """Yield each page of results as soon as it has been downloaded."""
+        default_from, default_to = default_posted_window()
+        posted_from = posted_from or default_from
+        posted_to = posted_to or default_to
 
         # Step 1: Fetch total number of records
         total_records = self._fetch_total_records(title, ptype, ncode, posted_from, posted_to)
@@ -68,7 +70,6 @@ class SamAPIClient:
         total_pages = (total_records + limit - 1) // limit  # Ceiling division
         print(f"🗂️ Fetching {total_pages} pages (limit {limit} records per page)")
 
-        all_results = []
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             futures = {
                 executor.submit(self._fetch_page, page, limit, title, ptype, ncode, posted_from, posted_to): page
@@ -81,9 +82,14 @@ class SamAPIClient:
                     page_data = future.result()
                     if not page_data:
                         continue
-                    all_results.extend(page_data)
+                    yield page_data
                 except Exception as e:
                     print(f"⚠️ Error fetching page {page + 1}: {e}")
 
+    def search_opportunities(self, title=None, ptype=None, ncode=None, posted_from=None, posted_to=None, limit=100, max_workers=8):
+        all_results = []
+        for page_data in self.iter_pages(title, ptype, ncode, posted_from, posted_to, limit, max_workers):
+            all_results.extend(page_data)
+
         print(f"✅ Successfully fetched {len(all_results)} total solicitations.")
         return all_results
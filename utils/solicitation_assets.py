@@ -1,8 +1,120 @@
 import os
 import json
+import hashlib
 import re
+import uuid
 import requests
-from typing import Dict, List, Optional, Tuple
+from botocore.exceptions import ClientError
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Per-day index of archived notice ids, written next to the records
+MANIFEST_NAME = "_manifest.json"
+# Per-notice list of stored attachments with their size and checksum
+ATTACHMENTS_NAME = "attachments.json"
+# Marks a notice folder whose description or attachments failed to download
+INCOMPLETE_NAME = "_incomplete.json"
+# S3 multipart parts must be at least 5 MiB (except the last one)
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# (connect, read) timeouts for SAM.gov downloads
+HTTP_TIMEOUT = (10, 120)
+# Attachments are stored once per content hash; uploads land in staging first
+BLOB_PREFIX = "blobs/sha256/"
+STAGING_PREFIX = "blobs/staging/"
+
+
+def blob_key(sha256: str) -> str:
+    return f"{BLOB_PREFIX}{sha256}"
+
+
+def upload_stream(
+    s3_client,
+    bucket: str,
+    key: str,
+    chunks: Iterable[bytes],
+    part_size: Optional[int] = None,
+) -> Dict:
+    """Upload a byte stream to S3 holding at most ``part_size`` bytes in memory.
+
+    Streams that end before filling one part are sent with a single
+    ``put_object``; longer ones become a multipart upload of ``part_size``
+    parts (``ATTACHMENT_PART_SIZE``, default 8 MiB), which is aborted if
+    anything fails. Returns ``{"size", "sha256"}`` of the uploaded bytes.
+    """
+    part_size = part_size or int(os.getenv("ATTACHMENT_PART_SIZE") or DEFAULT_PART_SIZE)
+    digest = hashlib.sha256()
+    size = 0
+    buffer = bytearray()
+    upload_id = None
+    parts: List[Dict] = []
+
+    def flush() -> None:
+        part_number = len(parts) + 1
+        resp = s3_client.upload_part(
+            Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=bytes(buffer)
+        )
+        parts.append({"ETag": resp["ETag"], "PartNumber": part_number})
+        buffer.clear()
+
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            digest.update(chunk)
+            size += len(chunk)
+            buffer.extend(chunk)
+            while len(buffer) >= part_size:
+                if upload_id is None:
+                    upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key)["UploadId"]
+                rest = buffer[part_size:]
+                del buffer[part_size:]
+                flush()
+                buffer.extend(rest)
+        if upload_id is None:
+            s3_client.put_object(Bucket=bucket, Key=key, Body=bytes(buffer))
+        else:
+            if buffer:
+                flush()
+            s3_client.complete_multipart_upload(
+                Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+    except Exception:
+        if upload_id is not None:
+            s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+    return {"size": size, "sha256": digest.hexdigest()}
+
+
+def store_blob(s3_client, bucket: str, chunks: Iterable[bytes]) -> Dict:
+    """Stream ``chunks`` into the content-addressed blob store.
+
+    The bytes are uploaded to a staging key while being hashed, then copied
+    to ``blobs/sha256/<hash>`` unless that blob already exists; the staging
+    object is always removed. Returns ``{"size", "sha256", "blob"}``.
+    """
+    staging = f"{STAGING_PREFIX}{uuid.uuid4().hex}"
+    try:
+        info = upload_stream(s3_client, bucket, staging, chunks)
+        key = blob_key(info["sha256"])
+        try:
+            s3_client.head_object(Bucket=bucket, Key=key)
+        except ClientError:
+            s3_client.copy_object(Bucket=bucket, Key=key, CopySource={"Bucket": bucket, "Key": staging})
+    finally:
+        try:
+            s3_client.delete_object(Bucket=bucket, Key=staging)
+        except ClientError:
+            pass
+    return {**info, "blob": key}
+
+
+def attachment_pointers(s3_client, bucket: str, asset_prefix: str) -> List[Dict]:
+    """Return the ``attachments.json`` entries of a notice folder, or ``[]``."""
+    try:
+        body = s3_client.get_object(Bucket=bucket, Key=f"{asset_prefix.rstrip('/')}/{ATTACHMENTS_NAME}")["Body"]
+    except ClientError:
+        return []
+    return json.loads(body.read())
 
 
 def enrich_record_with_details(
@@ -13,6 +125,9 @@ def enrich_record_with_details(
     api_key: Optional[str] = None,
     endpoint_url: str = os.getenv("MINIO_ENDPOINT", "http://localhost:9000"),
     dry_run: bool = False,
+    session=None,
+    attachment_pool=None,
+    resource_index=None,
 ) -> Dict:
     """Fetch full description and attachments for a solicitation record.
 
@@ -20,10 +135,25 @@ def enrich_record_with_details(
     or text is stored in the same S3 prefix as the original record under
     ``<prefix>/<notice_id>/description.json``.
 
-    Any URLs in ``record['resourceLinks']`` are downloaded and uploaded to the
-    bucket under ``<prefix>/<notice_id>/``. The resulting S3 keys are stored
-    in ``record['attachment_keys']``.
+    Any URLs in ``record['resourceLinks']`` are streamed into the
+    content-addressed blob store (see ``store_blob``), so a file attached to
+    many notices is stored once. ``<prefix>/<notice_id>/attachments.json``
+    points each attachment's file name at its blob, with size and SHA-256.
+    The blob keys are stored in ``record['attachment_keys']``.
+
+    With a ``resource_index`` (see ``utils.resource_index``) URLs fetched
+    before are not downloaded again: the request is made conditional on the
+    stored ETag/Last-Modified, or skipped when the server sent neither.
+
+    Downloads go through ``session`` (anything with a ``requests``-style
+    ``get``, such as a pooled session) when given. With an
+    ``attachment_pool`` executor the attachments are fetched concurrently.
+
+    URLs that could not be fetched are listed in ``record['failed_links']``
+    and in ``<prefix>/<notice_id>/_incomplete.json``. A folder holding that
+    marker is enriched again on the next run instead of being skipped.
     """
+    http = session or requests
     notice_id = record.get("noticeId")
     posted = record.get("postedDate")
     if not notice_id or not posted:
@@ -45,16 +175,22 @@ def enrich_record_with_details(
     key_prefix = dt.strftime("%Y/%m/%d")
     base_prefix = f"{key_prefix}/{notice_id}"
 
-    # Skip enrichment if this notice already has a folder of assets
+    incomplete_key = f"{base_prefix}/{INCOMPLETE_NAME}"
+    retrying = False
+    # Skip enrichment if this notice already has a complete folder of assets
     if not dry_run:
         existing = s3_client.list_objects_v2(
             Bucket=bucket,
             Prefix=f"{base_prefix}/",
-            MaxKeys=1,
+            MaxKeys=10,
         )
-        if existing.get("KeyCount", 0) > 0:
+        keys = {obj["Key"] for obj in existing.get("Contents", [])}
+        retrying = incomplete_key in keys
+        if keys and not retrying:
             return record
 
+    failed_links: List[str] = []
+
     # ------------------------------------------------------------------
     desc = record.get("description")
     if isinstance(desc, str) and desc.startswith("http"):
@@ -63,7 +199,7 @@ def enrich_record_with_details(
             sep = "&" if "?" in url else "?"
             url = f"{url}{sep}api_key={api_key}"
         try:
-            resp = requests.get(url)
+            resp = http.get(url, timeout=HTTP_TIMEOUT)
             resp.raise_for_status()
             try:
                 desc_data = resp.json()
@@ -78,32 +214,86 @@ def enrich_record_with_details(
                 record["description_data"] = desc_data
         except Exception as e:
             print(f"⚠️ Failed to fetch description for {notice_id}: {e}")
+            failed_links.append(desc)
 
     # ------------------------------------------------------------------
-    attachment_keys: List[str] = []
-    links = record.get("resourceLinks") or []
-    for link in links:
-        if not isinstance(link, str) or not link.startswith("http"):
-            continue
+    def pointer(link: str, filename: str, entry: Dict) -> Dict:
+        return {
+            "name": filename,
+            "key": f"{base_prefix}/{filename}",
+            "url": link,
+            "content_type": entry.get("content_type"),
+            **{field: entry[field] for field in ("blob", "size", "sha256") if field in entry},
+        }
+
+    def fetch_attachment(link: str) -> Optional[Dict]:
+        known = resource_index.get(link) if resource_index and not dry_run else None
+        if known and not (known.get("etag") or known.get("last_modified")):
+            # Nothing to revalidate with; SAM file ids are immutable
+            return pointer(link, known["filename"], known)
+        headers = {}
+        if known:
+            if known.get("etag"):
+                headers["If-None-Match"] = known["etag"]
+            if known.get("last_modified"):
+                headers["If-Modified-Since"] = known["last_modified"]
         try:
-            resp = requests.get(link)
-            resp.raise_for_status()
-            file_id = link.rstrip("/").split("/")[-2]
-            filename = file_id
-            cd = resp.headers.get("Content-Disposition")
-            if cd:
-                m = re.search(r"filename=\"?([^\";]+)\"?", cd)
-                if m:
-                    filename = m.group(1)
-            key = f"{base_prefix}/{filename}"
-            if not dry_run:
-                s3_client.put_object(Bucket=bucket, Key=key, Body=resp.content)
-            attachment_keys.append(key)
+            resp = http.get(link, stream=True, timeout=HTTP_TIMEOUT, headers=headers)
+            try:
+                if known and resp.status_code == 304:
+                    return pointer(link, known["filename"], known)
+                resp.raise_for_status()
+                file_id = link.rstrip("/").split("/")[-2]
+                filename = file_id
+                cd = resp.headers.get("Content-Disposition")
+                if cd:
+                    m = re.search(r"filename=\"?([^\";]+)\"?", cd)
+                    if m:
+                        filename = m.group(1)
+                entry = {"filename": filename, "content_type": resp.headers.get("Content-Type")}
+                if not dry_run:
+                    # The body goes straight from the socket into S3 parts
+                    entry.update(store_blob(s3_client, bucket, resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)))
+                    if resource_index:
+                        resource_index.put(link, {
+                            **entry,
+                            "etag": resp.headers.get("ETag"),
+                            "last_modified": resp.headers.get("Last-Modified"),
+                        })
+                return pointer(link, filename, entry)
+            finally:
+                resp.close()
         except Exception as e:
             print(f"⚠️ Failed to download attachment {link}: {e}")
+            return None
+
+    links = [
+        link for link in record.get("resourceLinks") or []
+        if isinstance(link, str) and link.startswith("http")
+    ]
+    fetched = list(attachment_pool.map(fetch_attachment, links) if attachment_pool else map(fetch_attachment, links))
+    attachments: List[Dict] = [info for info in fetched if info]
+    failed_links.extend(link for link, info in zip(links, fetched) if info is None)
+
+    if attachments:
+        record["attachment_keys"] = [info.get("blob", info["key"]) for info in attachments]
+        if not dry_run:
+            s3_client.put_object(
+                Bucket=bucket,
+                Key=f"{base_prefix}/{ATTACHMENTS_NAME}",
+                Body=json.dumps(attachments).encode("utf-8"),
+            )
 
-    if attachment_keys:
-        record["attachment_keys"] = attachment_keys
+    if failed_links:
+        record["failed_links"] = failed_links
+        if not dry_run:
+            s3_client.put_object(
+                Bucket=bucket,
+                Key=incomplete_key,
+                Body=json.dumps({"failed_links": failed_links}).encode("utf-8"),
+            )
+    elif retrying:
+        s3_client.delete_object(Bucket=bucket, Key=incomplete_key)
 
     return record
 
@@ -140,13 +330,23 @@ def date_to_prefix(date_str: str) -> str:
     return dt.strftime("%Y/%m/%d/")
 
 
+def is_record_key(key: str) -> bool:
+    """True for archived notice keys (``YYYY/MM/DD/<notice_id>.json``).
+
+    Per-notice asset folders and bookkeeping objects whose name starts with
+    ``_`` (such as the day manifest) are not records.
+    """
+    parts = key.split("/")
+    return len(parts) == 4 and key.endswith(".json") and not parts[-1].startswith("_")
+
+
 def list_json_keys_for_date(s3_client, bucket: str, date_str: str):
-    """Yield JSON object keys from ``bucket`` for the specified date."""
+    """Yield archived record keys from ``bucket`` for the specified date."""
 
     prefix = date_to_prefix(date_str)
     paginator = s3_client.get_paginator("list_objects_v2")
     for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
         for obj in page.get("Contents", []):
             key = obj["Key"]
-            if key.endswith(".json"):
+            if is_record_key(key):
                 yield key